@@ -4,6 +4,7 @@
  */
 import documentCache from './document-cache.js';
 import config from '/config.js';
+import { loadNavigationData, buildNavigationData, hashPathText, isNavigationDataCurrent } from './utils.js';
 
 /**
  * 初始化缓存管理模块
@@ -126,18 +127,20 @@ function bindCacheModalEvents() {
     const startPreloadButton = document.getElementById('start-preload');
     if (startPreloadButton) {
         startPreloadButton.addEventListener('click', () => {
-            // 加载path.json并开始预加载
-            fetch('/path.json')
-                .then(response => response.json())
-                .then(pathData => {
-                    documentCache.preloadAllDocuments(pathData);
+            // 加载导航数据（nav.json，缺失或不是由当前path.json生成时由path.json生成）并开始预加载
+            Promise.all([fetch('/path.json').then(response => response.text()), loadNavigationData()])
+                .then(([pathText, navData]) => isNavigationDataCurrent(navData, hashPathText(pathText))
+                    ? navData
+                    : buildNavigationData(JSON.parse(pathText)))
+                .then(navData => {
+                    documentCache.preloadAllDocuments(navData);
                     updateCacheList();
                     
                     // 显示通知
                     showNotification('已开始预加载所有文档', 'success');
                 })
                 .catch(error => {
-                    console.error('加载path.json失败:', error);
+                    console.error('加载导航数据失败:', error);
                     showNotification('预加载失败', 'error');
                 });
         });
@@ -270,25 +270,14 @@ const documentCache = {
 
     /**
      * 预加载所有在path.json中定义的文档
-     * @param {Object} pathData 完整的文档结构数据
+     * @param {Object} navData 导航数据（nav.json格式，documents中已包含所有文件和索引页，无需遍历文档树）
      * @param {number} maxPreload 最大预加载数量（可选，默认无限制）
      */
-    preloadAllDocuments(pathData, maxPreload = Infinity) {
-        if (!pathData) return;
-
-        const allPaths = new Set();
-
-        // 递归收集所有路径
-        const collectPaths = (node) => {
-            if (node.path && node.path.includes('.')) allPaths.add(node.path); // 文件
-            if (node.index && node.index.path) allPaths.add(node.index.path); // 索引
-            if (node.children) node.children.forEach(collectPaths);
-        };
-
-        collectPaths(pathData);
+    preloadAllDocuments(navData, maxPreload = Infinity) {
+        if (!navData || !navData.documents) return;
 
         // 过滤掉已缓存/预加载/正在加载的
-        const filteredPaths = [...allPaths].filter(path => 
+        const filteredPaths = navData.documents.map(([path]) => path).filter(path => 
             !this.preloadCache[path] && 
             !this.cache[path] && 
             !this.loadingDocs.has(path)
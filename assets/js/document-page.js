@@ -93,6 +93,10 @@ import {
     getTitleFromPath,
     findIndexPath,
     getAllDocumentLinks,
+    findDocumentIndex,
+    loadNavigationData,
+    hashPathText,
+    expandPathData,
     isDarkMode,
     updatePageTitle,
     formatTimestamp,
@@ -125,16 +129,18 @@ document.addEventListener('DOMContentLoaded', async () => {
     
     // 加载文档结构
     try {
-        const response = await fetch('/path.json');
+        // 导航数据（nav.json）与path.json并行加载，缺失或不是由当前path.json生成时由path.json生成
+        const [response, navData] = await Promise.all([fetch('/path.json'), loadNavigationData()]);
         if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        pathData = await response.json();
+        const pathText = await response.text();
+        pathData = expandPathData(JSON.parse(pathText));
         
         // 初始化sundry模块
         const { path: currentPath, root } = parseUrlPath();
         currentRoot = root;
         
         // 初始化工具模块
-        initUtils(pathData, currentRoot);
+        initUtils(pathData, currentRoot, navData, hashPathText(pathText));
         
         initSundryModule(pathData, currentRoot, updateActiveHeading);
         
@@ -1010,8 +1016,8 @@ function generatePrevNextNavigation(currentPath) {
     // 获取所有文档链接
     const allLinks = getAllDocumentLinks();
     
-    // 找到当前文档的索引
-    const currentIndex = allLinks.findIndex(link => link.path === currentPath);
+    // 找到当前文档的索引（查表，上一篇/下一篇即相邻的文档）
+    const currentIndex = findDocumentIndex(currentPath);
     if (currentIndex === -1) return; // 未找到当前文档
     
     // 创建导航容器
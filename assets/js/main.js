@@ -15,6 +15,16 @@ import {
 
 // 搜索数据
 let searchData = null;
+// 搜索索引分片清单（为null时使用单文件search.json）
+let searchManifest = null;
+// 搜索分片的加载（分片哈希 -> 加载完成后得到文档列表的Promise），同一分片只请求一次
+const searchShards = new Map();
+// 已加载完成的分片哈希
+const loadedSearchShards = new Set();
+// 最近一次搜索的编号，较早的搜索在加载分片后发现编号已过期时丢弃结果
+let searchGeneration = 0;
+// 已解码的分片过滤器（分片哈希 -> 位图）
+const searchShardFilters = new Map();
 
 // 应用初始化
 export async function initApp() {
@@ -327,8 +337,19 @@ function initSearch() {
     bindSearchEvents();
 }
 
-// 加载搜索数据
+// 加载搜索数据：优先只加载分片清单，搜索时再加载可能包含查询文本的分片
 async function loadSearchData() {
+    try {
+        const manifestResponse = await fetch('/search/manifest.json', { cache: 'no-cache' });
+        if (manifestResponse.ok) {
+            searchManifest = await manifestResponse.json();
+            console.log('搜索分片清单加载成功，共 ' + searchManifest.shards.length + ' 个分片、' + searchManifest.count + ' 条记录');
+            return;
+        }
+    } catch (error) {
+        console.warn('加载搜索分片清单出错，改用单文件搜索数据:', error);
+    }
+    
     try {
         const response = await fetch('/search.json');
         if (response.ok) {
@@ -342,6 +363,92 @@ async function loadSearchData() {
     }
 }
 
+// 字符组合在分片过滤器中对应的位（与build.py中的get_search_filter_positions一致）
+function getSearchFilterPositions(text, start, length, bits, hashes) {
+    let h1 = 0x811c9dc5;
+    for (let i = start; i < start + length; i++) {
+        h1 = Math.imul(h1 ^ text.charCodeAt(i), 0x01000193) >>> 0;
+    }
+    const h2 = (((h1 >>> 17) | (h1 << 15)) | 1) >>> 0;
+    const positions = [];
+    for (let i = 0; i < hashes; i++) {
+        positions.push((h1 + i * h2) % bits);
+    }
+    return positions;
+}
+
+// 分片中是否可能有文档包含查询文本（没有过滤器的分片总是可能包含）
+function searchShardMayContain(shard, query) {
+    if (!shard.filter || !query) return true;
+    
+    let bitmap = searchShardFilters.get(shard.hash);
+    if (!bitmap) {
+        bitmap = Uint8Array.from(atob(shard.filter.data), char => char.charCodeAt(0));
+        searchShardFilters.set(shard.hash, bitmap);
+    }
+    
+    // 单个字检查该字本身，更长的查询检查每个相邻两字
+    const length = query.length === 1 ? 1 : 2;
+    for (let start = 0; start + length <= query.length; start++) {
+        const positions = getSearchFilterPositions(query, start, length, shard.filter.bits, shard.filter.hashes);
+        if (positions.some(position => !(bitmap[position >> 3] & (1 << (position & 7))))) {
+            return false;
+        }
+    }
+    return true;
+}
+
+// BM25参数k1和各字段的权重（与build.py的BM25_K1、SEARCH_FIELD_WEIGHTS一致）
+const SEARCH_BM25_K1 = 1.2;
+const SEARCH_FIELD_WEIGHTS = { title: 10, keywords: 5, content: 1 };
+
+// 按build.py预先计算的权重为搜索条目打分（与build.py的score_search_item一致）：
+// 标题和内容按查询文本出现的次数和字段归一化系数（norms）计算BM25词频得分，包含查询文本的关键词累加其权重（weights）
+function scoreSearchItem(item, query) {
+    const norms = item.norms || [SEARCH_BM25_K1, SEARCH_BM25_K1];
+    const fieldScore = (text, norm) => {
+        const termFreq = text.toLowerCase().split(query).length - 1;
+        return termFreq ? termFreq * (SEARCH_BM25_K1 + 1) / (termFreq + norm) : 0;
+    };
+    
+    let score = SEARCH_FIELD_WEIGHTS.title * fieldScore(item.title, norms[0]);
+    score += SEARCH_FIELD_WEIGHTS.content * fieldScore(item.content, norms[1]);
+    const weights = item.weights || [];
+    (item.keywords || []).forEach((keyword, i) => {
+        if (keyword.toLowerCase().includes(query)) {
+            score += SEARCH_FIELD_WEIGHTS.keywords * (i < weights.length ? weights[i] : 1);
+        }
+    });
+    return score;
+}
+
+// 加载一个搜索分片，返回其中的文档（分片文件以内容哈希命名；正在加载和已加载的分片共用同一个Promise，加载失败时移除以便下次重试）
+function loadSearchShard(shard) {
+    let promise = searchShards.get(shard.hash);
+    if (promise) return promise;
+    
+    promise = fetch('/search/' + shard.file, { cache: 'force-cache' })
+        .then(async response => {
+            if (!response.ok) throw new Error(String(response.status));
+            const items = await response.json();
+            loadedSearchShards.add(shard.hash);
+            return items;
+        })
+        .catch(error => {
+            console.warn('搜索分片加载失败: ' + shard.file, error);
+            searchShards.delete(shard.hash);
+            return [];
+        });
+    searchShards.set(shard.hash, promise);
+    return promise;
+}
+
+// 加载可能包含查询文本的搜索分片，返回这些分片中的文档
+async function ensureSearchShards(shards) {
+    const shardItems = await Promise.all(shards.map(loadSearchShard));
+    return shardItems.flat();
+}
+
 // 绑定搜索相关事件
 function bindSearchEvents() {
     // 搜索按钮点击事件
@@ -428,7 +535,7 @@ function closeSearchModal() {
 }
 
 // 执行搜索
-function performSearch() {
+async function performSearch() {
     const searchInput = document.getElementById('search-input');
     const searchResultsContainer = document.getElementById('search-results');
     
@@ -441,8 +548,23 @@ function performSearch() {
         return;
     }
     
+    // 为本次搜索编号，之后开始的搜索会使本次搜索的结果过期
+    const generation = ++searchGeneration;
+    
+    // 只搜索可能包含查询文本的分片，尚未加载的分片此时再加载
+    let searchItems = searchData;
+    if (searchManifest) {
+        const shards = searchManifest.shards.filter(shard => searchShardMayContain(shard, query));
+        if (shards.some(shard => !loadedSearchShards.has(shard.hash))) {
+            searchResultsContainer.innerHTML = '<p class="text-gray-500 dark:text-gray-400 text-center py-4">正在加载搜索数据...</p>';
+        }
+        searchItems = await ensureSearchShards(shards);
+        // 等待分片加载期间已经开始了新的搜索，丢弃本次结果
+        if (generation !== searchGeneration) return;
+    }
+    
     // 检查搜索数据和缓存文档
-    const hasSearchData = searchData && searchData.length > 0;
+    const hasSearchData = searchManifest !== null || (searchData && searchData.length > 0);
     const persistentCachedPaths = documentCache.getPersistentCachedPaths();
     const preloadedPaths = documentCache.getPreloadedPaths();
     const hasCachedDocs = persistentCachedPaths.length > 0 || preloadedPaths.length > 0;
@@ -457,7 +579,7 @@ function performSearch() {
     
     // 搜索静态索引
     if (hasSearchData) {
-        const indexResults = searchData.filter(item => {
+        const indexResults = searchItems.filter(item => {
             const titleMatch = item.title.toLowerCase().includes(query);
             const contentMatch = item.content.toLowerCase().includes(query);
             const keywordMatch = item.keywords && item.keywords.some(keyword => keyword.toLowerCase().includes(query));
@@ -465,6 +587,10 @@ function performSearch() {
             return titleMatch || contentMatch || keywordMatch;
         });
         
+        // 按得分从高到低排序（Array.prototype.sort是稳定的，得分相同时保持索引中的顺序）
+        const scores = new Map(indexResults.map(item => [item, scoreSearchItem(item, query)]));
+        indexResults.sort((a, b) => scores.get(b) - scores.get(a));
+        
         // 将索引结果添加到总结果中
         results = results.concat(indexResults);
     }
@@ -488,6 +614,8 @@ function performSearch() {
         
         // 由于可能搜索时间较长，使用setTimeout确保UI不会被阻塞
         setTimeout(() => {
+            if (generation !== searchGeneration) return;
+            
             // 从缓存中搜索
             const cachedResults = searchCachedDocuments(query);
             
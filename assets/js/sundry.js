@@ -5,7 +5,7 @@
 
 // 导入依赖的工具函数
 import config from '/config.js';
-import { formatTimestamp, filePathToUrl } from './utils.js';
+import { formatTimestamp, filePathToUrl, getNodeByPath } from './utils.js';
 
 // 需要从主文件导入的函数
 let pathData = null;
@@ -46,42 +46,11 @@ function isIndexFile(filename) {
  * 从路径获取标题
  */
 function getTitleFromPath(path) {
-    // 从pathData中查找对应的节点标题
-    const node = findNodeByPath(pathData, path);
+    // 从pathData的路径查找表中获取对应的节点标题
+    const node = getNodeByPath(path);
     return node ? node.title : null;
 }
 
-/**
- * 查找路径对应的节点
- */
-function findNodeByPath(rootNode, targetPath) {
-    if (!rootNode || !targetPath) return null;
-    
-    function traverse(node, currentPath) {
-        // 检查当前节点的路径
-        if (node.path === targetPath) {
-            return node;
-        }
-        
-        // 检查索引文件
-        if (node.index && node.index.path === targetPath) {
-            return node.index;
-        }
-        
-        // 递归检查子节点
-        if (node.children) {
-            for (const child of node.children) {
-                const found = traverse(child, currentPath + '/' + child.name);
-                if (found) return found;
-            }
-        }
-        
-        return null;
-    }
-    
-    return traverse(rootNode, '');
-}
-
 // ===== 搜索高亮模块 =====
 
 /**
@@ -350,8 +319,8 @@ export function findDocInfoByPath(node, targetPath) {
  * 更新Git和GitHub相关信息
  */
 export function updateGitInfo(relativePath) {
-    // 查找当前文档的Git信息
-    const docInfo = findDocInfoByPath(pathData, relativePath);
+    // 查找当前文档的Git信息（文件节点或索引对象）
+    const docInfo = getNodeByPath(relativePath);
     
     // 检查docInfo是否存在，以及是否有git属性
     if (!docInfo || !docInfo.git) {
@@ -565,7 +534,7 @@ export function generateBreadcrumb(path) {
     
     // 如果有root参数，添加根目录面包屑
     if (currentRoot) {
-        const rootNode = findNodeByPath(pathData, currentRoot);
+        const rootNode = getNodeByPath(currentRoot);
         if (rootNode) {
             let rootUrl = '';
             if (rootNode.index) {
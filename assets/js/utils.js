@@ -8,13 +8,182 @@ import { generateNewUrl as pathGenerateNewUrl } from './path-utils.js';
 // 全局变量
 let pathData = null;
 let currentRoot = null;
+// 导航数据（nav.json，缺失时由path.json生成）和由其建立的查找表，每份path.json只建立一次
+let navigationData = null;
+let navigationLookup = null;
 
 // 初始化工具模块（允许其他模块设置全局数据）
-export function initUtils(data, root) {
+// navData为nav.json的内容，pathHash为path.json文本的哈希（hashPathText）；
+// nav.json不是由当前的path.json生成时（如path.json被手动编辑过）改由path.json生成导航数据；
+// 未传入navData且path.json未变化时沿用已有的导航数据
+export function initUtils(data, root, navData = null, pathHash = null) {
+    if (data !== pathData || navData) {
+        navigationData = isNavigationDataCurrent(navData, pathHash) ? navData : null;
+        navigationLookup = null;
+    }
     pathData = data;
     currentRoot = root;
 }
 
+/**
+ * path.json文本的哈希（按UTF-16编码单元计算的32位FNV-1a，与build.py的hash_navigation_source一致）
+ */
+function hashPathText(text) {
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        hash = Math.imul(hash ^ text.charCodeAt(i), 0x01000193) >>> 0;
+    }
+    return hash.toString(16).padStart(8, '0');
+}
+
+/**
+ * nav.json是否由哈希为pathHash的path.json生成
+ */
+function isNavigationDataCurrent(navData, pathHash) {
+    return !!navData && navData.version === 2 && !!pathHash && navData.path_hash === pathHash;
+}
+
+/**
+ * 加载build.py生成的导航数据（nav.json），加载失败时返回null（此时由path.json生成）
+ */
+async function loadNavigationData() {
+    try {
+        const response = await fetch('/nav.json');
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+/**
+ * 由path.json生成与nav.json格式相同的导航数据（与build.py的build_navigation一致）
+ * documents: [路径, 标题, 所属目录编号]，按path.json中从上到下的顺序排列，目录的索引页排在目录内容之前
+ * directories: [路径, 标题, 上级目录编号, 索引页的文档编号]
+ * paths: 去掉扩展名的文档路径和目录路径 -> 文档编号
+ */
+function buildNavigationData(data) {
+    const documents = [];
+    const directories = [];
+    const positions = new Map();
+    
+    const addDocument = (node, directory) => {
+        if (!node.path) return -1;
+        if (!positions.has(node.path)) {
+            positions.set(node.path, documents.length);
+            documents.push([node.path, node.title || '', directory]);
+        }
+        return positions.get(node.path);
+    };
+    
+    const stack = [[data, -1]];
+    while (stack.length > 0) {
+        const [node, parent] = stack.pop();
+        if (node !== data && !('index' in node)) {
+            addDocument(node, parent);
+            continue;
+        }
+        const number = directories.length;
+        directories.push([node.path || '', node.title || '', parent, -1]);
+        if (node.index) {
+            directories[number][3] = addDocument(node.index, number);
+        }
+        const children = node.children || [];
+        for (let i = children.length - 1; i >= 0; i--) {
+            stack.push([children[i], number]);
+        }
+    }
+    
+    const extensions = config.document.supported_extensions.map(ext => ext.toLowerCase());
+    const paths = {};
+    documents.forEach(([path], number) => {
+        const lowerPath = path.toLowerCase();
+        const extension = extensions.find(ext => lowerPath.endsWith(ext));
+        const cleanPath = extension ? path.substring(0, path.lastIndexOf('.')) : path;
+        if (!(cleanPath in paths)) paths[cleanPath] = number;
+    });
+    for (const [path, , , index] of directories) {
+        if (path && index >= 0 && !(path in paths)) paths[path] = index;
+    }
+    
+    return { version: 2, documents, directories, paths };
+}
+
+/**
+ * 获取导航查找表（首次使用时建立）
+ */
+function getNavigationLookup() {
+    if (navigationLookup) return navigationLookup;
+    if (!pathData) return null;
+    if (!navigationData) {
+        navigationData = buildNavigationData(pathData);
+    }
+    
+    const { documents, directories } = navigationData;
+    const lookup = {
+        documents,
+        directories,
+        // 去掉扩展名的路径 -> 文档编号
+        paths: new Map(Object.entries(navigationData.paths)),
+        // 文档路径 -> 文档编号（上一篇/下一篇即相邻的编号）
+        positions: new Map(),
+        // 目录路径 -> 目录编号，以及不区分大小写的版本
+        directoryPaths: new Map(),
+        directoryPathsLower: new Map(),
+        // 路径 -> path.json中的节点（文档、索引页和目录）
+        nodes: new Map(),
+        links: documents.map(([path, title]) => ({ path, title }))
+    };
+    documents.forEach(([path], number) => lookup.positions.set(path, number));
+    directories.forEach(([path], number) => {
+        if (!lookup.directoryPaths.has(path)) lookup.directoryPaths.set(path, number);
+        const lowerPath = path.toLowerCase();
+        if (!lookup.directoryPathsLower.has(lowerPath)) lookup.directoryPathsLower.set(lowerPath, number);
+    });
+    
+    const stack = [pathData];
+    while (stack.length > 0) {
+        const node = stack.pop();
+        if (node.path && !lookup.nodes.has(node.path)) lookup.nodes.set(node.path, node);
+        if (node.index && node.index.path && !lookup.nodes.has(node.index.path)) {
+            lookup.nodes.set(node.index.path, node.index);
+        }
+        const children = node.children || [];
+        for (let i = children.length - 1; i >= 0; i--) {
+            stack.push(children[i]);
+        }
+    }
+    
+    navigationLookup = lookup;
+    return lookup;
+}
+
+/**
+ * 查找路径对应的path.json节点（文档、目录的索引页或目录）
+ */
+function getNodeByPath(path) {
+    const lookup = getNavigationLookup();
+    return lookup && path ? lookup.nodes.get(path) || null : null;
+}
+
+/**
+ * 查找文档在导航顺序中的位置，未找到时返回-1
+ */
+function findDocumentIndex(path) {
+    const lookup = getNavigationLookup();
+    if (!lookup) return -1;
+    const number = lookup.positions.get(path);
+    return number === undefined ? -1 : number;
+}
+
+/**
+ * 获取目录的索引页路径（目录编号无效或没有索引页时返回null）
+ */
+function getDirectoryIndexPath(lookup, directory) {
+    if (directory === undefined) return null;
+    const index = lookup.directories[directory][3];
+    return index >= 0 ? lookup.documents[index][0] : null;
+}
+
 // 通用工具函数
 // 这些函数将由用户从各个文件移动到这里
 
@@ -32,96 +201,21 @@ export function initUtils(data, root) {
  * @returns {object} { actualPath: 实际文件路径, isDirectory: 是否为目录 }
  */
 function resolvePathFromData(cleanPath) {
-    if (!pathData || !cleanPath) {
+    const lookup = pathData && cleanPath ? getNavigationLookup() : null;
+    if (!lookup) {
         return { actualPath: cleanPath, isDirectory: false };
     }
     
-    // 递归查找路径对应的节点
-    function findNode(node, targetPath) {
-        if (!node) return null;
-        
-        // 移除扩展名的函数
-        const removeExtension = (path) => {
-            return path.replace(/\.(md|html)$/i, '');
-        };
-        
-        // 检查当前节点的文件
-        if (node.children) {
-            for (const child of node.children) {
-                if (child.path) {
-                    const childCleanPath = removeExtension(child.path);
-                    if (childCleanPath === targetPath) {
-                        return { node: child, isDirectory: !!child.children };
-                    }
-                }
-                
-                // 递归检查子节点
-                const result = findNode(child, targetPath);
-                if (result) return result;
-            }
-        }
-        
-        // 检查节点的索引文件
-        if (node.index && node.index.path) {
-            const indexCleanPath = removeExtension(node.index.path);
-            if (indexCleanPath === targetPath) {
-                return { node: node.index, isDirectory: false };
-            }
-        }
-        
-        // 检查是否匹配目录路径
-        if (node.path) {
-            const nodeCleanPath = removeExtension(node.path);
-            if (nodeCleanPath === targetPath) {
-                // 这是一个目录，返回其索引文件
-                if (node.index) {
-                    return { node: node.index, isDirectory: true };
-                }
-            }
-        }
-        
-        return null;
-    }
-    
-    const result = findNode(pathData, cleanPath);
-    if (result) {
+    // 文档路径（无扩展名）和目录路径都直接查表，目录对应其索引页
+    const number = lookup.paths.get(cleanPath);
+    if (number !== undefined) {
+        const directory = lookup.directoryPaths.get(cleanPath);
         return {
-            actualPath: result.node.path,
-            isDirectory: result.isDirectory
+            actualPath: lookup.documents[number][0],
+            isDirectory: directory !== undefined && lookup.directories[directory][3] === number
         };
     }
     
-    // 如果没找到，检查是否是目录路径，尝试查找目录的索引文件
-    if (cleanPath && !cleanPath.includes('.')) {
-        // 查找目录节点
-        function findDirNode(node, targetPath) {
-            if (!node) return null;
-            
-            // 检查当前节点是否为目标目录
-            if (node.path === targetPath && node.index) {
-                return node;
-            }
-            
-            // 递归检查子节点
-            if (node.children) {
-                for (const child of node.children) {
-                    const result = findDirNode(child, targetPath);
-                    if (result) return result;
-                }
-            }
-            
-            return null;
-        }
-        
-        const dirNode = findDirNode(pathData, cleanPath);
-        if (dirNode && dirNode.index) {
-            return {
-                actualPath: dirNode.index.path,
-                isDirectory: true
-            };
-        }
-    }
-    
     // 如果都没找到，返回原路径
     return { actualPath: cleanPath, isDirectory: false };
 }
@@ -190,32 +284,13 @@ function findDirectoryIndexPath(dirPath) {
     // 标准化路径，确保没有结尾的斜杠
     dirPath = dirPath.replace(/\/$/, '');
     
-    // 检查pathData中是否存在对应的目录节点
-    function findNode(node, currentPath) {
-        // 路径比较应该不区分大小写
-        const normalizedDirPath = dirPath.toLowerCase();
-        const normalizedNodePath = (node.path || '').toLowerCase();
-        
-        // 如果有索引文件，直接返回
-        if (normalizedNodePath === normalizedDirPath && node.index) {
-            return node.index.path;
-        }
-        
-        // 递归查找子节点
-        if (node.children) {
-            for (const child of node.children) {
-                const result = findNode(child, currentPath);
-                if (result) return result;
-            }
-        }
-        
-        return null;
+    // 检查pathData中是否存在对应的目录节点（路径比较不区分大小写）
+    const lookup = getNavigationLookup();
+    if (lookup) {
+        const indexPath = getDirectoryIndexPath(lookup, lookup.directoryPathsLower.get(dirPath.toLowerCase()));
+        if (indexPath) return indexPath;
     }
     
-    // 从路径数据中查找
-    const indexPath = findNode(pathData, '');
-    if (indexPath) return indexPath;
-    
     // 如果在路径数据中没找到，尝试一些常见的索引文件名
     // 创建可能的索引文件路径数组
     const possiblePaths = [];
@@ -255,66 +330,14 @@ function getTitleFromPath(path) {
 
 // 查找目录的索引页路径
 function findIndexPath(dirPath) {
-    function find(node, targetPath) {
-        if (node.path === targetPath && node.index) {
-            return node.index.path;  // 返回索引页的路径，不带'#'前缀
-        }
-        if (node.children) {
-            for (const child of node.children) {
-                const found = find(child, targetPath);
-                if (found) return found;
-            }
-        }
-        return null;
-    }
-    return find(pathData, dirPath);
+    const lookup = getNavigationLookup();
+    return lookup ? getDirectoryIndexPath(lookup, lookup.directoryPaths.get(dirPath)) : null;
 }
 
-// 获取所有文档链接，按照path.json中从上到下的顺序
+// 获取所有文档链接，按照path.json中从上到下的顺序（由导航数据生成一次后复用，调用方不应修改）
 function getAllDocumentLinks() {
-    const links = [];
-    const addedPaths = new Set(); // 防止重复添加
-    
-    // 辅助函数：添加文档到列表（如果尚未添加）
-    function addDoc(path, title) {
-        if (!addedPaths.has(path)) {
-            links.push({ path, title });
-            addedPaths.add(path);
-            return true;
-        }
-        return false;
-    }
-    
-    // 按照定义顺序遍历整个文档树
-    function traverseInOrder(node) {
-        // 1. 首先添加当前节点的索引页（如果是目录且有索引页）
-        if (node.index) {
-            addDoc(node.index.path, node.index.title);
-        }
-        
-        // 2. 然后添加所有子节点
-        if (node.children && node.children.length > 0) {
-            for (const child of node.children) {
-                // 如果是文件（没有children），直接添加
-                if (!child.children || child.children.length === 0) {
-                    addDoc(child.path, child.title);
-                } else {
-                    // 如果是目录，先添加其索引页
-                    if (child.index) {
-                        addDoc(child.index.path, child.index.title);
-                    }
-                    
-                    // 然后遍历其子节点
-                    traverseInOrder(child);
-                }
-            }
-        }
-    }
-    
-    // 开始遍历
-    traverseInOrder(pathData);
-    
-    return links;
+    const lookup = getNavigationLookup();
+    return lookup ? lookup.links : [];
 }
 
 // 用户界面和主题相关工具函数
@@ -638,6 +661,54 @@ function filePathToUrl(path) {
     return generateNewUrl(path, currentRoot);
 }
 
+/**
+ * 把紧凑格式的path.json还原为完整格式
+ * 紧凑格式中贡献者信息集中在根节点的authors表中，节点按编号引用；完整格式原样返回
+ */
+function expandPathData(data) {
+    if (!data || data.format !== 2 || !Array.isArray(data.authors)) {
+        return data;
+    }
+    const authors = data.authors;
+    
+    function expandGit(git) {
+        const expanded = {};
+        if (git.last_modified) {
+            const author = authors[git.last_modified.author];
+            expanded.last_modified = {
+                timestamp: git.last_modified.timestamp,
+                author: author.name,
+                email: author.email,
+                message: git.last_modified.message,
+                github_username: author.github_username,
+                github_avatar: author.github_avatar
+            };
+        }
+        expanded.contributors = (git.contributors || []).map(([authorId, commits, lastCommitTimestamp]) => ({
+            name: authors[authorId].name,
+            email: authors[authorId].email,
+            commits: commits,
+            github_username: authors[authorId].github_username,
+            github_avatar: authors[authorId].github_avatar,
+            last_commit_timestamp: lastCommitTimestamp
+        }));
+        return expanded;
+    }
+    
+    function expandNode(node) {
+        const expanded = { ...node };
+        if (node.git) expanded.git = expandGit(node.git);
+        if (node.children) expanded.children = node.children.map(expandNode);
+        if (node.index && typeof node.index === 'object') expanded.index = expandNode(node.index);
+        return expanded;
+    }
+    
+    const expanded = expandNode(data);
+    delete expanded.format;
+    delete expanded.authors;
+    return expanded;
+}
+
 /**
  * 格式化时间戳
  */
@@ -697,6 +768,13 @@ export {
     getTitleFromPath,
     findIndexPath,
     getAllDocumentLinks,
+    findDocumentIndex,
+    getNodeByPath,
+    loadNavigationData,
+    buildNavigationData,
+    hashPathText,
+    isNavigationDataCurrent,
+    expandPathData,
     
     // 用户界面和主题相关
     isDarkMode,
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文档纯文本提取基准测试
+
+比较一次性处理全文（旧实现：读取整个文件、对全文执行全部正则替换后再截取）
+与流式提取（得到足够文本后即停止）在大文档和普通文档上的耗时。
+
+用法: python benchmarks/bench_extract.py [--size-mb 5] [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import build
+
+
+def write_markdown(file_path, target_bytes):
+    """生成一个类似更新日志的大Markdown文档"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("# 更新日志\n\n")
+        version = 0
+        while f.tell() < target_bytes:
+            version += 1
+            f.write(f"## v1.{version}.0\n\n")
+            f.write(f"- 修复了[问题 #{version}](https://example.com/issues/{version})中描述的 `config.json` 读取错误\n")
+            f.write("- 新增 **WebUI** 插件兼容说明，参见 <a href=\"#a\">文档</a>\n\n")
+            f.write("```python\nprint('hello world')\n```\n\n")
+
+
+def write_html(file_path, target_bytes):
+    """生成一个类似粘贴进来的参考手册的大HTML文档"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("<html><head><title>参考手册</title><style>p{}</style></head><body>\n")
+        section = 0
+        while f.tell() < target_bytes:
+            section += 1
+            f.write(f"<h2 id=\"s{section}\">第{section}节</h2>\n")
+            f.write(f"<p>接口 <code>api_{section}</code> 返回 <b>JSON</b> 数据 &amp; 状态码。</p>\n")
+        f.write("</body></html>\n")
+
+
+def write_small_markdown(file_path):
+    """生成一个普通大小的文档"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("# 快速开始\n\n")
+        for i in range(20):
+            f.write(f"## 步骤 {i}\n\n安装插件后修改[配置](config.md)中的 `port` 字段，然后重启服务器。\n\n")
+
+
+def extract_full(file_path, max_chars=1000):
+    """旧实现：读取整个文件，对全文提取纯文本和标题后再截取"""
+    ext = os.path.splitext(file_path)[1].lower()
+    with open(file_path, 'rb') as f:
+        text = build.read_document_text(f.read())
+    if ext == ".md":
+        content, headings = build.strip_markdown(text), build.extract_markdown_headings(text)
+    else:
+        parser = build.HTMLTextExtractor()
+        parser.feed(text)
+        content, headings = parser.get_text(), parser.headings
+    return content[:max_chars], headings
+
+
+def extract_streaming(file_path, max_chars=1000):
+    """新实现：流式提取，得到足够文本后停止"""
+    ext = os.path.splitext(file_path)[1].lower()
+    text = build.read_document_prefix(build.read_document_data(file_path))
+    return build.extract_text_and_headings(text, ext, max_chars)
+
+
+def measure(func, file_path, repeat):
+    """返回多次运行中的最短耗时（秒）和运行结果"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(file_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文档纯文本提取基准测试')
+    parser.add_argument('--size-mb', type=float, default=5, help='生成的大文档大小（MB）')
+    parser.add_argument('--repeat', type=int, default=5, help='每项测试的重复次数（取最短耗时）')
+    args = parser.parse_args()
+    
+    target_bytes = int(args.size_mb * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        documents = [
+            ("大Markdown", os.path.join(temp_dir, "changelog.md"), lambda p: write_markdown(p, target_bytes)),
+            ("大HTML", os.path.join(temp_dir, "reference.html"), lambda p: write_html(p, target_bytes)),
+            ("普通Markdown", os.path.join(temp_dir, "quickstart.md"), write_small_markdown),
+        ]
+        
+        print(f"{'文档':<14} {'大小':>10} {'全文处理(ms)':>14} {'流式提取(ms)':>14} {'加速':>8}  结果一致")
+        for name, file_path, generate in documents:
+            generate(file_path)
+            full_time, full_result = measure(extract_full, file_path, args.repeat)
+            streaming_time, streaming_result = measure(extract_streaming, file_path, args.repeat)
+            print(f"{name:<14} {os.path.getsize(file_path):>10} {full_time * 1000:>14.2f} "
+                  f"{streaming_time * 1000:>14.2f} {full_time / streaming_time:>7.1f}x  "
+                  f"{'是' if full_result == streaming_result else '否'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Git后端基准测试
+
+在同一个合成仓库（见 generate_corpus.py）上分别用GitPython后端和git命令行后端
+构建Git历史索引和作者身份索引，比较耗时和Python内存峰值，并检查两者的结果完全一致。
+未安装GitPython时只运行git命令行后端。
+
+用法: python benchmarks/bench_git.py [--files 2000] [--commits 5000] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import build
+from generate_corpus import generate_corpus, add_corpus_arguments
+
+
+def build_indexes(backend):
+    """用指定后端构建Git历史索引和作者身份索引"""
+    history_index = build.build_git_history_index(backend)
+    identity = build.build_author_identity_index(backend)
+    return history_index, identity
+
+
+def measure(backend, repeat):
+    """返回多次运行中的最短耗时（秒）、最后一次运行的Python内存峰值（字节）和结果"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = build_indexes(backend)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    build_indexes(backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Git后端基准测试')
+    add_corpus_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3, help='每个后端的运行次数（取最短耗时）')
+    parser.set_defaults(commits=2000, size=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        project_dir = os.path.join(temp_dir, "project")
+        corpus = generate_corpus(project_dir, files=args.files, depth=args.depth, size=args.size,
+                                 zh_ratio=args.zh_ratio, html_ratio=args.html_ratio,
+                                 commits=args.commits, authors=args.authors, seed=args.seed)
+        print(f"语料: {corpus['files']} 个文档，{corpus['commits']} 个提交，{corpus['authors']} 个作者")
+
+        backends = ["gitpython", "subprocess"] if build.GITPYTHON_AVAILABLE else ["subprocess"]
+        results = {}
+        print(f"{'后端':<12} {'耗时(ms)':>10} {'内存峰值(KB)':>14} {'文件数':>8}")
+        for name in backends:
+            backend = build.open_git_backend(project_dir, name)
+            seconds, peak, result = measure(backend, args.repeat)
+            results[name] = result
+            print(f"{name:<12} {seconds * 1000:>10.1f} {peak / 1024:>14.0f} {len(result[0]):>8}")
+
+        if len(results) > 1:
+            same = results["gitpython"] == results["subprocess"]
+            print(f"结果一致: {'是' if same else '否'}")
+            if not same:
+                sys.exit(1)
+        else:
+            print("未安装GitPython，跳过结果比较")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成文档站点生成器
+
+生成一个可以直接运行 build.py 的项目目录：复制站点骨架（assets、main、HTML文件、config.js等），
+按参数生成 data 目录下的文档树，并用 git fast-import 写入由多个作者完成的提交历史。
+相同参数和随机种子总是生成相同的文档内容和提交历史。
+
+用法: python benchmarks/generate_corpus.py OUTPUT_DIR [--files 500] [--depth 3] [--commits 200] [--authors 8]
+"""
+import os
+import sys
+import shutil
+import random
+import argparse
+import subprocess
+
+# 项目根目录（站点骨架从这里复制）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 复制到生成项目中的站点骨架文件
+SKELETON_PATHS = ["assets", "main", "index.html", "main.html", "header.html", "footer.html",
+                  "path-editor.html", "config.js", "meta.json", "requirements.txt", "build.py"]
+
+# 第一个提交的时间，之后每个提交间隔一小时
+START_TIMESTAMP = 1700000000
+
+ENGLISH_WORDS = [
+    "plugin", "server", "config", "install", "update", "player", "command", "permission",
+    "document", "search", "index", "module", "release", "version", "backup", "message",
+    "the", "and", "with", "for", "this", "that", "from", "when", "after", "before",
+]
+CHINESE_WORDS = [
+    "插件", "服务器", "配置", "安装", "更新", "玩家", "命令", "权限", "文档", "搜索",
+    "索引", "模块", "版本", "备份", "消息", "数据", "机器人", "接口", "功能", "问题",
+    "快速开始", "常见问题", "开发指南", "使用说明", "注意事项",
+]
+DIRECTORY_NAMES = ["guide", "api", "plugins", "reference", "faq", "dev",
+                   "指南", "接口", "插件", "参考", "常见问题", "开发"]
+
+
+def make_sentence(rng, zh_ratio):
+    """生成一句中英文混合的文本"""
+    words = []
+    for _ in range(rng.randint(6, 16)):
+        if rng.random() < zh_ratio:
+            words.append(rng.choice(CHINESE_WORDS))
+        else:
+            words.append(rng.choice(ENGLISH_WORDS))
+    separator = "" if rng.random() < zh_ratio else " "
+    return separator.join(words) + ("。" if separator == "" else ".")
+
+
+def make_title(rng, zh_ratio, index):
+    """生成文档标题"""
+    if rng.random() < zh_ratio:
+        return f"{rng.choice(CHINESE_WORDS)}{rng.choice(CHINESE_WORDS)} {index}"
+    return f"{rng.choice(ENGLISH_WORDS).title()} {rng.choice(ENGLISH_WORDS)} {index}"
+
+
+def make_markdown(rng, title, size, zh_ratio):
+    """生成大约size字节的Markdown文档（包含标题、链接、行内代码和代码块）"""
+    parts = [f"# {title}\n\n"]
+    length = len(parts[0].encode('utf-8'))
+    section = 0
+    while length < size:
+        section += 1
+        if section % 4 == 1:
+            block = f"## {make_title(rng, zh_ratio, section)}\n\n"
+        elif section % 7 == 0:
+            block = f"```python\nprint('{rng.choice(ENGLISH_WORDS)}')\n```\n\n"
+        else:
+            block = (f"{make_sentence(rng, zh_ratio)} [{rng.choice(ENGLISH_WORDS)}](../{rng.choice(ENGLISH_WORDS)}.md) "
+                     f"`{rng.choice(ENGLISH_WORDS)}` {make_sentence(rng, zh_ratio)}\n\n")
+        parts.append(block)
+        length += len(block.encode('utf-8'))
+    return "".join(parts)
+
+
+def make_html(rng, title, size, zh_ratio):
+    """生成大约size字节的HTML文档"""
+    parts = [f"<!DOCTYPE html>\n<html>\n<head><title>{title}</title></head>\n<body>\n<h1>{title}</h1>\n"]
+    length = len(parts[0].encode('utf-8'))
+    section = 0
+    while length < size:
+        section += 1
+        if section % 4 == 1:
+            block = f"<h2>{make_title(rng, zh_ratio, section)}</h2>\n"
+        else:
+            block = f"<p>{make_sentence(rng, zh_ratio)} <b>{rng.choice(ENGLISH_WORDS)}</b> {make_sentence(rng, zh_ratio)}</p>\n"
+        parts.append(block)
+        length += len(block.encode('utf-8'))
+    parts.append("</body>\n</html>\n")
+    return "".join(parts)
+
+
+def make_directories(rng, files, depth):
+    """生成目录列表（相对data目录），目录数量随文件数增长，最深depth层"""
+    directories = [""]
+    count = max(1, files // 10)
+    while len(directories) < count + 1:
+        parent = rng.choice(directories)
+        if parent.count('/') + (1 if parent else 0) >= depth:
+            continue
+        name = f"{rng.choice(DIRECTORY_NAMES)}-{len(directories)}"
+        directories.append(f"{parent}/{name}" if parent else name)
+    return directories
+
+
+def generate_documents(rng, files, depth, size, zh_ratio, html_ratio):
+    """生成文档内容，返回 {相对项目根目录的路径: 内容}"""
+    directories = make_directories(rng, files, depth)
+    documents = {}
+    for directory in directories:
+        # 每个目录都有索引页
+        if len(documents) >= files:
+            break
+        path = f"data/{directory}/README.md" if directory else "data/README.md"
+        documents[path] = make_markdown(rng, make_title(rng, zh_ratio, len(documents)), size, zh_ratio)
+
+    while len(documents) < files:
+        directory = rng.choice(directories)
+        title = make_title(rng, zh_ratio, len(documents))
+        file_size = max(64, int(rng.gauss(size, size / 3)))
+        if rng.random() < html_ratio:
+            name = f"page-{len(documents)}.html"
+            content = make_html(rng, title, file_size, zh_ratio)
+        else:
+            name = f"{title.replace(' ', '-')}.md"
+            content = make_markdown(rng, title, file_size, zh_ratio)
+        path = f"data/{directory}/{name}" if directory else f"data/{name}"
+        documents.setdefault(path, content)
+    return documents
+
+
+def fast_import_data(data):
+    """fast-import的data块"""
+    encoded = data.encode('utf-8')
+    return b"data " + str(len(encoded)).encode() + b"\n" + encoded + b"\n"
+
+
+def build_history_stream(rng, documents, commits, authors):
+    """
+    生成git fast-import输入流
+
+    第一个提交添加所有文档，之后的每个提交由随机作者修改1-5个文档（追加一行更新记录）。
+    返回 (输入流, 最终文档内容)。
+    """
+    people = [(f"Author {i}", f"author{i}@example.com") for i in range(authors)]
+    # 部分作者使用GitHub的noreply邮箱，覆盖用户名解析逻辑
+    for i in range(0, authors, 3):
+        people[i] = (f"Author {i}", f"{10000 + i}+author{i}@users.noreply.github.com")
+
+    documents = dict(documents)
+    paths = sorted(documents)
+    stream = []
+    for number in range(commits):
+        name, email = people[0] if number == 0 else rng.choice(people)
+        timestamp = START_TIMESTAMP + number * 3600
+        if number == 0:
+            changed = paths
+            message = "初始化文档"
+        else:
+            changed = rng.sample(paths, min(len(paths), rng.randint(1, 5)))
+            message = f"更新文档 #{number}"
+            for path in changed:
+                documents[path] += f"\n<!-- revision {number} by {name} -->\n"
+
+        stream.append(b"commit refs/heads/master\n")
+        stream.append(f"author {name} <{email}> {timestamp} +0800\n".encode('utf-8'))
+        stream.append(f"committer {name} <{email}> {timestamp} +0800\n".encode('utf-8'))
+        stream.append(fast_import_data(message))
+        for path in changed:
+            stream.append(f"M 100644 inline {path}\n".encode('utf-8'))
+            stream.append(fast_import_data(documents[path]))
+    stream.append(b"done\n")
+    return b"".join(stream), documents
+
+
+def copy_skeleton(output_dir):
+    """复制站点骨架文件"""
+    for name in SKELETON_PATHS:
+        source = os.path.join(PROJECT_ROOT, name)
+        target = os.path.join(output_dir, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, target, ignore=shutil.ignore_patterns('__pycache__'))
+        elif os.path.isfile(source):
+            shutil.copy2(source, target)
+
+
+def generate_corpus(output_dir, files=500, depth=3, size=3000, zh_ratio=0.6, html_ratio=0.1,
+                    commits=200, authors=8, seed=0):
+    """
+    生成合成项目，返回语料信息
+
+    commits为0时不创建Git仓库。
+    """
+    if os.path.exists(output_dir) and os.listdir(output_dir):
+        raise ValueError(f"输出目录 {output_dir} 不为空")
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+
+    copy_skeleton(output_dir)
+    documents = generate_documents(rng, files, depth, size, zh_ratio, html_ratio)
+
+    if commits > 0:
+        stream, documents = build_history_stream(rng, documents, commits, authors)
+        git_env = dict(os.environ, GIT_CONFIG_NOSYSTEM="1")
+        subprocess.run(["git", "init", "-q"], cwd=output_dir, check=True, env=git_env)
+        subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/master"], cwd=output_dir, check=True, env=git_env)
+        subprocess.run(["git", "fast-import", "--quiet"], cwd=output_dir, input=stream, check=True, env=git_env)
+        # 检出最后一个提交，工作区和索引与历史一致
+        subprocess.run(["git", "reset", "--hard", "-q"], cwd=output_dir, check=True, env=git_env)
+    else:
+        for path, content in documents.items():
+            file_path = os.path.join(output_dir, path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    return {
+        "files": len(documents),
+        "bytes": sum(len(content.encode('utf-8')) for content in documents.values()),
+        "depth": depth,
+        "size": size,
+        "zh_ratio": zh_ratio,
+        "html_ratio": html_ratio,
+        "commits": commits,
+        "authors": authors,
+        "seed": seed
+    }
+
+
+def add_corpus_arguments(parser):
+    """添加语料参数（生成器和基准测试运行器共用）"""
+    parser.add_argument('--files', type=int, default=500, help='文档数量')
+    parser.add_argument('--depth', type=int, default=3, help='目录最大深度')
+    parser.add_argument('--size', type=int, default=3000, help='文档平均大小（字节）')
+    parser.add_argument('--zh-ratio', type=float, default=0.6, help='中文词语所占比例（0-1）')
+    parser.add_argument('--html-ratio', type=float, default=0.1, help='HTML文档所占比例（0-1）')
+    parser.add_argument('--commits', type=int, default=200, help='提交数量（0表示不创建Git仓库）')
+    parser.add_argument('--authors', type=int, default=8, help='作者数量')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成用于基准测试的合成文档站点')
+    parser.add_argument('output_dir', help='输出目录（必须不存在或为空）')
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        corpus = generate_corpus(args.output_dir, args.files, args.depth, args.size, args.zh_ratio,
+                                 args.html_ratio, args.commits, args.authors, args.seed)
+    except ValueError as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+    print(f"已生成 {corpus['files']} 个文档（{corpus['bytes']} 字节），{corpus['commits']} 个提交: {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+build.py 基准测试运行器
+
+生成合成项目（见 generate_corpus.py），在其中多次运行 build.py，通过 --timings
+收集各阶段耗时（git、scan、merge、write、search、html_metadata、package等），
+输出JSON格式的结果。指定 --baseline 时与之前的结果比较，有阶段变慢超过容差时以非零状态退出。
+
+测试中可以直接调用 run_benchmarks() 和 find_regressions() 对结果进行断言。
+
+用法:
+    python benchmarks/run_benchmarks.py --files 2000 --commits 500 --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --tolerance 0.3
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from generate_corpus import generate_corpus, add_corpus_arguments
+
+RESULTS_VERSION = 1
+
+# 基准测试场景：名称 -> build.py参数
+SCENARIOS = {
+    # 完整构建（不查询GitHub API，不使用任何缓存）
+    "full": ["--no-github", "--no-git-cache", "--yes"],
+    # 使用Git历史缓存和文档清单的增量构建，并合并已有的path.json
+    "incremental": ["--no-github", "--incremental", "--merge", "--yes"],
+    # 创建更新包和初始包
+    "package": ["--package-all", "--package-output", "update.zip",
+                "--initial-package-output", "initial.zip", "--yes"],
+}
+
+
+def run_build(project_dir, build_args):
+    """在项目目录中运行一次build.py，返回 --timings 输出的结果"""
+    timings_file = os.path.join(project_dir, ".benchmark-timings.json")
+    command = [sys.executable, "build.py", *build_args, "--timings", timings_file]
+    completed = subprocess.run(command, cwd=project_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if completed.returncode != 0:
+        output = completed.stdout.decode('utf-8', errors='replace')
+        raise RuntimeError(f"build.py 运行失败（{' '.join(build_args)}）:\n{output}")
+    with open(timings_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def summarize_runs(runs):
+    """合并多次运行的结果：每个阶段取最短耗时（最不受干扰的一次）"""
+    phases = {}
+    for run in runs:
+        for name, seconds in run["phases"].items():
+            phases[name] = min(phases.get(name, seconds), seconds)
+    summary = {
+        "total": min(run["total"] for run in runs),
+        "phases": phases,
+        "runs": [run["total"] for run in runs]
+    }
+    for key in ("files", "directories"):
+        if key in runs[0]:
+            summary[key] = runs[0][key]
+    return summary
+
+
+def run_benchmarks(project_dir=None, repeat=3, scenarios=None, **corpus_options):
+    """
+    运行基准测试，返回结果字典
+
+    project_dir为None时在临时目录中生成合成项目，测试结束后删除；
+    corpus_options为 generate_corpus 的参数（files、depth、commits等）。
+    """
+    scenarios = scenarios or list(SCENARIOS)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        project_dir = project_dir or os.path.join(temp_dir, "project")
+        corpus = generate_corpus(project_dir, **corpus_options)
+
+        results = {"version": RESULTS_VERSION, "corpus": corpus, "scenarios": {}}
+        for name in scenarios:
+            build_args = SCENARIOS[name]
+            # 增量构建需要先完成一次构建，生成缓存和path.json
+            if name == "incremental":
+                run_build(project_dir, build_args)
+            runs = [run_build(project_dir, build_args) for _ in range(repeat)]
+            results["scenarios"][name] = summarize_runs(runs)
+        return results
+
+
+def find_regressions(results, baseline, tolerance=0.25, min_delta=0.05):
+    """
+    与基准结果比较，返回变慢的阶段列表 [(场景, 阶段, 基准耗时, 当前耗时)]
+
+    当前耗时超过基准的 (1 + tolerance) 倍，且绝对差值超过min_delta秒时视为变慢，
+    避免很短的阶段因计时误差被误报。
+    """
+    regressions = []
+    for scenario, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if not previous:
+            continue
+        checks = [("total", previous["total"], current["total"])]
+        checks.extend(
+            (phase, previous["phases"][phase], seconds)
+            for phase, seconds in current["phases"].items()
+            if phase in previous["phases"]
+        )
+        for phase, before, after in checks:
+            if after > before * (1 + tolerance) and after - before > min_delta:
+                regressions.append((scenario, phase, before, after))
+    return regressions
+
+
+def print_results(results):
+    """以表格形式输出结果"""
+    corpus = results["corpus"]
+    print(f"语料: {corpus['files']} 个文档，{corpus['bytes']} 字节，{corpus['commits']} 个提交，{corpus['authors']} 个作者")
+    for scenario, summary in results["scenarios"].items():
+        print(f"\n[{scenario}] 总耗时 {summary['total']:.3f}s")
+        for phase, seconds in summary["phases"].items():
+            print(f"  {phase:<16} {seconds:>8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='build.py 基准测试')
+    add_corpus_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3, help='每个场景的运行次数（各阶段取最短耗时）')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='只运行指定场景（可重复指定）')
+    parser.add_argument('--project-dir', help='在指定目录中生成合成项目并保留（默认使用临时目录）')
+    parser.add_argument('--output', help='把结果写入JSON文件')
+    parser.add_argument('--baseline', help='与之前的结果文件比较，有阶段变慢时以状态码1退出')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的变慢比例')
+    parser.add_argument('--min-delta', type=float, default=0.05, help='忽略小于该秒数的耗时差异')
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        project_dir=args.project_dir, repeat=args.repeat, scenarios=args.scenario,
+        files=args.files, depth=args.depth, size=args.size, zh_ratio=args.zh_ratio,
+        html_ratio=args.html_ratio, commits=args.commits, authors=args.authors, seed=args.seed
+    )
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"\n结果已写入: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print("\n检测到性能下降:")
+            for scenario, phase, before, after in regressions:
+                print(f"  [{scenario}] {phase}: {before:.3f}s -> {after:.3f}s")
+            sys.exit(1)
+        print("\n未检测到性能下降")
+
+
+if __name__ == '__main__':
+    main()
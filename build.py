@@ -12,23 +12,78 @@ import argparse
 import re
 import sys
 import datetime
-import urllib.request
-import urllib.error
+import hashlib
+import time
+import urllib.parse
+import threading
 from pathlib import Path
 from html.parser import HTMLParser
 import io
 import zipfile
 import shutil
-import tempfile
+import subprocess
+import codecs
 import glob
+import contextlib
+import html
+import gzip
+import math
+import collections
+import queue
+import fnmatch
+import copy
+import importlib.util
+import base64
+import struct
 
-# 导入Git相关库
+# Git相关库（GitPython）在第一次使用时才导入（见 import_git），--no-git 和打包时不会加载
+git = None
+GITPYTHON_AVAILABLE = importlib.util.find_spec("git") is not None
+# 未安装GitPython时使用git命令行读取Git历史（见 SubprocessGitBackend）
+GIT_AVAILABLE = GITPYTHON_AVAILABLE or shutil.which("git") is not None
+if not GIT_AVAILABLE:
+    print("警告: GitPython库未安装且找不到git命令，Git相关功能将被禁用。可通过 pip install gitpython 安装。")
+
+# 文件监听库（可选，未安装时监听模式使用轮询；进入监听模式时才导入）
+WATCHDOG_AVAILABLE = importlib.util.find_spec("watchdog") is not None
+
+# 导入Brotli压缩库（可选，未安装时只生成.gz预压缩文件）
 try:
-    import git
-    GIT_AVAILABLE = True
+    import brotli
+    BROTLI_AVAILABLE = True
 except ImportError:
-    GIT_AVAILABLE = False
-    print("警告: GitPython库未安装，Git相关功能将被禁用。可通过 pip install gitpython 安装。")
+    BROTLI_AVAILABLE = False
+
+# --timings 输出的各阶段耗时文件的格式版本
+PHASE_TIMINGS_VERSION = 1
+
+# 构建阶段名称（--profile-cprofile 可选的阶段）
+BUILD_PHASES = ["prefetch", "git", "scan", "merge", "write", "search", "compress", "html_metadata", "package"]
+
+# --profile 输出的性能分析报告的格式版本
+PROFILE_VERSION = 1
+
+# 文档解析只读取开头的MAX_EXTRACT_BYTES字节；超过上限的文件计算内容哈希时每次读取DOCUMENT_HASH_CHUNK_BYTES字节
+MAX_EXTRACT_BYTES = 8 * 1024 * 1024
+DOCUMENT_HASH_CHUNK_BYTES = 1024 * 1024
+# 流式提取纯文本时每段的最小字符数
+EXTRACT_CHUNK_CHARS = 4096
+
+# Markdown和HTML纯文本提取使用的正则表达式
+MARKDOWN_CODE_BLOCK_PATTERN = re.compile(r'```.*?```', re.DOTALL)
+MARKDOWN_INLINE_CODE_PATTERN = re.compile(r'`.*?`')
+MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+MARKDOWN_IMAGE_PATTERN = re.compile(r'!\[.*?\]\(.*?\)')
+MARKDOWN_HEADING_MARK_PATTERN = re.compile(r'#+\s')
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+NEWLINES_PATTERN = re.compile(r'\n+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# 代码块分隔行或标题行（去除首尾空白后以```或1-6个#加空白开头）
+MARKDOWN_HEADING_LINE_PATTERN = re.compile(r'^[^\S\n]*(?:(```)|(#{1,6})[^\S\n]+(\S.*))', re.MULTILINE)
+# 文档标题：第一个以"# "或"## "开头的行
+MARKDOWN_TITLE_PATTERN = re.compile(r'^[^\S\n]*##? (.*\S)', re.MULTILINE)
+HTML_IGNORED_BLOCK_PATTERN = re.compile(r'<!--.*?-->|<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+HTML_HEADING_PATTERN = re.compile(r'<h([1-6])\b[^>]*>(.*?)</h\1\s*>', re.IGNORECASE | re.DOTALL)
 
 # 默认配置
 DEFAULT_CONFIG = {
@@ -57,34 +112,173 @@ DEFAULT_CONFIG = {
         "favicon": "",
         "logo": "",
         "theme_color": ""
+    },
+    "search": {
+        "tokenizer": "cjk",                             # 分词方式：cjk（中文按二元切分）或 simple
+        "stopwords": []                                 # 额外的停用词
     }
 }
 
-# GitHub用户信息缓存
-GITHUB_USERS_CACHE = {}
-# 邮箱到GitHub用户名的映射缓存
-EMAIL_TO_USERNAME_MAP = {}
+# GitHub API地址（默认值，可以用 --github-api-url 或环境变量 GITHUB_API_URL 指定，如GitHub Enterprise或测试服务器）
+GITHUB_API_BASE_URL = "https://api.github.com"
+# GitHub API请求超时（秒）、最大并发数、最大重试次数和限流时的最长等待时间（秒）
+GITHUB_API_TIMEOUT = 5
+GITHUB_API_CONCURRENCY = 8
+GITHUB_API_MAX_RETRIES = 3
+GITHUB_API_MAX_WAIT = 60
+# GitHub缓存文件格式版本
+GITHUB_CACHE_VERSION = 1
+# GitHub缓存有效期（秒）：成功结果7天，未找到的用户1天
+GITHUB_CACHE_TTL = 7 * 24 * 3600
+GITHUB_NEGATIVE_CACHE_TTL = 24 * 3600
+
+# 停用词，不作为关键词和索引词条
+STOPWORDS = set(['的', '了', '和', '是', '在', '我', '有', '个', '与', '这', '你', '们',
+                 'the', 'and', 'is', 'in', 'to', 'of', 'a', 'for', 'on', 'that', 'by', 'this', 'with'])
+# 中文字符范围，中文感知分词时按二元切分
+CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff'
+CJK_CHAR_PATTERN = re.compile(f'[{CJK_CHARS}]')
+CJK_TOKEN_PATTERN = re.compile(f'[{CJK_CHARS}]+|[^\\W{CJK_CHARS}]+')
+# 倒排搜索索引格式版本和字段（字段在倒排记录中以序号表示）
+SEARCH_INDEX_VERSION = 3
+SEARCH_INDEX_FIELDS = ["title", "keywords", "content"]
+# 紧凑格式path.json的格式版本（完整格式没有format字段）
+PATH_FORMAT_VERSION = 2
+# 打包时不再压缩的文件类型（已经是压缩格式）
+PACKAGE_STORED_EXTENSIONS = {".png", ".ico", ".jpg", ".jpeg", ".gif", ".webp", ".woff", ".woff2", ".zip", ".gz", ".br"}
+# 打包时复制文件的缓冲区大小，以及SOURCE_DATE_EPOCH允许的最早时间（ZIP格式无法表示1980年以前的时间）
+PACKAGE_COPY_BUFFER = 1024 * 1024
+PACKAGE_MIN_TIMESTAMP = 315532800
+# 写入每个压缩包的文件清单（压缩包内路径 -> sha256）的文件名和格式版本
+PACKAGE_MANIFEST_NAME = "package-manifest.json"
+PACKAGE_MANIFEST_VERSION = 1
+# 初始包中data/README.md的内容
+INITIAL_DATA_README = '# EasyDocument\n\n这是您的文档目录，请在此处添加Markdown或HTML文档。'
+# 合并报告中的变化类型
+MERGE_CHANGE_KINDS = ["added", "removed", "moved", "retitled"]
+# 导航数据文件（nav.json）的格式版本
+NAVIGATION_VERSION = 2
+# 搜索索引分片清单的格式版本、文件名，以及分片文件名格式（内容哈希前16位）
+SEARCH_SHARD_VERSION = 2
+SEARCH_SHARD_MANIFEST = "manifest.json"
+SEARCH_SHARD_FILE_PATTERN = re.compile(r'^([0-9a-f]{16}\.json)(\.gz|\.br)?$')
+# 分片过滤器（布隆过滤器）中每个单字/二元字符组合占用的位数和哈希函数个数
+SEARCH_FILTER_BITS_PER_GRAM = 10
+SEARCH_FILTER_HASHES = 4
+# BM25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 参考查询实现中各字段的权重
+SEARCH_FIELD_WEIGHTS = {"title": 10.0, "keywords": 5.0, "content": 1.0}
+# 监听模式：检测间隔、防抖时间和检查Git提交的间隔（秒）
+WATCH_POLL_INTERVAL = 1.0
+WATCH_DEBOUNCE = 0.3
+WATCH_GIT_INTERVAL = 30
+# 监听模式下最后一次文档变化之后多少秒重新统计整个语料，刷新所有搜索条目的关键词、权重和倒排索引
+WATCH_SEARCH_REFRESH_DELAY = 5
+# 文档根目录下的忽略规则文件
+DOC_IGNORE_FILE = ".docignore"
+# 增量构建使用的文档清单格式版本
+DOCUMENT_MANIFEST_VERSION = 1
+
+class BuildCaches:
+    """
+    一次构建使用的缓存和设置
+    
+    每个Builder实例持有一份，在 Builder.activate() 期间成为当前线程的缓存；模块级函数通过
+    get_build_caches() 取得当前线程的缓存，没有Builder在当前线程运行时（直接调用模块函数、
+    进程池的子进程）使用模块默认的一份。不同线程中的Builder互不影响。
+    """
+    
+    def __init__(self):
+        # GitHub用户信息缓存
+        self.github_users = {}
+        # 作者身份索引，由 build_author_identity_index 构建（邮箱到GitHub用户名的映射由其推导，不单独缓存）
+        self.author_identity = None
+        # 每个线程复用的GitHub API连接，以及所有打开的连接（构建结束后统一关闭）
+        self.github_connections = threading.local()
+        self.github_open_connections = []
+        self.github_connections_lock = threading.Lock()
+        # 查询GitHub用户信息使用的API地址
+        self.github_api_url = os.environ.get("GITHUB_API_URL") or GITHUB_API_BASE_URL
+        # 增量构建的文档清单，未启用增量构建时为None
+        self.document_manifest = None
+        # 文档解析结果：文档路径 -> 标题、纯文本、标题列表和关键词
+        self.document_records = {}
+        # 当前使用的分词方式和停用词，由 configure_tokenizer 根据配置设置
+        self.search_tokenizer = {"name": "cjk", "stopwords": STOPWORDS}
+        # GitHub API限流状态，由同一次构建的各请求线程共享
+        self.github_rate_limit = {"remaining": None, "reset": None}
+        self.github_rate_limit_lock = threading.Lock()
+        # 各构建阶段的耗时（秒），--timings 时写入JSON文件
+        self.phase_timings = {}
+        # 性能分析数据，--profile 时启用
+        self.profile = {
+            "enabled": False,
+            "phases": {},           # 阶段名 -> {"wall": 秒, "cpu": 秒, "calls": 次数}
+            "counters": {},         # 计数器名 -> 数值（Git命令、HTTP请求、缓存命中、读写字节数等）
+            "documents": [],        # [(解析耗时, 文档路径)]
+            "cprofile_phase": None, # 使用cProfile分析的阶段
+            "cprofile": None        # 该阶段的cProfile.Profile对象
+        }
+        self.profile_lock = threading.Lock()
+
+# 没有Builder运行时使用的缓存，以及各线程当前使用的缓存
+DEFAULT_BUILD_CACHES = BuildCaches()
+ACTIVE_BUILD_CACHES = threading.local()
+
+def get_build_caches():
+    """返回当前线程使用的构建缓存"""
+    return getattr(ACTIVE_BUILD_CACHES, "caches", None) or DEFAULT_BUILD_CACHES
+
+@contextlib.contextmanager
+def use_build_caches(caches):
+    """在当前线程中使用指定的构建缓存（可以嵌套，结束后恢复之前的缓存）"""
+    previous = getattr(ACTIVE_BUILD_CACHES, "caches", None)
+    ACTIVE_BUILD_CACHES.caches = caches
+    try:
+        yield caches
+    finally:
+        ACTIVE_BUILD_CACHES.caches = previous
 
 # HTML解析器，用于从HTML文件中提取文本内容
 class HTMLTextExtractor(HTMLParser):
+    HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+
     def __init__(self):
         super().__init__()
         self.result = []
+        # get_text()结果的长度，用于判断是否已提取到足够的文本
+        self.text_length = -1
         self.skip = False
+        # 文档中的标题（h1-h6），在同一次解析中收集
+        self.headings = []
+        self.heading = None
 
     def handle_starttag(self, tag, attrs):
         if tag in ["script", "style"]:
             self.skip = True
+        elif tag in self.HEADING_TAGS:
+            self.heading = (int(tag[1]), [])
 
     def handle_endtag(self, tag):
         if tag in ["script", "style"]:
             self.skip = False
+        elif tag in self.HEADING_TAGS and self.heading:
+            level, parts = self.heading
+            text = " ".join(parts)
+            if text:
+                self.headings.append({"level": level, "text": text})
+            self.heading = None
 
     def handle_data(self, data):
         if not self.skip and data.strip():
             # 移除多余的换行符和空格
             cleaned_data = ' '.join(data.split())
             self.result.append(cleaned_data)
+            self.text_length += len(cleaned_data) + 1
+            if self.heading:
+                self.heading[1].append(cleaned_data)
 
     def get_text(self):
         return " ".join(self.result)
@@ -98,101 +292,749 @@ def is_index_file(filename, config):
     """检查文件是否为索引文件"""
     return filename in config["index_pages"]
 
+def parse_github_username_from_email(email):
+    """从GitHub的noreply邮箱中提取用户名，不是noreply邮箱时返回None"""
+    # GitHub自动生成的noreply邮箱格式为：数字+用户名@users.noreply.github.com 或 用户名@users.noreply.github.com
+    noreply_match = re.match(r'(?:\d+\+)?(.+)@users\.noreply\.github\.com', email)
+    if not noreply_match:
+        return None
+    
+    username = noreply_match.group(1)
+    # 修正：如果用户名中包含'+'，只取'+'后部分
+    if '+' in username:
+        username = username.split('+')[-1]
+    return username
+
+def load_author_map(map_file):
+    """
+    加载作者到GitHub用户名的覆盖映射文件（类似.mailmap的格式）
+    
+    每行一条记录，#开头为注释：
+        GitHub用户名 <邮箱>
+        GitHub用户名 作者名
+    """
+    email_overrides = {}
+    name_overrides = {}
+    if not map_file or not os.path.exists(map_file):
+        return email_overrides, name_overrides
+    
+    try:
+        with open(map_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                email_match = re.match(r'(\S+)\s+<([^>]+)>$', line)
+                if email_match:
+                    email_overrides[email_match.group(2).strip()] = email_match.group(1)
+                    continue
+                name_match = re.match(r'(\S+)\s+(.+)$', line)
+                if name_match:
+                    name_overrides[name_match.group(2).strip()] = name_match.group(1)
+                else:
+                    print(f"无法解析作者映射: {line}")
+    except Exception as e:
+        print(f"加载作者映射文件 {map_file} 失败: {e}")
+    
+    return email_overrides, name_overrides
+
+def build_author_identity_index(repo, map_file=None, rev='HEAD'):
+    """
+    遍历一次提交日志，构建作者身份索引
+    
+    索引包含：作者名 -> noreply邮箱中的GitHub用户名、邮箱 -> 使用过的作者名（按提交从新到旧），
+    以及映射文件中的覆盖项，之后所有查询都是字典查找。邮箱对应的GitHub用户名完全由索引推导，
+    查询结果记在索引的email_to_username中，随索引一起重建。
+    """
+    caches = get_build_caches()
+    email_overrides, name_overrides = load_author_map(map_file)
+    name_to_username = {}
+    email_to_names = {}
+    
+    try:
+        profile_count("git_commands")
+        output = repo.log(rev, f'--format=%an{GIT_LOG_FIELD_SEP}%ae')
+        for line in split_git_output(output, '\n'):
+            if not line:
+                continue
+            author_name, _, author_email = line.partition(GIT_LOG_FIELD_SEP)
+            names = email_to_names.setdefault(author_email, [])
+            if author_name not in names:
+                names.append(author_name)
+            if author_name not in name_to_username:
+                username = parse_github_username_from_email(author_email)
+                if username:
+                    name_to_username[author_name] = username
+    except Exception as e:
+        print(f"构建作者身份索引失败: {e}")
+    
+    caches.author_identity = {
+        "email_overrides": email_overrides,
+        "name_overrides": name_overrides,
+        "name_to_username": name_to_username,
+        "email_to_names": email_to_names,
+        "email_to_username": {}
+    }
+    return caches.author_identity
+
 def get_github_username_by_email(email, repo):
     """根据邮箱地址获取GitHub用户名"""
-    if email in EMAIL_TO_USERNAME_MAP:
-        return EMAIL_TO_USERNAME_MAP[email]
+    caches = get_build_caches()
+    identity = caches.author_identity
+    if identity is None:
+        identity = build_author_identity_index(repo)
+    
+    if email in identity["email_to_username"]:
+        return identity["email_to_username"][email]
+    
+    # 映射文件中的覆盖项优先
+    username = identity["email_overrides"].get(email)
+    author_names = identity["email_to_names"].get(email, [])
+    if not username:
+        for author_name in author_names:
+            username = identity["name_overrides"].get(author_name)
+            if username:
+                break
+    if not username:
+        username = parse_github_username_from_email(email)
+    
+    # 查找该邮箱使用过的作者名，尝试通过同名作者的noreply邮箱找到GitHub用户名
+    if not username:
+        for author_name in author_names:
+            username = identity["name_to_username"].get(author_name)
+            if username:
+                break
+    
+    # 如果无法找到对应的GitHub用户名，记录为None
+    identity["email_to_username"][email] = username
+    return username
+
+def get_github_connection():
+    """获取当前线程到GitHub API的长连接（每个线程复用同一连接）"""
+    caches = get_build_caches()
+    import http.client
+    connection = getattr(caches.github_connections, 'connection', None)
+    if connection is None:
+        url = urllib.parse.urlsplit(caches.github_api_url)
+        if url.scheme == 'http':
+            connection = http.client.HTTPConnection(url.netloc, timeout=GITHUB_API_TIMEOUT)
+        else:
+            connection = http.client.HTTPSConnection(url.netloc, timeout=GITHUB_API_TIMEOUT)
+        caches.github_connections.connection = connection
+        with caches.github_connections_lock:
+            caches.github_open_connections.append(connection)
+    return connection
+
+def reset_github_connection():
+    """关闭并丢弃当前线程的GitHub API连接，下次请求时重新建立"""
+    caches = get_build_caches()
+    connection = getattr(caches.github_connections, 'connection', None)
+    if connection is None:
+        return
+    caches.github_connections.connection = None
+    with caches.github_connections_lock:
+        if connection in caches.github_open_connections:
+            caches.github_open_connections.remove(connection)
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+def close_github_connections():
+    """关闭所有线程打开的GitHub API连接"""
+    caches = get_build_caches()
+    with caches.github_connections_lock:
+        for connection in caches.github_open_connections:
+            connection.close()
+        caches.github_open_connections.clear()
+    caches.github_connections.connection = None
+
+def update_github_rate_limit(headers):
+    """根据响应头记录GitHub API剩余请求次数和重置时间"""
+    remaining = headers.get('X-RateLimit-Remaining')
+    reset = headers.get('X-RateLimit-Reset')
+    caches = get_build_caches()
+    with caches.github_rate_limit_lock:
+        if remaining is not None and remaining.isdigit():
+            caches.github_rate_limit["remaining"] = int(remaining)
+        if reset is not None and reset.isdigit():
+            caches.github_rate_limit["reset"] = int(reset)
+
+def get_github_rate_limit_wait():
+    """返回在发出下一个请求前需要等待的秒数，额度未耗尽时为0"""
+    caches = get_build_caches()
+    with caches.github_rate_limit_lock:
+        if caches.github_rate_limit["remaining"] != 0:
+            return 0
+        return max(0, (caches.github_rate_limit["reset"] or 0) - int(time.time()))
+
+def request_github_user(username):
+    """
+    请求GitHub用户信息，返回 (HTTP状态码, 用户数据)
+    
+    遇到限流时根据 Retry-After 或 X-RateLimit-Reset 等待后重试，
+    等待时间超过 GITHUB_API_MAX_WAIT 时放弃；网络错误和5xx错误按指数退避重试。
+    请求失败且没有状态码时返回 (None, None)。
+    """
+    caches = get_build_caches()
+    import http.client
+    path = urllib.parse.urlsplit(caches.github_api_url).path.rstrip('/') + '/users/' + urllib.parse.quote(username)
+    headers = {
+        # 添加User-Agent避免API限制
+        'User-Agent': 'EasyDocument-Build-Script',
+        'Accept': 'application/vnd.github+json'
+    }
+    
+    for attempt in range(GITHUB_API_MAX_RETRIES + 1):
+        wait = get_github_rate_limit_wait()
+        if wait > GITHUB_API_MAX_WAIT:
+            print(f"GitHub API请求额度已用完，跳过用户 {username}")
+            return None, None
+        if wait:
+            time.sleep(wait)
         
-    # 尝试提取GitHub自动生成的noreply邮箱中的用户ID
-    # 格式通常是：数字+用户名@users.noreply.github.com
-    noreply_match = re.match(r'(\d+)\+(.+)@users\.noreply\.github\.com', email)
-    if noreply_match:
-        username = noreply_match.group(2)
-        # 修正：如果用户名中包含'+'，只取'+'后部分
-        if '+' in username:
-            username = username.split('+')[-1]
-        EMAIL_TO_USERNAME_MAP[email] = username
-        return username
+        try:
+            connection = get_github_connection()
+            profile_count("http_requests")
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError) as e:
+            # 连接可能已被服务器关闭，关闭并丢弃后重新建立
+            reset_github_connection()
+            if attempt < GITHUB_API_MAX_RETRIES:
+                time.sleep(2 ** attempt)
+                continue
+            print(f"获取GitHub用户 {username} 头像失败: {e}")
+            return None, None
         
-    # 另一种GitHub邮箱格式：用户名@users.noreply.github.com
-    noreply_match2 = re.match(r'(.+)@users\.noreply\.github\.com', email)
-    if noreply_match2:
-        username = noreply_match2.group(1)
-        # 修正：如果用户名中包含'+'，只取'+'后部分
-        if '+' in username:
-            username = username.split('+')[-1]
-        EMAIL_TO_USERNAME_MAP[email] = username
-        return username
-    
-    # 查找用户名关联的所有提交，尝试找到GitHub用户名
-    try:
-        all_commits = list(repo.iter_commits(max_count=500))
-        for commit in all_commits:
-            # 如果提交的邮箱与当前邮箱匹配
-            if commit.author.email == email:
-                # 检查是否有GitHub格式的用户名邮箱
-                for other_commit in all_commits:
-                    if other_commit.author.name == commit.author.name and '@users.noreply.github.com' in other_commit.author.email:
-                        noreply_match = re.match(r'(\d+)\+(.+)@users\.noreply\.github\.com', other_commit.author.email)
-                        if noreply_match:
-                            username = noreply_match.group(2)
-                            if '+' in username:
-                                username = username.split('+')[-1]
-                            EMAIL_TO_USERNAME_MAP[email] = username
-                            return username
-                        
-                        noreply_match2 = re.match(r'(.+)@users.noreply.github.com', other_commit.author.email)
-                        if noreply_match2:
-                            username = noreply_match2.group(1)
-                            if '+' in username:
-                                username = username.split('+')[-1]
-                            EMAIL_TO_USERNAME_MAP[email] = username
-                            return username
-    except Exception as e:
-        print(f"查找GitHub用户名失败: {e}")
+        update_github_rate_limit(response.headers)
+        status = response.status
+        
+        if status == 200:
+            try:
+                return status, json.loads(body.decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"获取GitHub用户 {username} 头像失败: {e}")
+                return None, None
+        
+        if status in (403, 429) and attempt < GITHUB_API_MAX_RETRIES:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                wait = int(retry_after)
+            else:
+                wait = get_github_rate_limit_wait() or 2 ** attempt
+            if wait <= GITHUB_API_MAX_WAIT:
+                print(f"GitHub API限流，{wait} 秒后重试: {username}")
+                time.sleep(wait)
+                continue
+        elif status >= 500 and attempt < GITHUB_API_MAX_RETRIES:
+            time.sleep(2 ** attempt)
+            continue
+        
+        print(f"获取GitHub用户 {username} 头像失败: HTTP {status}")
+        return status, None
     
-    # 如果无法找到对应的GitHub用户名，返回None
-    EMAIL_TO_USERNAME_MAP[email] = None
-    return None
+    return None, None
 
 def get_github_avatar_url(username):
     """获取GitHub用户头像URL"""
+    caches = get_build_caches()
     if not username:
         return None
         
     # 检查缓存
-    if username in GITHUB_USERS_CACHE:
-        return GITHUB_USERS_CACHE[username]['avatar_url']
+    if username in caches.github_users:
+        return caches.github_users[username]['avatar_url']
     
     # 调用GitHub API获取用户信息
+    status, data = request_github_user(username)
+    if status == 200:
+        try:
+            # 缓存结果
+            caches.github_users[username] = {
+                'avatar_url': data['avatar_url'],
+                'login': data['login'],
+                'html_url': data['html_url'],
+                'fetched_at': int(time.time())
+            }
+            return data['avatar_url']
+        except (KeyError, TypeError) as e:
+            print(f"获取GitHub用户 {username} 头像失败: {e}")
+    elif status == 404:
+        # 用户不存在，记录为未找到，避免重复查询
+        caches.github_users[username] = {
+            'avatar_url': None,
+            'login': None,
+            'html_url': None,
+            'missing': True,
+            'fetched_at': int(time.time())
+        }
+        return None
+    
+    # 临时性错误（网络、限流等）只在本次运行内缓存，不写入缓存文件
+    caches.github_users[username] = {
+        'avatar_url': None,
+        'login': None,
+        'html_url': None,
+        'fetched_at': None
+    }
+    return None
+
+def resolve_github_users(usernames, concurrency=None):
+    """批量并发获取尚未缓存的GitHub用户信息，结果写入当前构建缓存的GitHub用户信息缓存"""
+    import concurrent.futures
+    caches = get_build_caches()
+    requested = {name for name in usernames if name}
+    pending = sorted(name for name in requested if name not in caches.github_users)
+    profile_count("github_cache_hits", len(requested) - len(pending))
+    profile_count("github_cache_misses", len(pending))
+    if not pending:
+        return 0
+    
+    workers = max(1, min(concurrency or GITHUB_API_CONCURRENCY, len(pending)))
     try:
-        request = urllib.request.Request(f"https://api.github.com/users/{username}")
-        # 添加User-Agent避免API限制
-        request.add_header('User-Agent', 'EasyDocument-Build-Script')
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            # 工作线程使用与调用方相同的构建缓存
+            def fetch_user(username):
+                with use_build_caches(caches):
+                    return get_github_avatar_url(username)
+            list(executor.map(fetch_user, pending))
+    finally:
+        close_github_connections()
+    return len(pending)
+
+def collect_github_usernames(repo, history_index, root_dir):
+    """收集文档目录下所有文件的作者对应的GitHub用户名"""
+    prefix = os.path.relpath(os.path.abspath(root_dir), repo.working_dir).replace("\\", "/")
+    prefix = '' if prefix == '.' else prefix + '/'
+    
+    emails = set()
+    for path, entry in history_index.items():
+        if path.startswith(prefix):
+            emails.add(entry["last_commit"]["email"])
+            emails.update(author["email"] for author in entry["authors"].values())
+    
+    usernames = set()
+    for email in emails:
+        username = get_github_username_by_email(email, repo)
+        if username:
+            usernames.add(username)
+    return usernames
+
+def load_github_cache(cache_file, refresh=False):
+    """加载持久化的GitHub用户信息缓存（包括未找到的用户），跳过已过期的条目"""
+    caches = get_build_caches()
+    if refresh:
+        print("已忽略GitHub用户缓存，将重新查询")
+        return
+    try:
+        if not os.path.exists(cache_file):
+            return
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("version") != GITHUB_CACHE_VERSION:
+            print("GitHub用户缓存版本不匹配，将重新查询")
+            return
         
-        with urllib.request.urlopen(request, timeout=5) as response:
-            if response.getcode() == 200:
-                data = json.loads(response.read().decode('utf-8'))
-                # 缓存结果
-                GITHUB_USERS_CACHE[username] = {
-                    'avatar_url': data['avatar_url'],
-                    'login': data['login'],
-                    'html_url': data['html_url']
-                }
-                return data['avatar_url']
-    except (urllib.error.URLError, urllib.error.HTTPError, json.JSONDecodeError, KeyError, TimeoutError) as e:
-        print(f"获取GitHub用户 {username} 头像失败: {e}")
+        now = int(time.time())
+        loaded_users = 0
+        for username, entry in cache.get("users", {}).items():
+            ttl = GITHUB_NEGATIVE_CACHE_TTL if entry.get("missing") else GITHUB_CACHE_TTL
+            if entry.get("fetched_at") and now - entry["fetched_at"] < ttl:
+                caches.github_users[username] = entry
+                loaded_users += 1
+        
+        print(f"已加载GitHub用户缓存: {loaded_users} 个用户")
+    except Exception as e:
+        print(f"加载GitHub用户缓存失败: {e}")
+
+def save_github_cache(cache_file):
+    """
+    保存GitHub用户信息缓存（临时性错误的结果不会被保存）
+    
+    邮箱到用户名的映射每次构建由作者身份索引推导，不写入缓存文件。
+    """
+    caches = get_build_caches()
+    users = {
+        username: entry
+        for username, entry in caches.github_users.items()
+        if entry.get("fetched_at")
+    }
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        temp_file = cache_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": GITHUB_CACHE_VERSION, "users": users}, f, ensure_ascii=False, indent=4)
+        os.replace(temp_file, cache_file)
+    except Exception as e:
+        print(f"保存GitHub用户缓存失败: {e}")
+
+def import_git():
+    """导入GitPython（第一次调用时加载，之后直接返回已导入的模块）"""
+    global git
+    if git is None:
+        import git as git_module
+        git = git_module
+    return git
+
+class GitPythonBackend:
+    """使用GitPython读取Git仓库（git log的输出一次性读入内存）"""
+    name = "gitpython"
+    
+    def __init__(self, path):
+        self.repo = import_git().Repo(path, search_parent_directories=True)
+        self.working_dir = self.repo.working_dir
+    
+    def head(self):
+        """当前HEAD的提交哈希"""
+        return self.repo.head.commit.hexsha
+    
+    def is_ancestor(self, ancestor, rev):
+        """ancestor是否为rev的祖先"""
+        return self.repo.is_ancestor(ancestor, rev)
+    
+    def log(self, *args):
+        """运行git log，逐块返回输出文本"""
+        yield self.repo.git.log(*args)
+
+class SubprocessGitBackend:
+    """
+    直接调用git命令行读取Git仓库（不需要GitPython）
+    
+    git log由一个子进程完成，输出按块流式读取和解码，不需要把完整的历史保存在内存中。
+    """
+    name = "subprocess"
+    # 每次从git log输出中读取的字节数
+    chunk_size = 64 * 1024
+    
+    def __init__(self, path):
+        self.working_dir = self.run("rev-parse", "--show-toplevel", cwd=path).strip()
+    
+    def run(self, *args, cwd=None):
+        """运行git命令，返回输出文本，失败时抛出RuntimeError"""
+        completed = subprocess.run(["git", *args], cwd=cwd or self.working_dir,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            raise RuntimeError(f"git {args[0]} 失败: {completed.stderr.decode('utf-8', errors='replace').strip()}")
+        return completed.stdout.decode('utf-8', errors='replace')
+    
+    def head(self):
+        """当前HEAD的提交哈希"""
+        return self.run("rev-parse", "HEAD").strip()
+    
+    def is_ancestor(self, ancestor, rev):
+        """ancestor是否为rev的祖先"""
+        completed = subprocess.run(["git", "merge-base", "--is-ancestor", ancestor, rev], cwd=self.working_dir,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return completed.returncode == 0
+    
+    def log(self, *args):
+        """运行git log，逐块返回输出文本（子进程输出读完后检查退出状态）"""
+        process = subprocess.Popen(["git", "log", *args], cwd=self.working_dir,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            while True:
+                data = process.stdout.read(self.chunk_size)
+                if not data:
+                    break
+                yield decoder.decode(data)
+            yield decoder.decode(b'', final=True)
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                raise RuntimeError(f"git log 失败: {stderr.decode('utf-8', errors='replace').strip()}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+# 可用的Git后端
+GIT_BACKENDS = {
+    "gitpython": GitPythonBackend,
+    "subprocess": SubprocessGitBackend
+}
+
+def open_git_backend(path, backend="auto"):
+    """
+    打开path所在的Git仓库，返回Git后端对象，不在Git仓库中时返回None
+    
+    backend为auto时，安装了GitPython则使用GitPython，否则使用git命令行。
+    """
+    if backend == "auto":
+        backend = "gitpython" if GITPYTHON_AVAILABLE else "subprocess"
+    if backend == "gitpython":
+        git = import_git()
+        try:
+            return GitPythonBackend(path)
+        except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+            return None
+    try:
+        return SubprocessGitBackend(path)
+    except RuntimeError:
+        return None
+
+def split_git_output(chunks, separator):
+    """把逐块读取的git输出按分隔符切分，逐条返回（最后一条为分隔符之后的剩余内容）"""
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        if separator not in chunk:
+            continue
+        *records, pending = pending.split(separator)
+        yield from records
+    yield pending
+
+# Git日志输出格式：记录以\x1e开头，字段之间以\x1f分隔，文件列表在最后一个字段之后
+GIT_LOG_RECORD_SEP = '\x1e'
+GIT_LOG_FIELD_SEP = '\x1f'
+GIT_LOG_FORMAT = '%x1e%H%x1f%P%x1f%an%x1f%ae%x1f%ct%x1f%B%x1f'
+# Git历史索引缓存格式版本，格式变化时递增以使旧缓存失效
+GIT_CACHE_VERSION = 2
+# git log中的一条提交记录
+GitLogRecord = collections.namedtuple("GitLogRecord", ["sha", "author", "email", "timestamp", "message", "paths"])
+
+def parse_git_log_changes(changes):
+    """解析 git log -z --name-status 输出中的文件变更列表，返回涉及的文件路径"""
+    tokens = changes.lstrip('\0\n').split('\0')
+    paths = []
+    i = 0
+    while i < len(tokens):
+        status = tokens[i].strip()
+        if not status:
+            i += 1
+            continue
+        if status[0] in ('R', 'C'):
+            # 重命名/复制记录包含旧路径和新路径，两者都视为被该提交修改
+            paths.extend(p for p in tokens[i + 1:i + 3] if p)
+            i += 3
+        else:
+            if i + 1 < len(tokens) and tokens[i + 1]:
+                paths.append(tokens[i + 1])
+            i += 2
+    return paths
+
+def get_merge_first_parent_changes(repo, rev='HEAD'):
+    """返回 合并提交 -> 相对于第一个父提交有变化的文件路径集合"""
+    profile_count("git_commands")
+    output = repo.log(rev, '--merges', '--diff-merges=first-parent', '-z', '--name-status', '--format=%x1e%H%x1f')
+    changes = {}
+    for record in split_git_output(output, GIT_LOG_RECORD_SEP):
+        sha, separator, paths = record.partition(GIT_LOG_FIELD_SEP)
+        if separator:
+            changes[sha] = set(parse_git_log_changes(paths))
+    return changes
+
+# 提交在历史简化中对哪些文件路径可达：(True, 路径集合) 表示除这些路径之外的所有路径，
+# (False, 路径集合) 表示只有这些路径
+GIT_REACH_ALL = (True, frozenset())
+
+def intersect_git_reach(reach, edge):
+    """沿父提交边传递可达路径：同时在reach和edge中的路径"""
+    (reach_all, reach_paths), (edge_all, edge_paths) = reach, edge
+    if reach_all and edge_all:
+        return True, reach_paths | edge_paths
+    if reach_all:
+        return False, edge_paths - reach_paths
+    if edge_all:
+        return False, reach_paths - edge_paths
+    return False, reach_paths & edge_paths
+
+def union_git_reach(first, second):
+    """合并从不同子提交到达同一提交的可达路径"""
+    (first_all, first_paths), (second_all, second_paths) = first, second
+    if first_all and second_all:
+        return True, first_paths & second_paths
+    if first_all:
+        return True, first_paths - second_paths
+    if second_all:
+        return True, second_paths - first_paths
+    return False, first_paths | second_paths
+
+def iter_git_log_records(repo, rev='HEAD'):
+    """
+    单次遍历Git日志，逐条返回提交信息及其修改的文件路径（GitLogRecord）
+    
+    与 git log -- <路径> 的默认历史简化一致：合并提交中与某个父提交相同（TREESAME）的文件
+    只沿第一个这样的父提交继续查找，因此被合并丢弃的分支提交（如 -s ours 合并、冲突时保留一侧）
+    不会计入该文件的历史。每个提交只返回它对之可达的文件路径，可达路径随父提交边向下传递，
+    提交按 --date-order 输出，保证子提交先于父提交处理。章鱼合并（多于两个父提交）的第三个及之后的
+    父提交按第二个父提交处理。
+    """
+    first_parent_changes = get_merge_first_parent_changes(repo, rev)
+    # -c 使合并提交中与所有父提交都不同的文件也被列出，这些文件沿所有父提交继续查找
+    profile_count("git_commands")
+    output = repo.log(rev, '--date-order', '-z', '-c', '--name-status', f'--format={GIT_LOG_FORMAT}')
+    # 尚未处理的提交 -> 可达路径（从未出现的提交是遍历的起点，对所有路径可达）
+    pending = {}
+    for record in split_git_output(output, GIT_LOG_RECORD_SEP):
+        fields = record.split(GIT_LOG_FIELD_SEP, 6)
+        if len(fields) < 7:
+            continue
+        profile_count("git_commits")
+        sha, parents, author_name, author_email, committed_date, message, changes = fields
+        parents = parents.split()
+        paths = parse_git_log_changes(changes)
+        reach_all, reach_paths = reach = pending.pop(sha, GIT_REACH_ALL)
+        
+        if len(parents) > 1:
+            # 与所有父提交都不同的文件沿所有父提交查找；只与第一个父提交不同的文件沿其他父提交查找，
+            # 其余文件与第一个父提交相同，只沿第一个父提交查找
+            changed_paths = frozenset(paths)
+            first_changes = frozenset(first_parent_changes.get(sha, ()))
+            edges = [(True, first_changes - changed_paths)] + [(False, first_changes)] * (len(parents) - 1)
+        else:
+            edges = [GIT_REACH_ALL] * len(parents)
+        for parent, edge in zip(parents, edges):
+            parent_reach = intersect_git_reach(reach, edge)
+            if parent in pending:
+                parent_reach = union_git_reach(pending[parent], parent_reach)
+            pending[parent] = parent_reach
+        
+        paths = [path for path in paths if (path in reach_paths) != reach_all]
+        yield GitLogRecord(sha, author_name, author_email, int(committed_date), message, paths)
+
+def add_commit_to_git_index(index, commit):
+    """将一条提交记录累加到Git历史索引中（提交需按从新到旧的顺序加入）"""
+    for path in dict.fromkeys(commit.paths):
+        entry = index.get(path)
+        if entry is None:
+            # 第一次遇到的提交即为该文件的最后一次提交
+            entry = index[path] = {
+                "last_commit": {
+                    "timestamp": commit.timestamp,
+                    "author": commit.author,
+                    "email": commit.email,
+                    "message": commit.message.strip()
+                },
+                "authors": {}
+            }
+        author = entry["authors"].get(commit.author)
+        if author is None:
+            author = entry["authors"][commit.author] = {
+                "name": commit.author,
+                "email": commit.email,
+                "commits": 0,
+                "last_commit_timestamp": commit.timestamp
+            }
+        author["commits"] += 1
+        if commit.timestamp > author["last_commit_timestamp"]:
+            author["last_commit_timestamp"] = commit.timestamp
+
+def build_git_history_index(repo, rev='HEAD'):
+    """
+    单次遍历Git历史，构建 文件路径 -> 最后提交与作者提交统计 的索引
     
+    路径为相对于仓库根目录、使用斜杠分隔的路径。
+    """
+    index = {}
+    for commit in iter_git_log_records(repo, rev):
+        add_commit_to_git_index(index, commit)
+    return index
+
+def merge_git_history_index(newer, older):
+    """合并两段Git历史索引，newer 为较新提交区间的索引，older 为之前的索引（会被原地更新）"""
+    for path, new_entry in newer.items():
+        old_entry = older.get(path)
+        if old_entry is not None:
+            authors = new_entry["authors"]
+            for name, old_author in old_entry["authors"].items():
+                author = authors.get(name)
+                if author is None:
+                    authors[name] = old_author
+                else:
+                    author["commits"] += old_author["commits"]
+                    if old_author["last_commit_timestamp"] > author["last_commit_timestamp"]:
+                        author["last_commit_timestamp"] = old_author["last_commit_timestamp"]
+        older[path] = new_entry
+    return older
+
+def load_git_history_cache(cache_file):
+    """加载Git历史索引缓存文件"""
+    try:
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get("version") == GIT_CACHE_VERSION and cache.get("head") and isinstance(cache.get("index"), dict):
+                return cache
+            print("Git历史索引缓存版本不匹配，将重新构建")
+    except Exception as e:
+        print(f"加载Git历史索引缓存失败: {e}")
     return None
 
-def get_git_info(repo, file_path, config):
+def save_git_history_cache(cache_file, head, history_index):
+    """保存Git历史索引缓存文件（先写临时文件再替换，避免中断时留下损坏的缓存）"""
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        temp_file = cache_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": GIT_CACHE_VERSION, "head": head, "index": history_index}, f, ensure_ascii=False)
+        os.replace(temp_file, cache_file)
+    except Exception as e:
+        print(f"保存Git历史索引缓存失败: {e}")
+
+def git_range_has_merges(repo, rev):
+    """提交区间中是否包含合并提交"""
+    profile_count("git_commands")
+    return any(chunk.strip() for chunk in repo.log(rev, '--merges', '-n', '1', '--format=%H'))
+
+def load_or_build_git_history_index(repo, cache_file=None):
+    """
+    获取Git历史索引，优先使用缓存
+    
+    缓存记录了上次索引时的HEAD，如果它仍是当前HEAD的祖先，则只遍历两者之间的新提交；
+    否则（例如强制推送或历史被改写）重新遍历全部历史。新提交中包含合并提交时也重新遍历：
+    合并可能丢弃缓存的HEAD一侧对某些文件的修改，历史简化后这些文件不再沿该侧查找，
+    缓存中已计入的提交就不应再保留，而只遍历新提交无法发现这一点。
+    """
+    head = repo.head()
+    cache = load_git_history_cache(cache_file) if cache_file else None
+    
+    if cache:
+        cached_head = cache["head"]
+        if cached_head == head:
+            print(f"Git历史索引缓存命中: {head[:7]}")
+            profile_count("git_cache_hits")
+            return cache["index"]
+        
+        try:
+            profile_count("git_commands")
+            is_ancestor = repo.is_ancestor(cached_head, head)
+        except Exception:
+            is_ancestor = False
+        
+        if not is_ancestor:
+            print("缓存的提交不在当前历史中（可能发生了强制推送或历史改写），将重新构建Git历史索引")
+        elif git_range_has_merges(repo, f'{cached_head}..{head}'):
+            print("新提交中包含合并提交，将重新构建Git历史索引")
+        else:
+            print(f"增量更新Git历史索引: {cached_head[:7]}..{head[:7]}")
+            profile_count("git_cache_incremental")
+            newer = build_git_history_index(repo, f'{cached_head}..{head}')
+            history_index = merge_git_history_index(newer, cache["index"])
+            save_git_history_cache(cache_file, head, history_index)
+            return history_index
+    
+    profile_count("git_cache_misses")
+    history_index = build_git_history_index(repo, head)
+    if cache_file:
+        save_git_history_cache(cache_file, head, history_index)
+    return history_index
+
+def get_git_info(repo, file_path, config, history_index=None):
     """获取文件的Git相关信息"""
     git_info = {
         "last_modified": None,
         "contributors": []
     }
     
-    if not GIT_AVAILABLE or not config.get("git", {}).get("enable", True):
+    if not GIT_AVAILABLE or not config.get("git", {}).get("enable", True) or not history_index:
         return git_info
     
     try:
@@ -201,59 +1043,53 @@ def get_git_info(repo, file_path, config):
             file_rel_path = os.path.relpath(file_path, repo.working_dir)
         else:
             file_rel_path = file_path
-            
+        file_rel_path = file_rel_path.replace("\\", "/")
+        
+        entry = history_index.get(file_rel_path)
+        if not entry:
+            return git_info
+        
         # 获取文件最后修改信息
         if config.get("git", {}).get("show_last_modified", True):
-            commits = list(repo.iter_commits(paths=file_rel_path, max_count=1))
-            if commits:
-                last_commit = commits[0]
-                
+            last_commit = entry["last_commit"]
+            
+            # 获取GitHub用户名和头像
+            github_username = get_github_username_by_email(last_commit["email"], repo)
+            github_avatar = None
+            if github_username and config.get("github", {}).get("enable", True):
+                github_avatar = get_github_avatar_url(github_username)
+            
+            git_info["last_modified"] = {
+                "timestamp": last_commit["timestamp"],  # Unix时间戳
+                "author": last_commit["author"],
+                "email": last_commit["email"],
+                "message": last_commit["message"],
+                "github_username": github_username,
+                "github_avatar": github_avatar
+            }
+        
+        # 获取文件贡献者信息
+        if config.get("git", {}).get("show_contributors", True):
+            authors = []
+            for author in entry["authors"].values():
                 # 获取GitHub用户名和头像
-                github_username = get_github_username_by_email(last_commit.author.email, repo)
+                github_username = get_github_username_by_email(author["email"], repo)
                 github_avatar = None
                 if github_username and config.get("github", {}).get("enable", True):
                     github_avatar = get_github_avatar_url(github_username)
                 
-                git_info["last_modified"] = {
-                    "timestamp": last_commit.committed_date,  # Unix时间戳
-                    "author": last_commit.author.name,
-                    "email": last_commit.author.email,
-                    "message": last_commit.message.strip(),
+                authors.append({
+                    "name": author["name"],
+                    "email": author["email"],
+                    "commits": author["commits"],
                     "github_username": github_username,
-                    "github_avatar": github_avatar
-                }
-        
-        # 获取文件贡献者信息
-        if config.get("git", {}).get("show_contributors", True):
-            # 获取所有提交该文件的作者
-            authors = {}
-            for commit in repo.iter_commits(paths=file_rel_path):
-                author_name = commit.author.name
-                author_email = commit.author.email
-                
-                if author_name not in authors:
-                    # 获取GitHub用户名和头像
-                    github_username = get_github_username_by_email(author_email, repo)
-                    github_avatar = None
-                    if github_username and config.get("github", {}).get("enable", True):
-                        github_avatar = get_github_avatar_url(github_username)
-                    
-                    authors[author_name] = {
-                        "name": author_name,
-                        "email": author_email,
-                        "commits": 0,
-                        "github_username": github_username,
-                        "github_avatar": github_avatar,
-                        "last_commit_timestamp": commit.committed_date  # 添加最后提交时间戳
-                    }
-                authors[author_name]["commits"] += 1
-                # 更新最后提交时间戳（如果当前提交更新）
-                if commit.committed_date > authors[author_name]["last_commit_timestamp"]:
-                    authors[author_name]["last_commit_timestamp"] = commit.committed_date
+                    "github_avatar": github_avatar,
+                    "last_commit_timestamp": author["last_commit_timestamp"]  # 添加最后提交时间戳
+                })
             
             # 按提交次数排序
             git_info["contributors"] = sorted(
-                authors.values(), 
+                authors, 
                 key=lambda x: x["commits"], 
                 reverse=True
             )
@@ -263,8 +1099,71 @@ def get_git_info(repo, file_path, config):
     
     return git_info
 
-def scan_directory(directory, config, relative_path="", repo=None):
-    """扫描目录并生成目录结构"""
+def load_ignore_patterns(directory):
+    """
+    加载文档根目录下忽略文件（.docignore）中的规则
+    
+    每行一个glob模式，#开头为注释；以/结尾的模式只匹配目录，
+    包含/的模式匹配相对于文档根目录的路径，否则匹配文件或目录名。
+    """
+    patterns = []
+    ignore_file = os.path.join(directory, DOC_IGNORE_FILE)
+    if not os.path.isfile(ignore_file):
+        return patterns
+    try:
+        with open(ignore_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                dir_only = line.endswith('/')
+                pattern = line.strip('/')
+                if pattern:
+                    patterns.append((pattern, dir_only, '/' in line.rstrip('/')))
+    except Exception as e:
+        print(f"读取忽略文件 {ignore_file} 失败: {e}")
+    return patterns
+
+def is_ignored(relative_path, is_dir, ignore_patterns):
+    """检查相对于文档根目录的路径是否匹配忽略规则"""
+    name = relative_path.rsplit('/', 1)[-1]
+    for pattern, dir_only, match_path in ignore_patterns:
+        if dir_only and not is_dir:
+            continue
+        if fnmatch.fnmatch(relative_path if match_path else name, pattern):
+            return True
+    return False
+
+def list_directory(directory, relative_path, config, ignore_patterns=()):
+    """
+    列出目录中支持的文档文件和子目录，返回 (文件名列表, 子目录名列表)
+    
+    使用os.scandir复用目录项中的类型信息，避免对每一项再调用stat。
+    文件名保持目录读取的原始顺序。
+    """
+    files = []
+    dirs = []
+    rel_prefix = relative_path.replace("\\", "/") + '/' if relative_path else ''
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    if not is_supported_file(entry.name, config):
+                        continue
+                    is_dir = False
+                elif entry.is_dir() and not entry.name.startswith('.'):
+                    is_dir = True
+                else:
+                    continue
+            except OSError:
+                continue
+            if ignore_patterns and is_ignored(rel_prefix + entry.name, is_dir, ignore_patterns):
+                continue
+            (dirs if is_dir else files).append(entry.name)
+    return files, dirs
+
+def scan_directory_files(directory, config, relative_path, repo, history_index, ignore_patterns):
+    """扫描单个目录中的文档文件，返回 (目录节点, 子目录名列表)"""
     result = {
         "title": os.path.basename(directory) if relative_path else "首页",
         "path": relative_path,
@@ -272,24 +1171,12 @@ def scan_directory(directory, config, relative_path="", repo=None):
         "index": None,
     }
     
-    # 获取目录中的所有文件和子目录
-    items = []
+    # 获取目录中的文件和子目录
     try:
-        items = os.listdir(directory)
+        files, dirs = list_directory(directory, relative_path, config, ignore_patterns)
     except Exception as e:
         print(f"扫描目录失败: {directory}, 错误: {e}")
-        return result
-    
-    # 文件和子目录分开处理
-    files = []
-    dirs = []
-    
-    for item in items:
-        item_path = os.path.join(directory, item)
-        if os.path.isfile(item_path) and is_supported_file(item, config):
-            files.append(item)
-        elif os.path.isdir(item_path) and not item.startswith('.'):
-            dirs.append(item)
+        return result, []
     
     # 首先处理索引文件
     for item in files:
@@ -297,13 +1184,13 @@ def scan_directory(directory, config, relative_path="", repo=None):
             item_path = os.path.join(relative_path, item)
             file_path = os.path.join(directory, item)
             index_data = {
-                "title": get_file_title(file_path, item) or "文档首页",
+                "title": get_document_title(file_path, item) or "文档首页",
                 "path": item_path,
             }
             
             # 添加Git信息
             if repo:
-                git_info = get_git_info(repo, file_path, config)
+                git_info = get_git_info(repo, file_path, config, history_index)
                 if git_info["last_modified"] or git_info["contributors"]:
                     index_data["git"] = git_info
             
@@ -316,384 +1203,2173 @@ def scan_directory(directory, config, relative_path="", repo=None):
             item_path = os.path.join(relative_path, item)
             file_path = os.path.join(directory, item)
             file_data = {
-                "title": get_file_title(file_path, item),
+                "title": get_document_title(file_path, item),
                 "path": item_path,
                 "children": []
             }
             
             # 添加Git信息
             if repo:
-                git_info = get_git_info(repo, file_path, config)
+                git_info = get_git_info(repo, file_path, config, history_index)
                 if git_info["last_modified"] or git_info["contributors"]:
                     file_data["git"] = git_info
             
             result["children"].append(file_data)
     
-    # 处理子目录
-    for item in sorted(dirs):
-        sub_dir_path = os.path.join(directory, item)
-        sub_rel_path = os.path.join(relative_path, item)
-        sub_result = scan_directory(sub_dir_path, config, sub_rel_path, repo)
+    return result, sorted(dirs)
+
+def scan_directory(directory, config, relative_path="", repo=None, history_index=None, ignore_patterns=None):
+    """扫描目录并生成目录结构（使用显式栈遍历，不受递归深度限制）"""
+    if ignore_patterns is None:
+        ignore_patterns = load_ignore_patterns(directory)
+    
+    root = None
+    # 按先序遍历的顺序记录每个目录节点及其子目录节点
+    visited = []
+    stack = [(directory, relative_path, None)]
+    while stack:
+        current_dir, current_rel, parent_subdirs = stack.pop()
+        result, dirs = scan_directory_files(current_dir, config, current_rel, repo, history_index, ignore_patterns)
+        
+        subdirs = []
+        visited.append((result, subdirs))
+        if parent_subdirs is None:
+            root = result
+        else:
+            parent_subdirs.append(result)
         
-        # 只添加非空的子目录
-        if sub_result["children"] or sub_result["index"]:
-            result["children"].append(sub_result)
+        # 逆序入栈，使子目录按名称顺序处理
+        for item in reversed(dirs):
+            stack.append((os.path.join(current_dir, item), os.path.join(current_rel, item), subdirs))
     
-    return result
+    # 逆序处理，子目录先于父目录完成，只添加非空的子目录
+    for result, subdirs in reversed(visited):
+        for sub_result in subdirs:
+            if sub_result["children"] or sub_result["index"]:
+                result["children"].append(sub_result)
+    
+    return root
+
+def read_document_text(data):
+    """将文档的原始字节解码为文本（UTF-8），换行符统一为\\n"""
+    text = data.decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+def read_document_prefix(data):
+    """
+    解码文档开头最多MAX_EXTRACT_BYTES字节的内容
+    
+    超过上限时在最后一个换行处截断（没有换行时退到字符边界），超大文档只解析开头部分。
+    """
+    if len(data) <= MAX_EXTRACT_BYTES:
+        return read_document_text(data)
+    end = data.rfind(b'\n', 0, MAX_EXTRACT_BYTES)
+    if end == -1:
+        end = MAX_EXTRACT_BYTES
+        # 不截断UTF-8多字节字符
+        while end > 0 and (data[end] & 0xC0) == 0x80:
+            end -= 1
+    return read_document_text(data[:end])
+
+def read_document_data(file_path, digest=None):
+    """
+    读取文档用于解析的内容：最多MAX_EXTRACT_BYTES+1字节（多读的一个字节表示文档超过上限）
+    
+    digest不为None时用文件的全部内容更新它，超过上限的部分分块读取，不保留在内存中。
+    """
+    with open(file_path, 'rb', buffering=0) as f:
+        limit = min(os.fstat(f.fileno()).st_size, MAX_EXTRACT_BYTES) + 1
+        data = f.read(limit)
+        profile_count("bytes_read", len(data))
+        if digest is not None:
+            digest.update(data)
+            if len(data) == limit:
+                for chunk in iter(lambda: f.read(DOCUMENT_HASH_CHUNK_BYTES), b''):
+                    profile_count("bytes_read", len(chunk))
+                    digest.update(chunk)
+    return data
+
+def get_title_from_text(text, ext):
+    """从文档内容中提取标题，未找到时返回None"""
+    if ext == ".md":
+        # 从Markdown文件中提取标题：寻找第一个一级或二级标题行
+        title_match = MARKDOWN_TITLE_PATTERN.search(text)
+        if title_match:
+            return title_match.group(1).strip()
+    
+    elif ext == ".html":
+        # 简单查找<title>标签
+        start_tag = '<title>'
+        end_tag = '</title>'
+        start_pos = text.find(start_tag)
+        if start_pos > -1:
+            end_pos = text.find(end_tag, start_pos)
+            if end_pos > -1:
+                return text[start_pos + len(start_tag):end_pos].strip()
+        
+        # 或者寻找第一个<h1>标签
+        start_tag = '<h1>'
+        end_tag = '</h1>'
+        start_pos = text.find(start_tag)
+        if start_pos > -1:
+            end_pos = text.find(end_tag, start_pos)
+            if end_pos > -1:
+                return text[start_pos + len(start_tag):end_pos].strip()
+    
+    return None
+
+def get_fallback_title(file_name):
+    """使用文件名（去除扩展名）作为标题"""
+    filename = os.path.basename(file_name)
+    return os.path.splitext(filename)[0]
 
 def get_file_title(file_path, fallback_name):
     """尝试从文件内容中提取标题，如果失败则使用文件名作为标题"""
     try:
         ext = os.path.splitext(file_path)[1].lower()
-        
-        if ext == ".md":
-            # 从Markdown文件中提取标题
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    # 寻找第一个标题行
-                    if line.startswith('# '):
-                        return line[2:].strip()
-                    elif line.startswith('## '):
-                        return line[3:].strip()
-        
-        elif ext == ".html":
-            # 从HTML文件中提取标题
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # 简单查找<title>标签
-                start_tag = '<title>'
-                end_tag = '</title>'
-                start_pos = content.find(start_tag)
-                if start_pos > -1:
-                    end_pos = content.find(end_tag, start_pos)
-                    if end_pos > -1:
-                        return content[start_pos + len(start_tag):end_pos].strip()
-                
-                # 或者寻找第一个<h1>标签
-                start_tag = '<h1>'
-                end_tag = '</h1>'
-                start_pos = content.find(start_tag)
-                if start_pos > -1:
-                    end_pos = content.find(end_tag, start_pos)
-                    if end_pos > -1:
-                        return content[start_pos + len(start_tag):end_pos].strip()
-    
+        if ext in (".md", ".html"):
+            title = get_title_from_text(read_document_prefix(read_document_data(file_path)), ext)
+            if title is not None:
+                return title
     except Exception as e:
         print(f"读取文件 {file_path} 失败: {e}")
     
     # 如果没有找到标题，使用文件名（去除扩展名）
-    filename = os.path.basename(fallback_name)
-    return os.path.splitext(filename)[0]
+    return get_fallback_title(fallback_name)
 
 def normalize_paths(structure):
     """
     规范化路径，使用斜杠而不是反斜杠（Windows上的路径）
     """
-    if "path" in structure:
-        structure["path"] = structure["path"].replace("\\", "/")
+    stack = [structure]
+    while stack:
+        node = stack.pop()
+        if "path" in node:
+            node["path"] = node["path"].replace("\\", "/")
+        
+        if "index" in node and node["index"]:
+            node["index"]["path"] = node["index"]["path"].replace("\\", "/")
+        
+        if "children" in node:
+            stack.extend(node["children"])
     
-    if "index" in structure and structure["index"]:
-        structure["index"]["path"] = structure["index"]["path"].replace("\\", "/")
+    return structure
+
+def compact_structure(structure):
+    """
+    把文档结构转换为紧凑格式：贡献者信息集中到根节点的authors表中，节点按编号引用
+    
+    根节点增加 "format" 和 "authors"，authors中每一项为
+    {"name", "email", "github_username", "github_avatar"}；
+    节点git信息中 last_modified 为 {"timestamp", "author": 作者编号, "message"}，
+    contributors 为 [作者编号, 提交次数, 最后提交时间戳] 列表。
+    """
+    authors = []
+    author_ids = {}
     
-    if "children" in structure:
-        for child in structure["children"]:
-            normalize_paths(child)
+    def get_author_id(name, email, github_username, github_avatar):
+        key = (name, email, github_username, github_avatar)
+        if key not in author_ids:
+            author_ids[key] = len(authors)
+            authors.append({
+                "name": name,
+                "email": email,
+                "github_username": github_username,
+                "github_avatar": github_avatar
+            })
+        return author_ids[key]
     
-    return structure
+    def compact_git(git):
+        compacted = {}
+        last_modified = git.get("last_modified")
+        if last_modified:
+            compacted["last_modified"] = {
+                "timestamp": last_modified["timestamp"],
+                "author": get_author_id(last_modified["author"], last_modified["email"],
+                                        last_modified["github_username"], last_modified["github_avatar"]),
+                "message": last_modified["message"]
+            }
+        compacted["contributors"] = [
+            [get_author_id(c["name"], c["email"], c["github_username"], c["github_avatar"]),
+             c["commits"], c["last_commit_timestamp"]]
+            for c in git.get("contributors", [])
+        ]
+        return compacted
+    
+    def compact_node(node):
+        compacted = {}
+        for key, value in node.items():
+            if key == "git" and value:
+                compacted[key] = compact_git(value)
+            elif key == "children":
+                compacted[key] = [compact_node(child) for child in value]
+            elif key == "index" and isinstance(value, dict):
+                compacted[key] = compact_node(value)
+            else:
+                compacted[key] = value
+        return compacted
+    
+    compacted = compact_node(structure)
+    compacted["format"] = PATH_FORMAT_VERSION
+    compacted["authors"] = authors
+    return compacted
+
+def expand_structure(structure):
+    """把紧凑格式的文档结构还原为完整格式（非紧凑格式原样返回）"""
+    if not isinstance(structure, dict) or structure.get("format") != PATH_FORMAT_VERSION:
+        return structure
+    authors = structure["authors"]
+    
+    def expand_git(git):
+        expanded = {}
+        last_modified = git.get("last_modified")
+        if last_modified:
+            author = authors[last_modified["author"]]
+            expanded["last_modified"] = {
+                "timestamp": last_modified["timestamp"],
+                "author": author["name"],
+                "email": author["email"],
+                "message": last_modified["message"],
+                "github_username": author["github_username"],
+                "github_avatar": author["github_avatar"]
+            }
+        expanded["contributors"] = [
+            {
+                "name": authors[author_id]["name"],
+                "email": authors[author_id]["email"],
+                "commits": commits,
+                "github_username": authors[author_id]["github_username"],
+                "github_avatar": authors[author_id]["github_avatar"],
+                "last_commit_timestamp": last_commit_timestamp
+            }
+            for author_id, commits, last_commit_timestamp in git.get("contributors", [])
+        ]
+        return expanded
+    
+    def expand_node(node):
+        expanded = {}
+        for key, value in node.items():
+            if key == "git" and value:
+                expanded[key] = expand_git(value)
+            elif key == "children":
+                expanded[key] = [expand_node(child) for child in value]
+            elif key == "index" and isinstance(value, dict):
+                expanded[key] = expand_node(value)
+            else:
+                expanded[key] = value
+        return expanded
+    
+    expanded = expand_node(structure)
+    del expanded["format"]
+    del expanded["authors"]
+    return expanded
+
+def write_structure_file(filepath, structure, args):
+    """按命令行指定的格式写入path.json"""
+    if args.path_format == 'compact':
+        structure = compact_structure(structure)
+    write_json_file(filepath, structure, args.minify)
 
 def load_existing_structure(filepath):
-    """加载已存在的path.json文件结构"""
+    """加载已存在的path.json文件结构（紧凑格式会被还原为完整格式）"""
     try:
         if os.path.exists(filepath):
             with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                return expand_structure(json.load(f))
     except Exception as e:
         print(f"加载已有结构文件失败: {e}")
     return None
 
-def merge_structures(existing, new_structure, config):
-    """合并已有结构和新扫描的结构，保留已有结构的排序，添加新内容"""
-    if not existing:
-        return new_structure
+def hash_navigation_source(text):
+    """path.json文本的哈希（按UTF-16编码单元计算的32位FNV-1a，前端utils.js的hashPathText使用相同的算法）"""
+    data = text.encode('utf-16-le')
+    value = 0x811c9dc5
+    for unit in struct.unpack(f'<{len(data) // 2}H', data):
+        value = ((value ^ unit) * 0x01000193) & 0xffffffff
+    return f'{value:08x}'
+
+def build_navigation(structure, config, path_hash=None):
+    """
+    生成导航数据（nav.json），前端据此直接查找文档，不必在每次跳转时遍历path.json的树结构
     
-    # 更新基本信息和索引文件
-    # 保留原标题，但更新索引文件（如果有变化）
-    result = existing.copy()
-    
-    # 如果新结构有索引但旧结构没有，或索引路径发生变化
-    if (new_structure.get("index") and (not existing.get("index") or 
-                                       existing.get("index", {}).get("path") != new_structure.get("index", {}).get("path"))):
-        # 如果旧结构有索引且标题不为空，保留原有标题
-        if existing.get("index") and existing["index"].get("title"):
-            new_index = new_structure["index"].copy()
-            new_index["title"] = existing["index"]["title"]  # 保留原有标题
-            result["index"] = new_index
-        else:
-            result["index"] = new_structure["index"]
-    # 如果索引文件没有变化，但新结构中包含Git信息，则更新Git信息
-    elif new_structure.get("index") and existing.get("index"):
-        if "git" in new_structure["index"] and (
-            "git" not in existing["index"] or 
-            existing["index"]["git"] != new_structure["index"]["git"]
-        ):
-            # 复制索引但保留现有信息
-            updated_index = existing["index"].copy()
-            # 更新Git信息
-            updated_index["git"] = new_structure["index"]["git"]
-            result["index"] = updated_index
-    
-    # 创建现有路径的映射，用于快速查找
-    existing_paths = {}
-    if "children" in existing:
-        for child in existing["children"]:
-            path = child.get("path", "")
-            if path:
-                existing_paths[path] = child
+    documents为按path.json中从上到下的顺序排列的文档 [路径, 标题, 所属目录编号]，
+    相邻的元素即为上一篇/下一篇（目录的索引页排在目录内容之前，重复的路径只保留第一次出现）；
+    directories为目录 [路径, 标题, 上级目录编号, 索引页的文档编号]，根目录编号为0，
+    没有上级目录或索引页时为-1；paths为去掉扩展名的文档路径和目录路径 -> 文档编号（目录对应其索引页）。
+    path_hash为生成导航数据时path.json文本的哈希（hash_navigation_source），path.json被手动编辑后
+    前端发现哈希不一致，会改由path.json生成导航数据。
+    """
+    extensions = tuple(ext.lower() for ext in config["supported_extensions"])
+    documents = []
+    directories = []
+    positions = {}
     
-    # 创建新路径的映射，用于检查
-    new_paths = {}
-    if "children" in new_structure:
-        for child in new_structure["children"]:
-            path = child.get("path", "")
-            if path:
-                new_paths[path] = child
-    
-    # 保留现有子项
-    updated_children = []
-    for child in existing.get("children", []):
-        path = child.get("path", "")
-        if path in new_paths:
-            # 如果是目录，递归合并
-            if child.get("children") or new_paths[path].get("children"):
-                updated_child = merge_structures(child, new_paths[path], config)
-                updated_children.append(updated_child)
-            else:
-                # 文件项，保留原有结构（例如可能包含order字段和手动设置的标题）但更新Git信息
-                child_copy = child.copy()
-                # 保留原有标题，不从文件内容重新提取覆盖
-                # child_copy["title"] = new_paths[path]["title"]  # 注释掉此行以保留手动设置的标题
-                
-                # 更新Git信息
-                if "git" in new_paths[path]:
-                    child_copy["git"] = new_paths[path]["git"]
-                
-                updated_children.append(child_copy)
-            # 标记为已处理
-            del new_paths[path]
+    def add_document(node, directory):
+        path = node.get("path")
+        if not path:
+            return -1
+        if path not in positions:
+            positions[path] = len(documents)
+            documents.append([path, node.get("title", ""), directory])
+        return positions[path]
+    
+    # 先序遍历：目录的索引页排在目录内容之前
+    stack = [(structure, -1)]
+    while stack:
+        node, parent = stack.pop()
+        if node is not structure and "index" not in node:
+            add_document(node, parent)
+            continue
+        number = len(directories)
+        directories.append([node.get("path", ""), node.get("title", ""), parent, -1])
+        if node.get("index"):
+            directories[number][3] = add_document(node["index"], number)
+        stack.extend((child, number) for child in reversed(node.get("children", [])))
+    
+    paths = {}
+    for number, (path, _, _) in enumerate(documents):
+        clean_path = os.path.splitext(path)[0] if path.lower().endswith(extensions) else path
+        paths.setdefault(clean_path, number)
+    for path, _, _, index in directories:
+        if path and index >= 0:
+            paths.setdefault(path, index)
+    
+    return {
+        "version": NAVIGATION_VERSION,
+        "path_hash": path_hash,
+        "documents": documents,
+        "directories": directories,
+        "paths": paths
+    }
+
+def write_navigation_file(structure, config, args):
+    """写入导航数据文件（未禁用时），记录刚写入的path.json的哈希"""
+    if not args.no_navigation:
+        # 不转换换行符，与前端读取到的文本一致
+        with open(args.output, 'r', encoding='utf-8', newline='') as f:
+            path_hash = hash_navigation_source(f.read())
+        write_json_file(args.navigation, build_navigation(structure, config, path_hash), minify=True)
+
+def index_structure_paths(structure):
+    """
+    一次遍历建立文档结构的路径索引：路径 -> (节点, 父节点路径)
+    
+    索引按先序遍历的顺序排列，没有路径的节点（自定义条目）和根节点不会被索引。
+    """
+    nodes = {}
+    stack = [(structure, None)]
+    while stack:
+        node, parent_path = stack.pop()
+        path = node.get("path", "")
+        if parent_path is not None and path:
+            nodes.setdefault(path, (node, parent_path))
+        stack.extend((child, path) for child in reversed(node.get("children", [])))
+    return nodes
+
+def merge_index_page(merged, existing, new_node, report):
+    """合并目录的索引页：路径变化时使用新索引页但保留原标题，未变化时更新Git信息"""
+    existing_index = existing.get("index")
+    new_index = new_node.get("index")
+    if not new_index:
+        # 新扫描中没有索引页（索引文件已被删除），与完整构建一样保留值为None的index，节点仍是目录
+        if existing_index:
+            merged["index"] = None
+            report["removed"].append(existing_index.get("path", ""))
+        return
+    
+    if not existing_index or existing_index.get("path") != new_index.get("path"):
+        if existing_index and existing_index.get("title"):
+            merged["index"] = dict(new_index, title=existing_index["title"])  # 保留原有标题
         else:
-            # 检查这个路径是否真的不存在了
-            full_path = os.path.join(config["root_dir"], path)
-            if os.path.exists(full_path):
-                # 如果文件或目录仍然存在，保留这个条目
-                updated_children.append(child)
-            else:
-                print(f"移除不存在的项: {path}")
+            merged["index"] = new_index
+        if existing_index:
+            report["removed"].append(existing_index.get("path", ""))
+        report["added"].append(new_index.get("path", ""))
+        return
     
-    # 添加新的子项（添加到末尾）
-    for path, child in new_paths.items():
-        updated_children.append(child)
+    if existing_index.get("title") != new_index.get("title"):
+        report["retitled"].append({"path": new_index.get("path", ""), "title": existing_index.get("title"), "scanned_title": new_index.get("title")})
+    # 索引文件没有变化，但新结构中包含Git信息，则更新Git信息
+    if "git" in new_index and existing_index.get("git") != new_index["git"]:
+        merged["index"] = dict(existing_index, git=new_index["git"])
+
+def find_moved_entries(report):
+    """把文件名相同且一一对应的 移除+新增 条目识别为移动"""
+    removed_by_name = {}
+    for path in report["removed"]:
+        removed_by_name.setdefault(path.rsplit('/', 1)[-1], []).append(path)
+    added_by_name = {}
+    for path in report["added"]:
+        added_by_name.setdefault(path.rsplit('/', 1)[-1], []).append(path)
     
-    result["children"] = updated_children
+    moved = set()
+    for name, removed_paths in removed_by_name.items():
+        added_paths = added_by_name.get(name, [])
+        if len(removed_paths) == 1 and len(added_paths) == 1:
+            report["moved"].append({"from": removed_paths[0], "to": added_paths[0]})
+            moved.update((removed_paths[0], added_paths[0]))
+    report["removed"] = [path for path in report["removed"] if path not in moved]
+    report["added"] = [path for path in report["added"] if path not in moved]
+
+def merge_structures(existing, new_structure, config, report=None):
+    """
+    合并已有结构和新扫描的结构，保留已有结构的排序和自定义字段，添加新内容
+    
+    新扫描的结果是权威的：先为新结构建立一次路径索引，再遍历已有结构，其中的条目只要在
+    新扫描中存在（不论位于哪个目录下）就保留在原位置并更新Git信息，不存在的条目被移除，
+    新条目添加到所属目录的末尾。整个过程是线性的，不访问文件系统。
+    
+    如果传入report字典，会写入变化报告：
+    {"added": [路径], "removed": [路径], "moved": [{"from", "to"}],
+     "retitled": [{"path", "title": 保留的标题, "scanned_title": 文档中的标题}]}
+    """
+    if report is None:
+        report = {}
+    report.update({kind: [] for kind in MERGE_CHANGE_KINDS})
+    if not existing:
+        return new_structure
+    
+    new_nodes = index_structure_paths(new_structure)
+    matched = set()
+    # 合并后的目录节点（路径 -> 节点），用于添加新条目
+    merged_dirs = {}
+    
+    def merge_node(node, new_node, is_root=False):
+        """合并单个节点，返回 (合并结果, 是否需要合并子项)"""
+        merged = node.copy()
+        if node.get("title") != new_node.get("title") and not is_root:
+            report["retitled"].append({"path": node.get("path", ""), "title": node.get("title"), "scanned_title": new_node.get("title")})
+        # 目录由新扫描结果判断（目录节点总有index字段，文件节点没有）
+        if is_root or "index" in new_node:
+            merge_index_page(merged, node, new_node, report)
+            return merged, True
+        # 文件项，保留原有结构（例如可能包含order字段和手动设置的标题）但更新Git信息
+        if "git" in new_node:
+            merged["git"] = new_node["git"]
+        return merged, False
+    
+    result, _ = merge_node(existing, new_structure, is_root=True)
+    stack = [(existing, result)]
+    while stack:
+        node, merged = stack.pop()
+        merged_dirs.setdefault(node.get("path", ""), merged)
+        children = []
+        for child in node.get("children", []):
+            path = child.get("path", "")
+            if not path:
+                # 没有路径的自定义条目原样保留
+                children.append(child)
+                continue
+            entry = new_nodes.get(path)
+            if entry is None:
+                report["removed"].append(path)
+                continue
+            matched.add(path)
+            merged_child, has_children = merge_node(child, entry[0])
+            children.append(merged_child)
+            if has_children:
+                stack.append((child, merged_child))
+        merged["children"] = children
+    
+    # 添加新的子项（添加到所属目录的末尾，新目录连同其内容一起添加）
+    for path, (new_node, parent_path) in new_nodes.items():
+        if path in matched:
+            continue
+        report["added"].append(path)
+        if parent_path in merged_dirs:
+            merged_dirs[parent_path]["children"].append(new_node)
+    
+    find_moved_entries(report)
     return result
 
+def print_merge_report(report):
+    """输出合并变化报告"""
+    print(f"合并结果: 新增 {len(report['added'])} 项, 移除 {len(report['removed'])} 项, "
+          f"移动 {len(report['moved'])} 项, 标题与文档不同 {len(report['retitled'])} 项")
+    for path in report["added"]:
+        print(f"  新增: {path}")
+    for path in report["removed"]:
+        print(f"  移除不存在的项: {path}")
+    for entry in report["moved"]:
+        print(f"  移动: {entry['from']} -> {entry['to']}")
+    for entry in report["retitled"]:
+        print(f"  标题: {entry['path']}（保留 \"{entry['title']}\"，文档中为 \"{entry['scanned_title']}\"）")
+
+def strip_markdown(content):
+    """移除Markdown标记，返回纯文本"""
+    # 移除代码块
+    content = MARKDOWN_CODE_BLOCK_PATTERN.sub('', content)
+    # 移除行内代码
+    content = MARKDOWN_INLINE_CODE_PATTERN.sub('', content)
+    # 移除链接，保留链接文本
+    content = MARKDOWN_LINK_PATTERN.sub(r'\1', content)
+    # 移除图片
+    content = MARKDOWN_IMAGE_PATTERN.sub('', content)
+    # 移除HTML标签
+    content = HTML_TAG_PATTERN.sub('', content)
+    # 移除标题标记
+    content = MARKDOWN_HEADING_MARK_PATTERN.sub('', content)
+    # 移除空行和多余空格
+    content = NEWLINES_PATTERN.sub(' ', content)
+    content = WHITESPACE_PATTERN.sub(' ', content)
+    return content
+
+def strip_markdown_chunk(content, final):
+    """
+    对一段Markdown文本执行与strip_markdown相同的处理
+    
+    content需要在空行处结束。final为False时，如果处理后末尾仍有未闭合的代码块、
+    链接或HTML标签（可能与后面的文本组成一个匹配），返回None，由调用方合并下一段后重试。
+    """
+    content = MARKDOWN_CODE_BLOCK_PATTERN.sub('', content)
+    if not final and '```' in content:
+        return None
+    content = MARKDOWN_INLINE_CODE_PATTERN.sub('', content)
+    if not final and (content.rfind('[') > content.rfind(']') or content.rfind('(') > content.rfind(')')):
+        return None
+    content = MARKDOWN_LINK_PATTERN.sub(r'\1', content)
+    content = MARKDOWN_IMAGE_PATTERN.sub('', content)
+    if not final and content.rfind('<') > content.rfind('>'):
+        return None
+    content = HTML_TAG_PATTERN.sub('', content)
+    content = MARKDOWN_HEADING_MARK_PATTERN.sub('', content)
+    content = NEWLINES_PATTERN.sub(' ', content)
+    return WHITESPACE_PATTERN.sub(' ', content)
+
+def strip_markdown_prefix(content, max_chars):
+    """
+    流式移除Markdown标记，得到前max_chars个字符后立即停止
+    
+    按空行把文本分段处理，结果与 strip_markdown(content)[:max_chars] 一致，
+    但大文档只需处理开头的几段。
+    """
+    parts = []
+    length = 0
+    last_char = ''
+    start = 0
+    size = EXTRACT_CHUNK_CHARS
+    while start < len(content) and length < max_chars:
+        boundary = content.find('\n\n', start + size)
+        final = boundary == -1
+        end = len(content) if final else boundary + 2
+        piece = strip_markdown_chunk(content[start:end], final)
+        if piece is None:
+            # 段落之间有跨段的标记，扩大分段后重试（按倍数扩大，避免重复处理）
+            size *= 2
+            continue
+        # 两段之间的空白合并为一个空格
+        if last_char == ' ' and piece.startswith(' '):
+            piece = piece[1:]
+        if piece:
+            parts.append(piece)
+            length += len(piece)
+            last_char = piece[-1]
+        start = end
+        size = EXTRACT_CHUNK_CHARS
+    return ''.join(parts)[:max_chars]
+
+def extract_markdown_headings(content):
+    """提取Markdown文档中的标题（忽略代码块中的内容）"""
+    headings = []
+    in_code_block = False
+    for line_match in MARKDOWN_HEADING_LINE_PATTERN.finditer(content):
+        if line_match.group(1):
+            in_code_block = not in_code_block
+        elif not in_code_block:
+            headings.append({"level": len(line_match.group(2)), "text": line_match.group(3).strip()})
+    return headings
+
+def extract_html_headings(content):
+    """用正则表达式提取HTML片段中的标题（用于解析器提前停止后的剩余部分）"""
+    headings = []
+    content = HTML_IGNORED_BLOCK_PATTERN.sub(' ', content)
+    for heading_match in HTML_HEADING_PATTERN.finditer(content):
+        text = ' '.join(html.unescape(HTML_TAG_PATTERN.sub(' ', heading_match.group(2))).split())
+        if text:
+            headings.append({"level": int(heading_match.group(1)), "text": text})
+    return headings
+
+def extract_html_text_and_headings(content, max_chars):
+    """
+    分段解析HTML，得到前max_chars个字符的纯文本后停止解析
+    
+    每段在"<"之前结束，保证文本节点不会被拆开；停止后剩余部分中的标题用正则表达式提取。
+    """
+    parser = HTMLTextExtractor()
+    start = 0
+    while start < len(content):
+        end = content.find('<', start + EXTRACT_CHUNK_CHARS)
+        if end == -1:
+            end = len(content)
+        parser.feed(content[start:end])
+        start = end
+        if parser.text_length >= max_chars and parser.heading is None and not parser.skip:
+            break
+    
+    headings = parser.headings
+    if start < len(content):
+        headings = headings + extract_html_headings(parser.rawdata + content[start:])
+    return parser.get_text()[:max_chars], headings
+
+def extract_text_and_headings(content, ext, max_chars):
+    """从文档内容中提取前max_chars个字符的纯文本和完整的标题列表"""
+    if ext == ".md":
+        return strip_markdown_prefix(content, max_chars), extract_markdown_headings(content)
+    
+    if ext == ".html":
+        return extract_html_text_and_headings(content, max_chars)
+    
+    return "", []
+
 def extract_content(file_path, max_chars=1000):
-    """提取文件内容，用于搜索索引"""
+    """提取文件内容，用于搜索索引（得到足够的纯文本后即停止处理，不提取标题列表）"""
     try:
         ext = os.path.splitext(file_path)[1].lower()
-        
         if ext == ".md":
-            # 从Markdown文件中提取内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-                # 移除Markdown标记
-                # 移除代码块
-                content = re.sub(r'```.*?```', '', content, flags=re.DOTALL)
-                # 移除行内代码
-                content = re.sub(r'`.*?`', '', content)
-                # 移除链接，保留链接文本
-                content = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', content)
-                # 移除图片
-                content = re.sub(r'!\[.*?\]\(.*?\)', '', content)
-                # 移除HTML标签
-                content = re.sub(r'<[^>]+>', '', content)
-                # 移除标题标记
-                content = re.sub(r'#+\s', '', content)
-                # 移除空行和多余空格
-                content = re.sub(r'\n+', ' ', content)
-                content = re.sub(r'\s+', ' ', content)
-                
-                # 截取一部分内容
-                return content[:max_chars]
-        
-        elif ext == ".html":
-            # 从HTML文件中提取内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                parser = HTMLTextExtractor()
-                parser.feed(content)
-                text = parser.get_text()
-                return text[:max_chars]
-        
+            return strip_markdown_prefix(read_document_prefix(read_document_data(file_path)), max_chars)
+        if ext == ".html":
+            text, _ = extract_html_text_and_headings(read_document_prefix(read_document_data(file_path)), max_chars)
+            return text
         return ""
     except Exception as e:
         print(f"读取文件 {file_path} 内容失败: {e}")
         return ""
 
-def extract_keywords(content, max_keywords=10):
-    """从内容中提取关键词"""
-    if not content:
-        return []
+def tokenize_simple(text, stopwords):
+    """简单分词：连续的文字作为一个词条"""
+    return re.findall(r'\b\w+\b|[\u4e00-\u9fa5]+', text.lower())
+
+def tokenize_cjk(text, stopwords):
+    """
+    中文感知分词：中文同时切分为单字词条和相邻两字的二元词条，其他文字按单词切分
+    
+    单字词条使只输入一个字的查询（如“插”）也能命中；每个字之后紧跟以它开头的
+    二元词条。中文中的单字停用词（如“的”）作为分隔，不产生跨越停用词的词条。
+    """
+    tokens = []
+    for run in CJK_TOKEN_PATTERN.findall(text.lower()):
+        if not CJK_CHAR_PATTERN.match(run):
+            tokens.append(run)
+            continue
+        segment_start = 0
+        for i in range(len(run) + 1):
+            if i < len(run) and run[i] not in stopwords:
+                continue
+            segment = run[segment_start:i]
+            for j, char in enumerate(segment):
+                tokens.append(char)
+                if j + 1 < len(segment):
+                    tokens.append(segment[j:j + 2])
+            segment_start = i + 1
+    return tokens
+
+# 可用的分词方式
+TOKENIZERS = {
+    "simple": tokenize_simple,
+    "cjk": tokenize_cjk
+}
+
+def configure_tokenizer(config):
+    """根据配置设置分词方式和停用词（也用作进程池的初始化函数）"""
+    caches = get_build_caches()
+    search_config = config.get("search", {})
+    name = search_config.get("tokenizer", "cjk")
+    if name not in TOKENIZERS:
+        print(f"警告: 未知的分词方式 {name}，将使用 cjk")
+        name = "cjk"
+    caches.search_tokenizer = {
+        "name": name,
+        "stopwords": STOPWORDS | set(word.lower() for word in search_config.get("stopwords", []))
+    }
+    return caches.search_tokenizer
+
+def tokenize_text(text):
+    """将文本切分为小写的词条，用于关键词提取和搜索索引"""
+    caches = get_build_caches()
+    return TOKENIZERS[caches.search_tokenizer["name"]](text, caches.search_tokenizer["stopwords"])
+
+def extract_keywords(content, max_keywords=10):
+    """从内容中提取关键词"""
+    caches = get_build_caches()
+    if not content:
+        return []
+    
+    # 分词并统计频率
+    words = tokenize_text(content)
+    word_freq = {}
+    
+    for word in words:
+        if len(word) > 1 and word not in caches.search_tokenizer["stopwords"]:
+            word_freq[word] = word_freq.get(word, 0) + 1
+    
+    # 按频率排序并返回前N个关键词
+    sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
+    return [word for word, freq in sorted_words[:max_keywords]]
+
+def get_manifest_fingerprint(config):
+    """计算文档清单的配置指纹，配置或构建脚本变化时清单失效"""
+    caches = get_build_caches()
+    try:
+        with open(os.path.abspath(__file__), 'rb') as f:
+            script_hash = hashlib.sha256(f.read()).hexdigest()
+    except Exception:
+        script_hash = None
+    return {
+        "version": DOCUMENT_MANIFEST_VERSION,
+        "script": script_hash,
+        "root_dir": config["root_dir"],
+        "supported_extensions": list(config["supported_extensions"]),
+        "index_pages": list(config["index_pages"]),
+        "tokenizer": caches.search_tokenizer["name"],
+        "stopwords": sorted(caches.search_tokenizer["stopwords"])
+    }
+
+def load_document_manifest(manifest_file, config):
+    """加载增量构建使用的文档清单，配置不一致时返回空清单"""
+    caches = get_build_caches()
+    fingerprint = get_manifest_fingerprint(config)
+    caches.document_manifest = {"fingerprint": fingerprint, "files": {}, "seen": set(), "extracted": 0}
+    try:
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("fingerprint") == fingerprint:
+                caches.document_manifest["files"] = manifest.get("files", {})
+                print(f"已加载文档清单: {len(caches.document_manifest['files'])} 个文件")
+            else:
+                print("配置或构建脚本已变化，文档清单失效，将重新提取所有文档")
+    except Exception as e:
+        print(f"加载文档清单失败: {e}")
+    return caches.document_manifest
+
+def save_document_manifest(manifest_file):
+    """保存文档清单，只保留本次构建中仍然存在的文件"""
+    caches = get_build_caches()
+    if caches.document_manifest is None:
+        return
+    files = {
+        key: entry
+        for key, entry in caches.document_manifest["files"].items()
+        if key in caches.document_manifest["seen"]
+    }
+    removed = len(caches.document_manifest["files"]) - len(files)
+    try:
+        manifest_dir = os.path.dirname(manifest_file)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        temp_file = manifest_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": caches.document_manifest["fingerprint"], "files": files}, f, ensure_ascii=False)
+        os.replace(temp_file, manifest_file)
+        print(f"文档清单已更新: {caches.document_manifest['extracted']} 个文件重新提取, {removed} 个文件已移除")
+    except Exception as e:
+        print(f"保存文档清单失败: {e}")
+
+def parse_document_bytes(data, file_path, max_chars=1000):
+    """解析文档内容，返回标题、纯文本、标题列表和关键词"""
+    started = time.perf_counter()
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        text = read_document_prefix(data)
+        title = get_title_from_text(text, ext)
+        content, headings = extract_text_and_headings(text, ext, max_chars)
+    except Exception as e:
+        print(f"解析文件 {file_path} 失败: {e}")
+        title = None
+        content, headings = "", []
+    
+    record = {
+        "title": title if title is not None else get_fallback_title(file_path),
+        "content": content,
+        "headings": headings,
+        "keywords": extract_keywords(content)
+    }
+    profile_count("documents_parsed")
+    profile_document(file_path, time.perf_counter() - started)
+    return record
+
+def parse_document(file_path):
+    """读取并解析文档，每个文档只读取一次；文件不存在时返回None"""
+    try:
+        return parse_document_bytes(read_document_data(file_path), file_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"读取文件 {file_path} 失败: {e}")
+        return {
+            "title": get_fallback_title(file_path),
+            "content": "",
+            "headings": [],
+            "keywords": []
+        }
+
+def get_manifest_entry(file_path, parse=True):
+    """
+    获取文件在清单中的条目
+    
+    文件大小和修改时间未变时直接使用已有条目；否则比较内容哈希，
+    内容变化或新文件会使用同一次读取的内容重新解析（parse为False时留给调用方解析）。
+    """
+    caches = get_build_caches()
+    key = get_document_key(file_path)
+    caches.document_manifest["seen"].add(key)
+    files = caches.document_manifest["files"]
+    entry = files.get(key)
+    
+    stat = os.stat(file_path)
+    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+        profile_count("manifest_hits")
+        return entry
+    
+    digest = hashlib.sha256()
+    data = read_document_data(file_path, digest)
+    content_hash = digest.hexdigest()
+    if entry and entry["hash"] == content_hash:
+        entry["size"] = stat.st_size
+        entry["mtime"] = stat.st_mtime_ns
+        profile_count("manifest_hits")
+        return entry
+    
+    profile_count("manifest_misses")
+    caches.document_manifest["extracted"] += 1
+    entry = files[key] = {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": content_hash
+    }
+    if parse:
+        entry.update(parse_document_bytes(data, file_path))
+    return entry
+
+def get_document_key(file_path):
+    """文档在清单和解析结果中使用的键"""
+    return os.path.normpath(file_path).replace("\\", "/")
+
+def get_document_record(file_path):
+    """
+    获取文档的解析结果（标题、纯文本、标题列表和关键词）
+    
+    结果在一次构建中只解析一次，增量构建时来自文档清单；文件不存在时返回None。
+    """
+    caches = get_build_caches()
+    if caches.document_manifest is not None:
+        try:
+            entry = get_manifest_entry(file_path)
+        except FileNotFoundError:
+            return None
+        except OSError:
+            entry = None
+        if entry is not None:
+            if "title" not in entry:
+                entry.update(parse_document(file_path) or {})
+            return entry
+    
+    key = get_document_key(file_path)
+    record = caches.document_records.get(key)
+    if record is None:
+        record = parse_document(file_path)
+        if record is None:
+            return None
+        caches.document_records[key] = record
+    return record
+
+def get_document_title(file_path, fallback_name):
+    """获取文档标题，文件无法读取时使用文件名"""
+    record = get_document_record(file_path)
+    if record is None:
+        return get_fallback_title(fallback_name)
+    return record["title"]
+
+def collect_document_files(directory, config):
+    """收集目录下所有支持的文档文件路径（与scan_directory的筛选和忽略规则一致）"""
+    ignore_patterns = load_ignore_patterns(directory)
+    paths = []
+    stack = [(directory, "")]
+    while stack:
+        current_dir, current_rel = stack.pop()
+        try:
+            files, dirs = list_directory(current_dir, current_rel, config, ignore_patterns)
+        except OSError:
+            continue
+        paths.extend(os.path.join(current_dir, name) for name in files)
+        stack.extend((os.path.join(current_dir, name), os.path.join(current_rel, name)) for name in dirs)
+    return paths
+
+def extract_document(file_path):
+    """解析单个文档，供进程池调用（同时返回解析耗时，子进程中的性能分析数据不会传回主进程）"""
+    started = time.perf_counter()
+    record = parse_document(file_path)
+    return file_path, record, time.perf_counter() - started
+
+def prefetch_documents(directory, config, jobs):
+    """
+    使用进程池并行解析所有尚未解析的文档
+    
+    结果写入文档清单（增量构建时）或文档解析结果缓存，之后scan_directory和build_search_tree
+    直接读取结果，输出的顺序和内容与串行处理时一致。
+    """
+    caches = get_build_caches()
+    tasks = []
+    for file_path in collect_document_files(directory, config):
+        if caches.document_manifest is not None:
+            try:
+                entry = get_manifest_entry(file_path, parse=False)
+            except OSError:
+                continue
+            if "title" in entry:
+                continue
+        elif get_document_key(file_path) in caches.document_records:
+            continue
+        tasks.append(file_path)
+    
+    if not tasks:
+        return 0
+    
+    import concurrent.futures
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=configure_tokenizer, initargs=(config,)) as executor:
+        for file_path, record, seconds in executor.map(extract_document, tasks, chunksize=chunksize):
+            if record is None:
+                continue
+            profile_count("documents_parsed")
+            profile_document(file_path, seconds)
+            key = get_document_key(file_path)
+            if caches.document_manifest is not None:
+                caches.document_manifest["files"][key].update(record)
+            else:
+                caches.document_records[key] = record
+    return len(tasks)
+
+def make_search_item(title, path, record):
+    """根据文档解析结果生成搜索条目"""
+    content = record["content"]
+    return {
+        "title": title,
+        "path": path,
+        "content": content[:200] + "..." if len(content) > 200 else content,
+        "keywords": record["keywords"]
+    }
+
+def build_search_tree(structure, config, result=None):
+    """构建搜索树"""
+    if result is None:
+        result = []
+    
+    # 处理索引文档
+    if structure.get("index"):
+        file_path = os.path.join(config["root_dir"], structure["index"]["path"])
+        record = get_document_record(file_path)
+        if record is not None:
+            result.append(make_search_item(structure["index"]["title"], structure["index"]["path"], record))
+    
+    # 处理文件（目录节点总有index字段，只有索引页的目录children为空）
+    for child in structure.get("children", []):
+        if "index" not in child:
+            # 这是一个文件
+            file_path = os.path.join(config["root_dir"], child["path"])
+            record = get_document_record(file_path)
+            if record is not None:
+                result.append(make_search_item(child["title"], child["path"], record))
+        else:
+            # 这是一个目录，递归处理
+            build_search_tree(child, config, result)
+    
+    return result
+
+def tokenize_search_documents(search_tree, config):
+    """
+    对搜索树中的每个文档分词一次，返回 [{"title": 词条列表, "content": 词条列表}]
+    
+    内容使用完整的提取内容，而不是search.json中截断后的摘要。
+    """
+    doc_tokens = []
+    for item in search_tree:
+        record = get_document_record(os.path.join(config["root_dir"], item["path"]))
+        doc_tokens.append({
+            "title": tokenize_text(item["title"]),
+            "content": tokenize_text(record["content"] if record else item["content"])
+        })
+    return doc_tokens
+
+def compute_document_frequencies(doc_tokens):
+    """统计每个词条出现在多少个文档中"""
+    document_frequencies = collections.Counter()
+    for fields in doc_tokens:
+        document_frequencies.update(set(token for tokens in fields.values() for token in tokens))
+    return document_frequencies
+
+def bm25_idf(document_frequency, total_docs):
+    """BM25的逆文档频率（始终为正数）"""
+    return math.log((total_docs - document_frequency + 0.5) / (document_frequency + 0.5) + 1)
+
+def select_corpus_keywords(search_tree, doc_tokens, document_frequencies, max_keywords=10, total_docs=None):
+    """
+    按TF-IDF为每个文档重新选择关键词，使所有页面都有的常见词不会挤掉有区分度的词
+    
+    total_docs为语料的文档总数，只为部分文档选择关键词时需要指定（默认为search_tree的长度）。
+    """
+    caches = get_build_caches()
+    stopwords = caches.search_tokenizer["stopwords"]
+    if total_docs is None:
+        total_docs = len(search_tree)
+    for item, fields in zip(search_tree, doc_tokens):
+        term_freq = collections.Counter(
+            token for token in fields["content"]
+            if len(token) > 1 and token not in stopwords
+        )
+        # 得分相同时保持词条首次出现的顺序
+        ranked = sorted(
+            term_freq.items(),
+            key=lambda x: x[1] * bm25_idf(document_frequencies[x[0]], total_docs),
+            reverse=True
+        )
+        item["keywords"] = [word for word, freq in ranked[:max_keywords]]
+
+def get_bm25_average_lengths(doc_fields):
+    """各字段的平均词条数（doc_fields为每个文档各字段的词条列表）"""
+    total_docs = len(doc_fields)
+    field_count = len(doc_fields[0]) if doc_fields else 0
+    return [
+        sum(len(fields[field_id]) for fields in doc_fields) / total_docs
+        for field_id in range(field_count)
+    ]
+
+def get_bm25_norm(length, average_length):
+    """BM25的字段长度归一化系数 k1*(1-b+b*字段长度/平均长度)"""
+    return BM25_K1 * (1 - BM25_B + BM25_B * length / (average_length or 1))
+
+def get_bm25_weight(term_freq, norm, document_frequency, total_docs):
+    """词条在字段中的BM25权重"""
+    return bm25_idf(document_frequency, total_docs) * term_freq * (BM25_K1 + 1) / (term_freq + norm)
+
+def add_search_weights(search_tree, doc_tokens, document_frequencies, total_docs=None, average_lengths=None):
+    """
+    为每个搜索条目写入BM25字段归一化系数和关键词权重，前端排序时只需查表
+    
+    norms为 [标题, 内容] 的归一化系数（get_bm25_norm）；weights与keywords一一对应，
+    为关键词在文档内容中的BM25权重。只为部分文档计算时需要指定整个语料的文档总数和
+    各字段的平均词条数（默认根据search_tree统计）。
+    """
+    if total_docs is None:
+        total_docs = len(search_tree)
+    if average_lengths is None:
+        average_lengths = get_bm25_average_lengths([[fields["title"], fields["content"]] for fields in doc_tokens])
+    for item, fields in zip(search_tree, doc_tokens):
+        content_norm = get_bm25_norm(len(fields["content"]), average_lengths[1])
+        term_freq = collections.Counter(fields["content"])
+        item["norms"] = [
+            round(get_bm25_norm(len(fields["title"]), average_lengths[0]), 4),
+            round(content_norm, 4)
+        ]
+        item["weights"] = [
+            round(get_bm25_weight(term_freq[keyword], content_norm, document_frequencies[keyword], total_docs), 4)
+            for keyword in item["keywords"]
+        ]
+
+def score_search_item(item, query):
+    """
+    按预先计算的权重为匹配查询文本（子串匹配）的搜索条目打分（前端main.js的scoreSearchItem使用相同的算法）
+    
+    标题和内容按查询文本出现的次数和该字段的归一化系数计算BM25词频得分，
+    包含查询文本的关键词直接累加其权重，各部分按 SEARCH_FIELD_WEIGHTS 加权。
+    """
+    query = query.lower()
+    norms = item.get("norms") or [BM25_K1, BM25_K1]
+    
+    def field_score(text, norm):
+        term_freq = text.lower().count(query)
+        return term_freq * (BM25_K1 + 1) / (term_freq + norm) if term_freq else 0
+    
+    score = SEARCH_FIELD_WEIGHTS["title"] * field_score(item["title"], norms[0])
+    score += SEARCH_FIELD_WEIGHTS["content"] * field_score(item["content"], norms[1])
+    weights = item.get("weights") or []
+    for i, keyword in enumerate(item.get("keywords") or []):
+        if query in keyword.lower():
+            score += SEARCH_FIELD_WEIGHTS["keywords"] * (weights[i] if i < len(weights) else 1)
+    return score
+
+def rank_search_items(search_tree, query):
+    """返回标题、内容或关键词包含查询文本的搜索条目，按 score_search_item 从高到低排序（得分相同时保持原顺序）"""
+    query = query.lower()
+    matches = [
+        item for item in search_tree
+        if query in item["title"].lower() or query in item["content"].lower()
+        or any(query in keyword.lower() for keyword in item.get("keywords") or [])
+    ]
+    return sorted(matches, key=lambda item: -score_search_item(item, query))
+
+def build_inverted_index(search_tree, doc_tokens, document_frequencies):
+    """
+    根据搜索树构建带BM25权重的倒排索引
+    
+    文档编号与search.json中的顺序一致；每个词条对应一组倒排记录
+    [文档编号, 字段序号, BM25权重, 位置1, 位置2, ...]，位置为词条在该字段中的序号。
+    每个文档记录各字段的词条数（字段长度），并记录各字段的平均长度，
+    客户端可以直接累加权重排序，也可以根据这些数据用其他参数重新计算。
+    """
+    caches = get_build_caches()
+    stopwords = caches.search_tokenizer["stopwords"]
+    total_docs = len(search_tree)
+    
+    # 各文档每个字段的词条及其位置
+    doc_fields = []
+    for item, tokens in zip(search_tree, doc_tokens):
+        fields = {
+            "title": tokens["title"],
+            "keywords": item["keywords"],
+            "content": tokens["content"]
+        }
+        doc_fields.append([fields[field] for field in SEARCH_INDEX_FIELDS])
+    
+    average_lengths = get_bm25_average_lengths(doc_fields) or [0] * len(SEARCH_INDEX_FIELDS)
+    
+    postings = {}
+    docs = []
+    for doc_id, (item, fields) in enumerate(zip(search_tree, doc_fields)):
+        docs.append({
+            "title": item["title"],
+            "path": item["path"],
+            "lengths": [len(tokens) for tokens in fields]
+        })
+        for field_id, tokens in enumerate(fields):
+            positions = {}
+            for position, token in enumerate(tokens):
+                if token not in stopwords:
+                    positions.setdefault(token, []).append(position)
+            
+            norm = get_bm25_norm(len(tokens), average_lengths[field_id])
+            for token, token_positions in positions.items():
+                weight = get_bm25_weight(len(token_positions), norm, document_frequencies[token], total_docs)
+                postings.setdefault(token, []).append([doc_id, field_id, round(weight, 4)] + token_positions)
+    
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "tokenizer": caches.search_tokenizer["name"],
+        "stopwords": sorted(stopwords),
+        "fields": SEARCH_INDEX_FIELDS,
+        "bm25": {
+            "k1": BM25_K1,
+            "b": BM25_B,
+            "average_lengths": [round(length, 4) for length in average_lengths]
+        },
+        "docs": docs,
+        "postings": {token: postings[token] for token in sorted(postings)}
+    }
+
+class SearchIndex:
+    """倒排搜索索引的参考查询实现，用于在浏览器之外检查排序结果和查询开销"""
+
+    def __init__(self, data):
+        if data.get("version") != SEARCH_INDEX_VERSION:
+            raise ValueError(f"不支持的搜索索引版本: {data.get('version')}")
+        # 查询时使用与构建索引时相同的分词方式和停用词
+        self.tokenizer = TOKENIZERS[data["tokenizer"]]
+        self.stopwords = set(data["stopwords"])
+        self.fields = data["fields"]
+        self.docs = data["docs"]
+        self.postings = data["postings"]
+        # 最近一次查询访问的倒排记录数，用于衡量查询开销
+        self.postings_visited = 0
+
+    @classmethod
+    def load(cls, filepath):
+        """从文件加载倒排索引"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def query(self, text, limit=10):
+        """
+        查询包含所有查询词条的文档，按字段加权的BM25得分从高到低排序
+        
+        返回 [{"title", "path", "score"}]，得分相同时保持search.json中的顺序。
+        """
+        tokens = [token for token in dict.fromkeys(self.tokenizer(text, self.stopwords)) if token not in self.stopwords]
+        # 包含某个中文单字的二元词条命中时该单字必然命中，只有不属于任何二元词条的单字才需要查询
+        covered = set(char for token in tokens if len(token) > 1 and CJK_CHAR_PATTERN.match(token) for char in token)
+        tokens = [token for token in tokens if token not in covered]
+        self.postings_visited = 0
+        if not tokens:
+            return []
+        
+        scores = None
+        for token in tokens:
+            token_scores = {}
+            for posting in self.postings.get(token, []):
+                self.postings_visited += 1
+                doc_id, field_id = posting[0], posting[1]
+                weight = SEARCH_FIELD_WEIGHTS.get(self.fields[field_id], 1.0)
+                token_scores[doc_id] = token_scores.get(doc_id, 0) + weight * posting[2]
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc_id: score + token_scores[doc_id] for doc_id, score in scores.items() if doc_id in token_scores}
+            if not scores:
+                return []
+        
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        if limit:
+            ranked = ranked[:limit]
+        return [
+            {"title": self.docs[doc_id]["title"], "path": self.docs[doc_id]["path"], "score": score}
+            for doc_id, score in ranked
+        ]
+
+def inverted_index_enabled(args):
+    """是否生成倒排索引：前端只加载search/分片，倒排索引仅在指定--inverted-index时生成"""
+    return bool(args.inverted_index) and not args.no_inverted_index
+
+def prepare_search_index(search_tree, config, args, doc_tokens=None):
+    """
+    对整个语料统计一次文档频率，按TF-IDF选择关键词，为搜索条目写入BM25归一化系数和关键词权重，
+    并生成（指定了输出路径时的）倒排索引
+    
+    doc_tokens为已有的分词结果（与search_tree一一对应），为None时重新分词。
+    返回倒排索引，未启用倒排索引时返回None。
+    """
+    if doc_tokens is None:
+        doc_tokens = tokenize_search_documents(search_tree, config)
+    document_frequencies = compute_document_frequencies(doc_tokens)
+    if args.keyword_ranking == 'tfidf':
+        select_corpus_keywords(search_tree, doc_tokens, document_frequencies)
+    add_search_weights(search_tree, doc_tokens, document_frequencies)
+    
+    if not inverted_index_enabled(args):
+        return None
+    return build_inverted_index(search_tree, doc_tokens, document_frequencies)
+
+def write_search_files(search_tree, inverted_index, args):
+    """写入搜索索引文件（单文件或分片），以及倒排索引文件"""
+    if args.single_search_file:
+        write_json_file(args.search_index, search_tree, args.minify)
+    else:
+        write_search_shards(search_tree, args.search_shards)
+    if inverted_index is not None:
+        write_json_file(args.inverted_index, inverted_index, minify=True)
+
+def update_search_corpus(state, search_tree, dirty_paths, config):
+    """
+    把搜索树的变化应用到监听模式保存的语料统计，返回需要重新计算关键词和权重的条目及其分词结果
+    
+    只为新增的文档和dirty_paths中的文档（内容已变化）分词，并按这些文档和已删除的文档
+    增量更新文档频率；其他文档沿用之前的关键词和权重。
+    """
+    tokens = state["search_tokens"]
+    document_frequencies = state["document_frequencies"]
+    previous = {item["path"]: item for item in state["search"] or []}
+    current = set(item["path"] for item in search_tree)
+    
+    for path in list(tokens):
+        if path in current and path not in dirty_paths:
+            continue
+        for token in set(token for field in tokens.pop(path).values() for token in field):
+            document_frequencies[token] -= 1
+            if document_frequencies[token] <= 0:
+                del document_frequencies[token]
+    
+    changed_items = []
+    for item in search_tree:
+        if item["path"] in tokens:
+            # 重新扫描结构时条目是新生成的，沿用之前计算的关键词和权重
+            old_item = previous.get(item["path"])
+            if old_item is not None and old_item is not item:
+                for key in ("keywords", "norms", "weights"):
+                    if key in old_item:
+                        item[key] = old_item[key]
+        else:
+            changed_items.append(item)
+    
+    changed_tokens = tokenize_search_documents(changed_items, config)
+    for item, fields in zip(changed_items, changed_tokens):
+        tokens[item["path"]] = fields
+        document_frequencies.update(set(token for field in fields.values() for token in field))
+    state["search"] = search_tree
+    return changed_items, changed_tokens
+
+def update_search_weights(state, search_tree, dirty_paths, config, args):
+    """
+    监听模式下增量更新搜索条目：只为变化的文档分词并计算关键词和权重
+    
+    其他文档的权重依赖的全局统计（文档总数、文档频率、平均长度）此时已经变化，
+    标记为过期，由 refresh_search_weights 在一段时间内没有新的变化后统一刷新。
+    """
+    changed_items, changed_tokens = update_search_corpus(state, search_tree, dirty_paths, config)
+    if changed_items:
+        tokens = state["search_tokens"]
+        total_docs = len(search_tree)
+        # 平均长度只需要各文档的词条数，不需要重新分词
+        average_lengths = get_bm25_average_lengths([
+            [tokens[item["path"]]["title"], tokens[item["path"]]["content"]] for item in search_tree
+        ])
+        if args.keyword_ranking == 'tfidf':
+            select_corpus_keywords(changed_items, changed_tokens, state["document_frequencies"], total_docs=total_docs)
+        add_search_weights(changed_items, changed_tokens, state["document_frequencies"], total_docs, average_lengths)
+    state["search_stale"] = time.time()
+
+def refresh_search_weights(state, config, args):
+    """使用已缓存的分词结果重新统计整个语料，刷新所有搜索条目的关键词、权重和倒排索引并写入文件"""
+    search_tree = state["search"]
+    doc_tokens = [state["search_tokens"][item["path"]] for item in search_tree]
+    inverted_index = prepare_search_index(search_tree, config, args, doc_tokens)
+    state["document_frequencies"] = compute_document_frequencies(doc_tokens)
+    state["search_stale"] = None
+    write_search_files(search_tree, inverted_index, args)
+    if args.compress:
+        compress_artifacts(get_output_artifacts(args))
+    print("搜索索引统计已刷新")
+
+def get_search_shard_name(path):
+    """文档所属的分片名：data目录下的顶级目录名，根目录下的文档归入空名称分片"""
+    return path.split('/', 1)[0] if '/' in path else ""
+
+def get_utf16_units(text):
+    """小写文本的UTF-16编码单元，与前端toLowerCase后的字符串下标一致"""
+    data = text.lower().encode('utf-16-le')
+    return struct.unpack(f'<{len(data) // 2}H', data)
+
+def get_search_filter_grams(text):
+    """
+    查询文本需要在过滤器中检查的字符组合
+    
+    只有一个字的查询检查该字本身，更长的查询检查每个相邻两字：包含查询文本的字段
+    一定包含查询的每个相邻两字，因此过滤器不会漏掉前端子串匹配能命中的分片。
+    """
+    units = get_utf16_units(text)
+    if len(units) == 1:
+        return [units]
+    return [units[i:i + 2] for i in range(len(units) - 1)]
+
+def get_search_filter_positions(gram, bits, hashes):
+    """字符组合在过滤器中对应的位（FNV-1a哈希加双重哈希，前端main.js使用相同的算法）"""
+    h1 = 0x811c9dc5
+    for unit in gram:
+        h1 = ((h1 ^ unit) * 0x01000193) & 0xffffffff
+    h2 = (((h1 >> 17) | (h1 << 15)) & 0xffffffff) | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+def build_search_filter(items):
+    """为一个分片中所有文档的标题、内容和关键词建立布隆过滤器"""
+    grams = set()
+    for item in items:
+        for text in [item["title"], item["content"]] + list(item.get("keywords") or []):
+            units = get_utf16_units(text)
+            grams.update(units[i:i + 1] for i in range(len(units)))
+            grams.update(units[i:i + 2] for i in range(len(units) - 1))
+    
+    # 位数取64的倍数
+    bits = max(64, -(-len(grams) * SEARCH_FILTER_BITS_PER_GRAM // 64) * 64)
+    bitmap = bytearray(bits // 8)
+    for gram in grams:
+        for position in get_search_filter_positions(gram, bits, SEARCH_FILTER_HASHES):
+            bitmap[position >> 3] |= 1 << (position & 7)
+    return {"bits": bits, "hashes": SEARCH_FILTER_HASHES, "data": base64.b64encode(bytes(bitmap)).decode('ascii')}
+
+def search_filter_may_contain(search_filter, query):
+    """
+    分片中是否可能有文档的标题、内容或关键词包含查询文本（子串匹配）
+    
+    返回False时分片一定没有匹配的文档，返回True时可能有（存在少量误判）。
+    """
+    if not query:
+        return True
+    bitmap = base64.b64decode(search_filter["data"])
+    return all(
+        bitmap[position >> 3] & (1 << (position & 7))
+        for gram in get_search_filter_grams(query)
+        for position in get_search_filter_positions(gram, search_filter["bits"], search_filter["hashes"])
+    )
+
+def write_search_shards(search_tree, shard_dir):
+    """
+    按顶级目录把搜索索引拆分为多个分片，并写入分片清单
+    
+    分片文件以内容哈希命名，内容不变时文件名不变，客户端可以按哈希长期缓存；
+    清单记录每个分片的名称、文件名、大小、哈希、文档数和过滤器，客户端先读取清单，
+    搜索时只加载过滤器显示可能包含查询文本的分片。清单最后写入，之后再删除不再引用的旧分片。
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_file = os.path.join(shard_dir, SEARCH_SHARD_MANIFEST)
+    
+    # 内容未变化的分片沿用已有清单中的过滤器
+    previous_filters = {}
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get("version") == SEARCH_SHARD_VERSION:
+            previous_filters = {shard["hash"]: shard["filter"] for shard in previous["shards"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    shards = {}
+    for item in search_tree:
+        shards.setdefault(get_search_shard_name(item["path"]), []).append(item)
+    
+    manifest = {"version": SEARCH_SHARD_VERSION, "count": len(search_tree), "shards": []}
+    for name, items in shards.items():
+        data = json.dumps(items, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        filename = digest[:16] + '.json'
+        filepath = os.path.join(shard_dir, filename)
+        if not os.path.exists(filepath):
+            temp_file = filepath + '.tmp'
+            with open(temp_file, 'wb') as f:
+                f.write(data)
+            os.replace(temp_file, filepath)
+            profile_count("bytes_written", len(data))
+        manifest["shards"].append({
+            "name": name,
+            "file": filename,
+            "size": len(data),
+            "hash": digest,
+            "count": len(items),
+            "filter": previous_filters.get(digest) or build_search_filter(items)
+        })
+    
+    write_json_file(manifest_file, manifest)
+    
+    # 删除不再被清单引用的旧分片（包括其预压缩文件）
+    current_files = set(shard["file"] for shard in manifest["shards"])
+    for entry in os.scandir(shard_dir):
+        match = SEARCH_SHARD_FILE_PATTERN.match(entry.name)
+        if match and match.group(1) not in current_files:
+            os.remove(entry.path)
+
+def get_output_artifacts(args):
+    """列出本次构建生成的所有JSON文件"""
+    artifacts = [args.output]
+    if not args.no_navigation:
+        artifacts.append(args.navigation)
+    if not args.no_search:
+        if args.single_search_file:
+            artifacts.append(args.search_index)
+        else:
+            manifest_file = os.path.join(args.search_shards, SEARCH_SHARD_MANIFEST)
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            artifacts.append(manifest_file)
+            artifacts.extend(os.path.join(args.search_shards, shard["file"]) for shard in manifest["shards"])
+        if inverted_index_enabled(args):
+            artifacts.append(args.inverted_index)
+    return artifacts
+
+def write_compressed_file(filepath, data, compress, decompress):
+    """
+    写入预压缩文件，已有的预压缩文件解压后与源文件一致时跳过
+    
+    返回 (压缩后大小, 是否重新生成)
+    """
+    if os.path.exists(filepath):
+        try:
+            with open(filepath, 'rb') as f:
+                compressed = f.read()
+            if decompress(compressed) == data:
+                return len(compressed), False
+        except Exception:
+            pass
+    
+    compressed = compress(data)
+    temp_file = filepath + '.tmp'
+    with open(temp_file, 'wb') as f:
+        f.write(compressed)
+    os.replace(temp_file, filepath)
+    profile_count("bytes_written", len(compressed))
+    return len(compressed), True
+
+def compress_artifacts(artifacts):
+    """
+    为生成的JSON文件写入最高压缩级别的.gz（以及安装了brotli时的.br）预压缩文件，并输出压缩报告
+    
+    gzip文件头中的时间戳固定为0，相同内容总是得到相同的压缩文件。
+    """
+    codecs = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0), gzip.decompress)]
+    if BROTLI_AVAILABLE:
+        codecs.append((".br", lambda data: brotli.compress(data, quality=11), brotli.decompress))
+    
+    print("预压缩报告:")
+    print(f"  {'文件':<40} {'原始大小':>10} " + " ".join(f"{suffix:>10}" for suffix, _, _ in codecs))
+    total_raw = 0
+    totals = [0] * len(codecs)
+    regenerated = 0
+    for artifact in artifacts:
+        with open(artifact, 'rb') as f:
+            data = f.read()
+        sizes = []
+        for i, (suffix, compress, decompress) in enumerate(codecs):
+            size, written = write_compressed_file(artifact + suffix, data, compress, decompress)
+            sizes.append(size)
+            totals[i] += size
+            regenerated += written
+        total_raw += len(data)
+        print(f"  {artifact:<40} {len(data):>10} " + " ".join(f"{size:>10}" for size in sizes))
+    print(f"  {'合计':<40} {total_raw:>10} " + " ".join(f"{size:>10}" for size in totals))
+    print(f"  重新生成 {regenerated} 个预压缩文件" + ("" if BROTLI_AVAILABLE else "（未安装brotli库，跳过.br文件）"))
+
+def write_json_file(filepath, data, minify=False):
+    """写入JSON文件（先写临时文件再替换，读取方不会看到写了一半的文件）"""
+    # json.dumps一次性编码（不带缩进时使用C实现的编码器），比json.dump逐块写入快
+    if minify:
+        text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=4)
+    temp_file = filepath + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+        profile_count("bytes_written", f.tell())
+    os.replace(temp_file, filepath)
+
+def index_structure_nodes(structure):
+    """建立 文档路径 -> 结构节点 的映射（包括索引页节点）"""
+    nodes = {}
+    stack = [structure]
+    while stack:
+        node = stack.pop()
+        if node.get("index"):
+            nodes[node["index"]["path"]] = node["index"]
+        for child in node.get("children", []):
+            if "index" in child:
+                stack.append(child)
+            elif child.get("path"):
+                nodes[child["path"]] = child
+    return nodes
+
+def take_document_snapshot(root_dir, config):
+    """记录文档目录中所有文档（以及忽略规则文件）的大小和修改时间，用于轮询检测变化"""
+    snapshot = {}
+    paths = collect_document_files(root_dir, config)
+    paths.append(os.path.join(root_dir, DOC_IGNORE_FILE))
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+def start_document_observer(root_dir, config, changes):
+    """使用watchdog（Linux上基于inotify）监听文档目录，变化的路径放入changes队列"""
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    
+    class DocumentEventHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if event.event_type in ("opened", "closed_no_write"):
+                return
+            # 目录的修改事件伴随其中文件的变化产生，由文件事件处理
+            if event.is_directory and event.event_type == "modified":
+                return
+            for path in (event.src_path, getattr(event, "dest_path", None)):
+                if not path:
+                    continue
+                name = os.path.basename(path)
+                if event.is_directory or is_supported_file(name, config) or name == DOC_IGNORE_FILE:
+                    changes.put(path)
+    
+    observer = Observer()
+    observer.schedule(DocumentEventHandler(), root_dir, recursive=True)
+    observer.start()
+    return observer
+
+def apply_document_changes(changed_paths, state, config, args, repo):
+    """
+    将文档变化应用到内存中的结构和搜索索引
+    
+    已有文档的内容变化只更新对应的节点和搜索条目；新增、删除、重命名等结构变化会
+    使用已缓存的解析结果和Git索引重新扫描目录结构。搜索索引只为变化的文档重新分词和
+    计算权重（见 update_search_weights），此时不重新生成倒排索引。
+    """
+    caches = get_build_caches()
+    root_dir = config["root_dir"]
+    nodes = index_structure_nodes(state["structure"])
+    modified = []
+    dirty_paths = set()
+    structural = False
+    
+    for file_path in changed_paths:
+        # 使修改过的文档解析结果失效（增量构建的清单会根据文件状态自动检测）
+        caches.document_records.pop(get_document_key(file_path), None)
+        rel_path = os.path.relpath(file_path, root_dir).replace("\\", "/")
+        dirty_paths.add(rel_path)
+        if rel_path in nodes and os.path.isfile(file_path):
+            modified.append(rel_path)
+        else:
+            structural = True
+    
+    if structural:
+        structure = scan_directory(root_dir, config, repo=repo, history_index=state["history_index"])
+        structure = normalize_paths(structure)
+        if args.merge:
+            merge_report = {}
+            structure = merge_structures(state["structure"], structure, config, merge_report)
+            print_merge_report(merge_report)
+        state["structure"] = structure
+        if not args.no_search:
+            update_search_weights(state, build_search_tree(structure, config), dirty_paths, config, args)
+        print(f"文档结构已更新: 共 {count_files(structure)} 个文件")
+    else:
+        search_items = {item["path"]: item for item in state["search"] or []}
+        for rel_path in modified:
+            node = nodes[rel_path]
+            file_path = os.path.join(root_dir, rel_path)
+            record = get_document_record(file_path)
+            if record is None:
+                continue
+            # 合并模式下保留已有标题，与 --merge 构建的行为一致
+            if not args.merge:
+                # 索引页节点没有children字段，标题为空时与扫描时一样使用默认标题
+                node["title"] = record["title"] if "children" in node else (record["title"] or "文档首页")
+            if rel_path in search_items:
+                search_items[rel_path].update(make_search_item(node["title"], rel_path, record))
+            print(f"文档已更新: {rel_path}")
+        if not args.no_search:
+            update_search_weights(state, state["search"], dirty_paths, config, args)
+    
+    write_structure_file(args.output, state["structure"], args)
+    write_navigation_file(state["structure"], config, args)
+    if not args.no_search:
+        # 倒排索引在刷新语料统计时重新生成
+        write_search_files(state["search"], None, args)
+    if args.compress:
+        compress_artifacts(get_output_artifacts(args))
+
+def refresh_git_info(state, config, args, repo):
+    """HEAD变化后增量更新Git历史索引，并批量刷新所有节点的Git信息"""
+    cache_file = None if args.no_git_cache else args.git_cache
+    history_index = load_or_build_git_history_index(repo, cache_file)
+    state["history_index"] = history_index
+    
+    if config["github"]["enable"]:
+        usernames = collect_github_usernames(repo, history_index, config["root_dir"])
+        resolve_github_users(usernames, args.github_concurrency)
+        save_github_cache(args.github_cache)
+    
+    for rel_path, node in index_structure_nodes(state["structure"]).items():
+        git_info = get_git_info(repo, os.path.join(config["root_dir"], rel_path), config, history_index)
+        if git_info["last_modified"] or git_info["contributors"]:
+            node["git"] = git_info
+        else:
+            node.pop("git", None)
+    
+    write_structure_file(args.output, state["structure"], args)
+    # path.json已变化，导航数据中记录的哈希需要同时更新
+    write_navigation_file(state["structure"], config, args)
+    if args.compress:
+        compress_artifacts([args.output] + ([] if args.no_navigation else [args.navigation]))
+    print("Git信息已刷新")
+
+def watch_documents(state, config, args, repo, stop=None):
+    """
+    监听文档目录，文档变化时实时更新path.json和搜索索引
+    
+    stop为threading.Event时，设置后停止监听（否则直到按下Ctrl+C）。
+    """
+    root_dir = config["root_dir"]
+    changes = queue.Queue()
+    observer = None
+    snapshot = None
+    if WATCHDOG_AVAILABLE:
+        observer = start_document_observer(root_dir, config, changes)
+        print(f"正在监听文档目录: {root_dir}（按 Ctrl+C 停止）")
+    else:
+        snapshot = take_document_snapshot(root_dir, config)
+        print(f"未安装watchdog，使用轮询方式监听文档目录: {root_dir}（按 Ctrl+C 停止）")
+    
+    head = repo.head() if repo else None
+    last_git_check = time.time()
+    
+    try:
+        while not (stop and stop.is_set()):
+            changed = set()
+            if observer:
+                try:
+                    changed.add(changes.get(timeout=WATCH_POLL_INTERVAL))
+                    # 防抖：持续收集变化，直到一段时间内没有新的变化
+                    while True:
+                        changed.add(changes.get(timeout=WATCH_DEBOUNCE))
+                except queue.Empty:
+                    pass
+            else:
+                time.sleep(WATCH_POLL_INTERVAL)
+                new_snapshot = take_document_snapshot(root_dir, config)
+                changed = {
+                    path for path in set(snapshot) | set(new_snapshot)
+                    if snapshot.get(path) != new_snapshot.get(path)
+                }
+                snapshot = new_snapshot
+            
+            if changed:
+                try:
+                    apply_document_changes(changed, state, config, args, repo)
+                except Exception as e:
+                    print(f"更新文档索引失败: {e}")
+            elif state.get("search_stale") and time.time() - state["search_stale"] >= WATCH_SEARCH_REFRESH_DELAY:
+                # 一段时间内没有新的变化，重新统计整个语料
+                try:
+                    refresh_search_weights(state, config, args)
+                except Exception as e:
+                    print(f"刷新搜索索引统计失败: {e}")
+            
+            # Git信息只在提交变化后批量刷新，保存文件时不会触发Git遍历
+            if repo and time.time() - last_git_check >= WATCH_GIT_INTERVAL:
+                last_git_check = time.time()
+                try:
+                    new_head = repo.head()
+                    if new_head != head:
+                        head = new_head
+                        refresh_git_info(state, config, args, repo)
+                except Exception as e:
+                    print(f"刷新Git信息失败: {e}")
+    except KeyboardInterrupt:
+        print("已停止监听")
+    finally:
+        if observer:
+            observer.stop()
+            observer.join()
+
+def profile_count(name, amount=1):
+    """性能分析计数器加上amount（未启用--profile时不做任何事）"""
+    caches = get_build_caches()
+    if caches.profile["enabled"]:
+        with caches.profile_lock:
+            caches.profile["counters"][name] = caches.profile["counters"].get(name, 0) + amount
+
+def profile_document(file_path, seconds):
+    """记录单个文档的解析耗时"""
+    caches = get_build_caches()
+    if caches.profile["enabled"]:
+        with caches.profile_lock:
+            caches.profile["documents"].append((seconds, file_path))
+
+@contextlib.contextmanager
+def phase_timer(name):
+    """
+    记录一个构建阶段的耗时（秒），同名阶段的耗时累加
+    
+    启用--profile时同时记录CPU时间（本进程所有线程，不含进程池子进程），
+    并在该阶段为 --profile-cprofile 指定的阶段时用cProfile分析。
+    """
+    caches = get_build_caches()
+    profile = caches.profile
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    profiler = None
+    if profile["enabled"] and profile["cprofile_phase"] == name:
+        import cProfile
+        profiler = profile["cprofile"] = profile["cprofile"] or cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        wall = time.perf_counter() - start
+        caches.phase_timings[name] = caches.phase_timings.get(name, 0) + wall
+        if profile["enabled"]:
+            phase = profile["phases"].setdefault(name, {"wall": 0, "cpu": 0, "calls": 0})
+            phase["wall"] += wall
+            phase["cpu"] += time.process_time() - cpu_start
+            phase["calls"] += 1
+
+def write_profile_report(filepath, started, cpu_started, top):
+    """把性能分析结果写入JSON文件，并输出摘要表格（以及cProfile统计）"""
+    total_wall = time.perf_counter() - started
+    total_cpu = time.process_time() - cpu_started
+    profile = get_build_caches().profile
+    phases = profile["phases"]
+    slowest = sorted(profile["documents"], reverse=True)[:top]
+    report = {
+        "version": PROFILE_VERSION,
+        "total": {"wall": total_wall, "cpu": total_cpu},
+        "phases": phases,
+        # 不属于任何阶段的耗时（读取配置、保存缓存等）
+        "other": {
+            "wall": total_wall - sum(phase["wall"] for phase in phases.values()),
+            "cpu": total_cpu - sum(phase["cpu"] for phase in phases.values())
+        },
+        "counters": dict(sorted(profile["counters"].items())),
+        "slowest_documents": [{"path": path, "seconds": seconds} for seconds, path in slowest]
+    }
+    
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_json_file(filepath, report)
+    
+    print("=" * 60)
+    print("性能分析报告")
+    print(f"  {'阶段':<16} {'墙钟时间(s)':>12} {'CPU时间(s)':>12} {'占比':>8}")
+    rows = [(name, phase["wall"], phase["cpu"]) for name, phase in phases.items()]
+    rows.append(("其他", report["other"]["wall"], report["other"]["cpu"]))
+    for name, wall, cpu in rows:
+        share = wall / total_wall * 100 if total_wall else 0
+        print(f"  {name:<16} {wall:>12.3f} {cpu:>12.3f} {share:>7.1f}%")
+    print(f"  {'合计':<16} {total_wall:>12.3f} {total_cpu:>12.3f}")
+    if report["counters"]:
+        print("计数器:")
+        for name, value in report["counters"].items():
+            print(f"  {name:<28} {value:>12}")
+    if slowest:
+        print(f"最慢的 {len(slowest)} 个文档:")
+        for seconds, path in slowest:
+            print(f"  {seconds * 1000:>10.2f} ms  {path}")
+    print(f"性能分析报告已写入: {filepath}")
+    
+    if profile["cprofile"]:
+        stats_file = os.path.splitext(filepath)[0] + f".{profile['cprofile_phase']}.prof"
+        profile["cprofile"].dump_stats(stats_file)
+        print(f"阶段 {profile['cprofile_phase']} 的cProfile统计已写入: {stats_file}（累计耗时前20项如下）")
+        import pstats
+        pstats.Stats(profile["cprofile"]).sort_stats('cumulative').print_stats(20)
+    print("=" * 60)
+
+def write_phase_timings(filepath, started, **extra):
+    """把各阶段耗时写入JSON文件，供基准测试读取"""
+    write_json_file(filepath, {
+        "version": PHASE_TIMINGS_VERSION,
+        "total": time.perf_counter() - started,
+        "phases": get_build_caches().phase_timings,
+        **extra
+    })
+
+def add_git_info(structure, repo, config, history_index):
+    """为文档结构中所有文档添加Git信息（用于扫描时未获取Git信息的结构，见 Builder.enrich）"""
+    root_dir = config["root_dir"]
+    stack = [structure]
+    while stack:
+        node = stack.pop()
+        documents = [node["index"]] if node.get("index") else []
+        for child in node.get("children", []):
+            if "index" in child:
+                stack.append(child)
+            else:
+                documents.append(child)
+        for document in documents:
+            git_info = get_git_info(repo, os.path.join(root_dir, document["path"]), config, history_index)
+            if git_info["last_modified"] or git_info["contributors"]:
+                document["git"] = git_info
+
+class Builder:
+    """
+    可导入的文档构建器
     
-    # 定义停用词
-    stopwords = set(['的', '了', '和', '是', '在', '我', '有', '个', '与', '这', '你', '们',
-                     'the', 'and', 'is', 'in', 'to', 'of', 'a', 'for', 'on', 'that', 'by', 'this', 'with'])
+    构建分为以下阶段，可以单独调用，也可以用 run() 依次执行：
+        scan    扫描文档目录，解析文档标题和内容
+        enrich  读取Git历史和GitHub用户信息，为文档添加贡献者信息
+        merge   合并已有的path.json（merge选项）
+        index   生成搜索条目，统计语料并选择关键词
+        write   写入path.json、导航数据、搜索索引、预压缩文件、文档清单和HTML元数据
     
-    # 分词并统计频率
-    words = re.findall(r'\b\w+\b|[\u4e00-\u9fa5]+', content.lower())
-    word_freq = {}
+    GitHub用户缓存、作者身份索引和文档解析结果等缓存由每个实例单独持有（见 BuildCaches），
+    运行时只作为当前线程的缓存，不同线程中的实例可以同时构建。长期运行的进程（预览服务器、测试）
+    可以用同一个实例多次构建，不必每次重新启动解释器和导入依赖。
     
-    for word in words:
-        if len(word) > 1 and word not in stopwords:
-            word_freq[word] = word_freq.get(word, 0) + 1
+    用法:
+        builder = Builder(root="data", merge=True, no_github=True)
+        structure = builder.run()
+    """
     
-    # 按频率排序并返回前N个关键词
-    sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-    return [word for word, freq in sorted_words[:max_keywords]]
-
-def build_search_tree(structure, config, result=None):
-    """构建搜索树"""
-    if result is None:
-        result = []
+    def __init__(self, args=None, config_overrides=None, **options):
+        """
+        args为命令行参数（argparse.Namespace），options按参数名覆盖其中的选项（如 merge=True、
+        config="path/to/config.js"），未指定的选项使用命令行的默认值；config_overrides为配置字典，
+        为None时从选项config指定的配置文件读取。
+        """
+        args = argparse.Namespace(**vars(args)) if args is not None else build_argument_parser().parse_args([])
+        for name, value in options.items():
+            if not hasattr(args, name):
+                raise TypeError(f"未知的构建选项: {name}")
+            setattr(args, name, value)
+        self.args = args
+        
+        self.config = copy.deepcopy(config_overrides) if config_overrides is not None else load_config(args.config)
+        # 命令行参数覆盖配置文件
+        if args.root:
+            self.config["root_dir"] = args.root
+        # 分词方式（如果命令行指定）
+        if args.tokenizer:
+            self.config["search"]["tokenizer"] = args.tokenizer
+        # 禁用Git功能（如果命令行指定）
+        if args.no_git:
+            self.config["git"]["enable"] = False
+        # 禁用GitHub API查询（如果命令行指定）
+        if args.no_github:
+            self.config["github"]["enable"] = False
+        self.root_dir = self.config["root_dir"]
+        
+        self.caches = BuildCaches()
+        if args.github_api_url:
+            self.caches.github_api_url = args.github_api_url
+        if args.profile:
+            self.caches.profile["enabled"] = True
+            self.caches.profile["cprofile_phase"] = args.profile_cprofile
+        self.github_cache_loaded = False
+        self.repo = None
+        self.history_index = None
+        self.structure = None
+        self.search_tree = None
+        self.search_tokens = None
+        self.inverted_index = None
+        self.merge_report = {}
+        self.total_files = 0
+        self.total_dirs = 0
+        with self.activate():
+            configure_tokenizer(self.config)
     
-    # 处理索引文档
-    if structure.get("index"):
-        file_path = os.path.join(config["root_dir"], structure["index"]["path"])
-        if os.path.exists(file_path):
-            content = extract_content(file_path)
-            keywords = extract_keywords(content)
+    def activate(self):
+        """在当前线程中使用本实例的缓存（上下文管理器，可以嵌套）"""
+        return use_build_caches(self.caches)
+    
+    def run(self):
+        """依次执行所有构建阶段，返回文档结构"""
+        with self.activate():
+            self.scan()
+            self.enrich()
+            self.merge()
+            self.index()
+            self.write()
+        return self.structure
+    
+    def scan(self):
+        """扫描文档目录，生成文档结构（不含Git信息）"""
+        caches = self.caches
+        args = self.args
+        if not os.path.exists(self.root_dir):
+            raise FileNotFoundError(f"文档根目录 {self.root_dir} 不存在")
+        
+        with self.activate():
+            print(f"开始扫描文档目录: {self.root_dir}")
             
-            search_item = {
-                "title": structure["index"]["title"],
-                "path": structure["index"]["path"],
-                "content": content[:200] + "..." if len(content) > 200 else content,
-                "keywords": keywords
-            }
-            result.append(search_item)
+            # 增量构建时加载文档清单，同一实例再次构建时直接使用内存中的清单；
+            # 否则丢弃上次构建的解析结果（文档可能已经变化）
+            if args.incremental:
+                if caches.document_manifest is None:
+                    load_document_manifest(args.manifest, self.config)
+                else:
+                    caches.document_manifest["seen"] = set()
+                    caches.document_manifest["extracted"] = 0
+            else:
+                caches.document_records.clear()
+            
+            # 使用进程池并行解析文档
+            jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+            if jobs > 1:
+                print(f"使用 {jobs} 个进程并行提取文档内容...")
+                with phase_timer("prefetch"):
+                    extracted = prefetch_documents(self.root_dir, self.config, jobs)
+                print(f"已提取 {extracted} 个文档")
+            
+            with phase_timer("scan"):
+                self.structure = normalize_paths(scan_directory(self.root_dir, self.config))
+        return self.structure
     
-    # 处理文件
-    for child in structure.get("children", []):
-        if not child.get("children"):
-            # 这是一个文件
-            file_path = os.path.join(config["root_dir"], child["path"])
-            if os.path.exists(file_path):
-                content = extract_content(file_path)
-                keywords = extract_keywords(content)
+    def open_repo(self):
+        """打开文档所在的Git仓库（使用git_backend选项指定的Git后端），不在仓库中时返回None"""
+        if self.repo is None:
+            self.repo = open_git_backend(os.path.abspath(os.curdir), self.args.git_backend)
+            if self.repo:
+                print(f"检测到Git仓库: {self.repo.working_dir}（Git后端: {self.repo.name}）")
+            else:
+                print("未检测到Git仓库，Git相关功能将被禁用")
+        return self.repo
+    
+    def enrich(self):
+        """读取Git历史索引和GitHub用户信息，为文档结构中的文档添加Git信息"""
+        args = self.args
+        config = self.config
+        with self.activate():
+            with phase_timer("git"):
+                if not GIT_AVAILABLE or not config["git"]["enable"]:
+                    return self.structure
+                try:
+                    repo = self.open_repo()
+                    if repo is None:
+                        return self.structure
+                    
+                    # 加载持久化的GitHub用户缓存（同一实例只加载一次）
+                    if not self.github_cache_loaded:
+                        load_github_cache(args.github_cache, args.refresh_github_cache)
+                        self.github_cache_loaded = True
+                    
+                    # 遍历一次提交日志，构建作者身份索引，供GitHub用户名查询使用
+                    print("构建作者身份索引...")
+                    identity = build_author_identity_index(repo, args.author_map)
+                    print(f"已索引 {len(identity['email_to_names'])} 个作者邮箱")
+                    
+                    # 单次遍历Git历史，构建所有文件的提交信息索引
+                    print("构建Git历史索引...")
+                    try:
+                        cache_file = None if args.no_git_cache else args.git_cache
+                        self.history_index = load_or_build_git_history_index(repo, cache_file)
+                        print(f"已索引 {len(self.history_index)} 个文件的Git历史")
+                    except Exception as e:
+                        print(f"构建Git历史索引失败: {e}")
+                    
+                    # 收集文档作者对应的GitHub用户名，批量并发获取用户信息
+                    if self.history_index and config["github"]["enable"]:
+                        usernames = collect_github_usernames(repo, self.history_index, self.root_dir)
+                        fetched = resolve_github_users(usernames, args.github_concurrency)
+                        print(f"已获取 {fetched} 个GitHub用户信息（共 {len(usernames)} 个用户）")
+                except Exception as e:
+                    print(f"Git初始化错误: {e}")
                 
-                search_item = {
-                    "title": child["title"],
-                    "path": child["path"],
-                    "content": content[:200] + "..." if len(content) > 200 else content,
-                    "keywords": keywords
-                }
-                result.append(search_item)
-        else:
-            # 这是一个目录，递归处理
-            build_search_tree(child, config, result)
+                if self.repo:
+                    add_git_info(self.structure, self.repo, config, self.history_index)
+            
+            # 保存GitHub用户缓存，供下次构建使用
+            if self.repo:
+                save_github_cache(args.github_cache)
+        return self.structure
     
-    return result
+    def merge(self):
+        """合并已有的path.json（未启用merge选项或文件不存在时不做任何处理）"""
+        args = self.args
+        self.merge_report = {}
+        if not args.merge or not os.path.exists(args.output):
+            return self.structure
+        
+        with self.activate():
+            print(f"合并已有的JSON文件: {args.output}")
+            with phase_timer("merge"):
+                existing = load_existing_structure(args.output)
+                if existing:
+                    self.structure = merge_structures(existing, self.structure, self.config, self.merge_report)
+                    print_merge_report(self.merge_report)
+                if args.merge_report:
+                    write_json_file(args.merge_report, self.merge_report)
+        return self.structure
+    
+    def index(self):
+        """生成搜索条目，统计语料并选择关键词（禁用搜索时跳过）"""
+        args = self.args
+        self.search_tree = None
+        self.search_tokens = None
+        self.inverted_index = None
+        if args.no_search:
+            return None
+        
+        with self.activate():
+            print(f"构建搜索索引: {args.search_index if args.single_search_file else args.search_shards}")
+            with phase_timer("search"):
+                self.search_tree = build_search_tree(self.structure, self.config)
+                self.search_tokens = tokenize_search_documents(self.search_tree, self.config)
+                self.inverted_index = prepare_search_index(self.search_tree, self.config, args, self.search_tokens)
+        return self.search_tree
+    
+    def write(self):
+        """写入path.json、导航数据、搜索索引、预压缩文件、文档清单和HTML元数据"""
+        args = self.args
+        with self.activate():
+            with phase_timer("write"):
+                write_structure_file(args.output, self.structure, args)
+                write_navigation_file(self.structure, self.config, args)
+            
+            if self.search_tree is not None:
+                with phase_timer("search"):
+                    write_search_files(self.search_tree, self.inverted_index, args)
+            
+            # 生成预压缩文件
+            if args.compress:
+                with phase_timer("compress"):
+                    compress_artifacts(get_output_artifacts(args))
+            
+            # 保存增量构建的文档清单
+            if args.incremental:
+                save_document_manifest(args.manifest)
+            
+            self.total_files = count_files(self.structure)
+            self.total_dirs = count_dirs(self.structure)
+            
+            # 更新HTML元数据
+            with phase_timer("html_metadata"):
+                html_files_to_update = glob.glob('*.html')
+                # 添加main目录下的HTML文件
+                main_html_files = glob.glob('main/*.html')
+                html_files_to_update.extend(main_html_files)
+                update_html_metadata(html_files_to_update, self.config)
+            
+            print(f"文档扫描完成: 共 {self.total_files} 个文件, {self.total_dirs} 个目录")
+    
+    def watch(self, stop=None):
+        """
+        监听文档目录，文档变化时实时更新索引文件（需要先完成一次构建）
+        
+        stop为threading.Event时，设置后停止监听。
+        """
+        with self.activate():
+            search_tokens = dict(zip((item["path"] for item in self.search_tree or []), self.search_tokens or []))
+            state = {
+                "structure": self.structure,
+                "search": self.search_tree,
+                "history_index": self.history_index,
+                # 每个文档的分词结果和整个语料的文档频率，文档变化时增量更新
+                "search_tokens": search_tokens,
+                "document_frequencies": compute_document_frequencies(search_tokens.values()),
+                # 语料统计过期的时间（有文档变化但尚未刷新所有条目的权重），None表示未过期
+                "search_stale": None
+            }
+            watch_documents(state, self.config, self.args, self.repo, stop)
 
-def main():
-    """主函数"""
+def build_argument_parser():
+    """创建命令行参数解析器（Builder使用其中的默认值作为构建选项的默认值）"""
     parser = argparse.ArgumentParser(description="EasyDocument 文档路径生成工具")
     parser.add_argument('--root', default=DEFAULT_CONFIG["root_dir"], help='文档根目录')
     parser.add_argument('--output', default='path.json', help='输出的JSON文件路径')
-    parser.add_argument('--search-index', default='search.json', help='搜索索引文件路径')
+    parser.add_argument('--path-format', choices=['compact', 'full'], default='full', help='path.json格式：full（默认，每个节点保存完整贡献者信息）或 compact（贡献者集中到authors表，节点按编号引用）')
+    parser.add_argument('--navigation', default='nav.json', help='导航数据文件路径（按顺序排列的文档列表和路径查找表）')
+    parser.add_argument('--no-navigation', action='store_true', help='不生成导航数据文件')
+    parser.add_argument('--minify', action='store_true', help='输出不带缩进的紧凑JSON（path.json和单文件搜索索引）')
+    parser.add_argument('--compress', action='store_true', help='为生成的JSON文件写入.gz（以及安装了brotli时的.br）预压缩文件')
+    parser.add_argument('--search-index', default='search.json', help='单文件搜索索引路径（配合--single-search-file使用）')
+    parser.add_argument('--search-shards', default='search', help='分片搜索索引目录（包含分片清单manifest.json）')
+    parser.add_argument('--single-search-file', action='store_true', help='生成单个搜索索引文件，而不是按顶级目录分片')
+    parser.add_argument('--tokenizer', choices=sorted(TOKENIZERS), help='关键词提取和搜索索引使用的分词方式（默认读取配置文件，否则为cjk）')
+    parser.add_argument('--keyword-ranking', choices=['tfidf', 'frequency'], default='tfidf', help='关键词选择方式：tfidf（按整个文档集的TF-IDF）或 frequency（按单个文档内的词频）')
+    parser.add_argument('--inverted-index', default=None, help='倒排搜索索引文件路径，如 search-index.json（默认不生成，前端只使用search/分片）')
+    parser.add_argument('--no-inverted-index', action='store_true', help='不生成倒排搜索索引（即使指定了--inverted-index）')
     parser.add_argument('--merge', action='store_true', help='合并已有的JSON文件，保留顺序和自定义字段')
+    parser.add_argument('--merge-report', help='把合并的变化报告（新增、移除、移动、标题不同的条目）写入指定的JSON文件')
+    parser.add_argument('--fail-on-change', action='append', choices=MERGE_CHANGE_KINDS, help='合并时出现指定类型的变化则以状态码1退出（可重复指定，用于CI检查）')
     parser.add_argument('--config', default='config.js', help='配置文件路径')
     parser.add_argument('--no-git', action='store_true', help='禁用Git相关功能')
     parser.add_argument('--no-search', action='store_true', help='禁用搜索索引生成')
     parser.add_argument('--no-github', action='store_true', help='禁用GitHub API查询')
+    parser.add_argument('--git-backend', choices=['auto', *GIT_BACKENDS], default='auto', help='读取Git历史的方式：gitpython 或 subprocess（直接调用git命令行，流式读取git log输出）；auto在安装了GitPython时使用gitpython')
+    parser.add_argument('--git-cache', default='.easydoc-cache/git-index.json', help='Git历史索引缓存文件路径')
+    parser.add_argument('--no-git-cache', action='store_true', help='禁用Git历史索引缓存，每次完整遍历Git历史')
+    parser.add_argument('--github-cache', default='.easydoc-cache/github-users.json', help='GitHub用户信息缓存文件路径')
+    parser.add_argument('--refresh-github-cache', action='store_true', help='忽略已有的GitHub用户缓存，重新查询所有用户')
+    parser.add_argument('--author-map', default='.easydoc-authors', help='作者到GitHub用户名的映射文件路径（类似.mailmap的格式）')
+    parser.add_argument('--github-api-url', help=f'GitHub API地址（默认读取环境变量GITHUB_API_URL，否则为{GITHUB_API_BASE_URL}）')
+    parser.add_argument('--github-concurrency', type=int, default=GITHUB_API_CONCURRENCY, help='并发查询GitHub用户信息的最大连接数')
+    parser.add_argument('--incremental', action='store_true', help='增量构建，只重新提取新增或修改过的文档')
+    parser.add_argument('--manifest', default='.easydoc-cache/documents.json', help='增量构建使用的文档清单文件路径')
+    parser.add_argument('--jobs', type=int, default=1, help='并行提取文档内容的进程数，0表示使用全部CPU核心')
+    parser.add_argument('--watch', action='store_true', help='构建完成后监听文档目录，文档变化时实时更新索引文件')
+    parser.add_argument('--timings', help='把各构建阶段的耗时写入指定的JSON文件')
+    parser.add_argument('--profile', nargs='?', const='.easydoc-cache/profile.json', help='记录各阶段的墙钟和CPU时间、Git命令和HTTP请求数、缓存命中、读写字节数和最慢的文档，报告写入指定的JSON文件（默认.easydoc-cache/profile.json）')
+    parser.add_argument('--profile-top', type=int, default=10, help='性能分析报告中列出的最慢文档数')
+    parser.add_argument('--profile-cprofile', choices=BUILD_PHASES, help='使用cProfile分析指定阶段，统计结果写入与报告同名的.prof文件')
     parser.add_argument('-y', '--yes', action='store_true', help='自动确认所有提示，不询问')
     parser.add_argument('--package', action='store_true', help='创建更新包，打包指定文件为zip格式')
     parser.add_argument('--package-output', default='EasyDocument-update.zip', help='更新包输出路径')
     parser.add_argument('--initial-package', action='store_true', help='创建初始包，包含完整的项目文件')
     parser.add_argument('--initial-package-output', default='EasyDocument-initial.zip', help='初始包输出路径')
     parser.add_argument('--package-all', action='store_true', help='同时创建更新包和初始包')
-    args = parser.parse_args()
-    
-    # 检查打包参数是否与其他操作参数共存
-    if args.package or args.initial_package or args.package_all:
-        package_args_count = 0
-        if args.package:
-            package_args_count += 1
-        if args.initial_package:
-            package_args_count += 1
-        if args.package_all:
-            package_args_count += 1
-        
-        if package_args_count > 1:
-            print("错误: --package, --initial-package 和 --package-all 参数不能同时使用")
-            sys.exit(1)
-            
-        # 检查是否使用了其他参数（除了包名称和--yes，它们可以与打包命令共存）
-        other_args_used = False
-        for arg_name, arg_value in vars(args).items():
-            if arg_name not in ['package', 'package_output', 'initial_package', 'initial_package_output', 'package_all', 'yes'] and arg_value:
-                if isinstance(arg_value, bool) and arg_value == True:
-                    other_args_used = True
-                    break
-                elif not isinstance(arg_value, bool) and arg_value != parser.get_default(arg_name):
-                    other_args_used = True
-                    break
-        
-        if other_args_used:
-            print("错误: 打包参数不能与其他操作参数共存")
-            sys.exit(1)
-            
-        # 执行打包操作
-        if args.package:
-            create_update_package(args.package_output)
-            return
-        elif args.initial_package:
-            create_initial_package(args.initial_package_output)
-            return
-        elif args.package_all:
-            create_update_package(args.package_output)
-            create_initial_package(args.initial_package_output)
-            return
-    
-    # 检查是否有已存在的path.json文件且是否在没有使用任何参数的情况下运行
-    if os.path.exists(args.output) and len(sys.argv) == 1:
-        print("=" * 80)
-        print("警告：检测到已存在的 path.json 文件！")
-        print("=" * 80)
-        print("如果不使用 --merge 参数重新生成，将可能会丢失以下信息：")
-        print("  1. 文档的手动排序")
-        print("  2. 自定义添加的属性或元数据")
-        print("  3. 其他手动调整的结构")
-        print("\n推荐使用以下命令:")
-        print(f"  python {sys.argv[0]} --merge")
-        print("\n完整的参数选项:")
-        parser.print_help()
-        print("\n" + "=" * 80)
-        
-        if not args.yes:
-            response = input("\n是否仍要继续？这可能会重置您的文档结构。(y/n): ").strip().lower()
-            if response != 'y' and response != 'yes':
-                print("操作已取消。")
-                sys.exit(0)
-            else:
-                print("\n继续执行，但不会合并现有结构...\n")
-        else:
-            print("\n自动确认模式：继续执行，但不会合并现有结构...\n")
-    
-    # 尝试从配置文件中提取配置
-    config = DEFAULT_CONFIG.copy()
-    if os.path.exists(args.config):
+    parser.add_argument('--package-delta', action='store_true', help='创建增量更新包，只包含相对于--since指定的旧版本新增或变化的文件，以及删除的文件列表')
+    parser.add_argument('--since', help='增量更新包的基准：旧版本的更新包（.zip）或其清单文件（package-manifest.json）')
+    parser.add_argument('--package-delta-output', default='EasyDocument-delta.zip', help='增量更新包输出路径')
+    parser.add_argument('--apply-package', help='校验并应用更新包或增量包（检查文件哈希和本地文件版本后再覆盖）')
+    parser.add_argument('--apply-target', default='.', help='应用更新包的目标目录')
+    parser.add_argument('--verify-only', action='store_true', help='只校验--apply-package指定的更新包，不修改任何文件')
+    parser.add_argument('--force', action='store_true', help='应用增量包时不检查本地文件是否为旧版本')
+    return parser
+
+def load_config(config_file):
+    """从config.js中提取构建需要的配置（站点信息、文档目录、搜索、Git和GitHub设置），返回新的配置字典"""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if os.path.exists(config_file):
         try:
-            with open(args.config, 'r', encoding='utf-8') as f:
+            with open(config_file, 'r', encoding='utf-8') as f:
                 content = f.read()
                 
                 # 移除注释以简化解析
@@ -740,6 +3416,19 @@ def main():
                     if root_dir_match:
                         config["root_dir"] = root_dir_match.group(1)
                 
+                # 提取搜索相关配置
+                search_match = re.search(r'search:\s*{([^}]+)}', content_no_comments, re.DOTALL)
+                if search_match:
+                    search_config = search_match.group(1)
+                    
+                    tokenizer_match = re.search(r'tokenizer:\s*["\'](\w+)["\']', search_config)
+                    if tokenizer_match:
+                        config["search"]["tokenizer"] = tokenizer_match.group(1)
+                    
+                    stopwords_match = re.search(r'stopwords:\s*\[([^\]]*)\]', search_config)
+                    if stopwords_match:
+                        config["search"]["stopwords"] = re.findall(r'["\']([^"\']+)["\']', stopwords_match.group(1))
+                
                 # 提取Git相关配置
                 git_match = re.search(r'git:\s*{([^}]+)}', content_no_comments, re.DOTALL)
                 if git_match:
@@ -776,106 +3465,131 @@ def main():
                 
         except Exception as e:
             print(f"读取配置文件失败: {e}")
+    return config
+
+def main():
+    """主函数"""
+    parser = build_argument_parser()
+    args = parser.parse_args()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
     
-    # 命令行参数覆盖配置文件
-    if args.root:
-        config["root_dir"] = args.root
-    
-    # 禁用Git功能（如果命令行指定）
-    if args.no_git:
-        config["git"]["enable"] = False
-    
-    # 禁用GitHub API查询（如果命令行指定）
-    if args.no_github:
-        config["github"]["enable"] = False
-    
-    root_dir = config["root_dir"]
-    if not os.path.exists(root_dir):
-        print(f"错误: 文档根目录 {root_dir} 不存在")
-        sys.exit(1)
-    
-    print(f"开始扫描文档目录: {root_dir}")
-    
-    # 检查是否在Git仓库中
-    repo = None
-    if GIT_AVAILABLE and config["git"]["enable"]:
-        try:
-            repo = git.Repo(os.path.abspath(os.curdir), search_parent_directories=True)
-            print(f"检测到Git仓库: {repo.working_dir}")
+    # 检查打包参数是否与其他操作参数共存
+    if args.package or args.initial_package or args.package_all or args.package_delta or args.apply_package:
+        package_args_count = 0
+        if args.package:
+            package_args_count += 1
+        if args.initial_package:
+            package_args_count += 1
+        if args.package_all:
+            package_args_count += 1
+        if args.package_delta:
+            package_args_count += 1
+        if args.apply_package:
+            package_args_count += 1
+        
+        if package_args_count > 1:
+            print("错误: --package, --initial-package, --package-all, --package-delta 和 --apply-package 参数不能同时使用")
+            sys.exit(1)
+        
+        if args.package_delta and not args.since:
+            print("错误: --package-delta 需要使用 --since 指定旧版本的更新包或清单文件")
+            sys.exit(1)
+            
+        # 检查是否使用了其他参数（除了包名称和--yes，它们可以与打包命令共存）
+        other_args_used = False
+        for arg_name, arg_value in vars(args).items():
+            if arg_name not in ['package', 'package_output', 'initial_package', 'initial_package_output', 'package_all',
+                                'package_delta', 'since', 'package_delta_output', 'apply_package', 'apply_target', 'verify_only', 'force',
+                                'yes', 'timings', 'profile', 'profile_top', 'profile_cprofile'] and arg_value:
+                if isinstance(arg_value, bool) and arg_value == True:
+                    other_args_used = True
+                    break
+                elif not isinstance(arg_value, bool) and arg_value != parser.get_default(arg_name):
+                    other_args_used = True
+                    break
+        
+        if other_args_used:
+            print("错误: 打包参数不能与其他操作参数共存")
+            sys.exit(1)
             
-            # 如果启用了GitHub功能，预先加载Git邮箱到GitHub用户名的映射
-            if config["github"]["enable"] and not args.no_github:
-                print("预加载Git邮箱到GitHub用户名的映射...")
-                # 获取所有提交者
-                email_authors = {}
+        # 执行打包操作（使用单独的一份缓存记录耗时和性能分析数据）
+        caches = BuildCaches()
+        if args.profile:
+            caches.profile["enabled"] = True
+            caches.profile["cprofile_phase"] = args.profile_cprofile
+        with use_build_caches(caches), phase_timer("package"):
+            if args.package:
+                create_update_package(args.package_output)
+            elif args.initial_package:
+                create_initial_package(args.initial_package_output)
+            elif args.package_all:
+                create_update_package(args.package_output)
+                create_initial_package(args.initial_package_output)
+            elif args.package_delta:
                 try:
-                    for commit in repo.iter_commits(max_count=200):
-                        email = commit.author.email
-                        if email not in email_authors and '@users.noreply.github.com' in email:
-                            # 提取GitHub用户名
-                            noreply_match = re.match(r'(\d+)\+(.+)@users\.noreply\.github\.com', email)
-                            if noreply_match:
-                                username = noreply_match.group(2)
-                                if '+' in username:
-                                    username = username.split('+')[-1]
-                                EMAIL_TO_USERNAME_MAP[email] = username
-                            
-                            noreply_match2 = re.match(r'(.+)@users\.noreply\.github\.com', email)
-                            if noreply_match2:
-                                username = noreply_match2.group(1)
-                                if '+' in username:
-                                    username = username.split('+')[-1]
-                                EMAIL_TO_USERNAME_MAP[email] = username
-                except Exception as e:
-                    print(f"预加载邮箱映射失败: {e}")
-                
-                # 加载用户信息
-                for email, username in EMAIL_TO_USERNAME_MAP.items():
-                    if username:
-                        get_github_avatar_url(username)
-                
-                print(f"已预加载 {len(EMAIL_TO_USERNAME_MAP)} 个邮箱映射")
-                
-        except git.InvalidGitRepositoryError:
-            print("未检测到Git仓库，Git相关功能将被禁用")
-        except Exception as e:
-            print(f"Git初始化错误: {e}")
-    
-    # 扫描目录结构
-    structure = scan_directory(root_dir, config, repo=repo)
-    
-    # 规范化路径
-    structure = normalize_paths(structure)
+                    create_delta_package(args.package_delta_output, args.since)
+                except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                    print(f"创建增量更新包失败: {e}")
+                    sys.exit(1)
+            elif args.apply_package:
+                if not apply_package(args.apply_package, args.apply_target, args.verify_only, args.force):
+                    sys.exit(1)
+        with use_build_caches(caches):
+            if args.timings:
+                write_phase_timings(args.timings, started)
+            if args.profile:
+                write_profile_report(args.profile, started, cpu_started, args.profile_top)
+        return
     
-    # 如果需要合并已有结构
-    if args.merge and os.path.exists(args.output):
-        print(f"合并已有的JSON文件: {args.output}")
-        existing = load_existing_structure(args.output)
-        if existing:
-            structure = merge_structures(existing, structure, config)
+    # 检查是否有已存在的path.json文件且是否在没有使用任何参数的情况下运行
+    if os.path.exists(args.output) and len(sys.argv) == 1:
+        print("=" * 80)
+        print("警告：检测到已存在的 path.json 文件！")
+        print("=" * 80)
+        print("如果不使用 --merge 参数重新生成，将可能会丢失以下信息：")
+        print("  1. 文档的手动排序")
+        print("  2. 自定义添加的属性或元数据")
+        print("  3. 其他手动调整的结构")
+        print("\n推荐使用以下命令:")
+        print(f"  python {sys.argv[0]} --merge")
+        print("\n完整的参数选项:")
+        parser.print_help()
+        print("\n" + "=" * 80)
+        
+        if not args.yes:
+            response = input("\n是否仍要继续？这可能会重置您的文档结构。(y/n): ").strip().lower()
+            if response != 'y' and response != 'yes':
+                print("操作已取消。")
+                sys.exit(0)
+            else:
+                print("\n继续执行，但不会合并现有结构...\n")
+        else:
+            print("\n自动确认模式：继续执行，但不会合并现有结构...\n")
     
-    # 保存路径结构
-    with open(args.output, 'w', encoding='utf-8') as f:
-        json.dump(structure, f, ensure_ascii=False, indent=4)
+    builder = Builder(args)
+    if not os.path.exists(builder.root_dir):
+        print(f"错误: 文档根目录 {builder.root_dir} 不存在")
+        sys.exit(1)
     
-    # 构建搜索索引
-    if not args.no_search:
-        print(f"构建搜索索引: {args.search_index}")
-        search_tree = build_search_tree(structure, config)
-        with open(args.search_index, 'w', encoding='utf-8') as f:
-            json.dump(search_tree, f, ensure_ascii=False, indent=4)
+    builder.run()
     
-    total_files = count_files(structure)
-    total_dirs = count_dirs(structure)
+    # 写入各阶段耗时和性能分析报告
+    with builder.activate():
+        if args.timings:
+            write_phase_timings(args.timings, started, files=builder.total_files, directories=builder.total_dirs)
+        if args.profile:
+            write_profile_report(args.profile, started, cpu_started, args.profile_top)
     
-    # 更新HTML元数据
-    html_files_to_update = glob.glob('*.html')
-    # 添加main目录下的HTML文件
-    main_html_files = glob.glob('main/*.html')
-    html_files_to_update.extend(main_html_files)
-    update_html_metadata(html_files_to_update, config)
+    # 合并结果中出现了不允许的变化
+    failed_changes = [kind for kind in args.fail_on_change or [] if builder.merge_report.get(kind)]
+    if failed_changes:
+        print(f"错误: 合并结果中包含以下类型的变化: {', '.join(failed_changes)}")
+        sys.exit(1)
     
-    print(f"文档扫描完成: 共 {total_files} 个文件, {total_dirs} 个目录")
+    # 监听模式：保持结构和搜索索引在内存中，文档变化时实时更新
+    if args.watch:
+        builder.watch()
 
 def count_files(structure):
     """计算结构中的文件总数"""
@@ -953,6 +3667,132 @@ def update_html_metadata(html_files, config):
         except Exception as e:
             print(f"更新HTML文件 {filepath} 时出错: {e}")
 
+def collect_package_files(entries, arcname, source):
+    """把文件或目录（递归，按路径排序）加入打包清单，arcname为压缩包内的路径"""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                rel_path = os.path.relpath(file_path, source).replace("\\", "/")
+                entries.append((f"{arcname}/{rel_path}", file_path, None))
+    else:
+        entries.append((arcname, source, None))
+
+def add_package_sources(entries, sources):
+    """按 (压缩包内路径, 源路径) 列表收集打包文件，源路径不存在时输出警告并跳过"""
+    for arcname, source in sources:
+        if not os.path.exists(source):
+            print(f"警告: {source} 不存在，将被跳过")
+            continue
+        collect_package_files(entries, arcname, source)
+        if arcname != source:
+            print(f"已添加并重命名: {source} -> {arcname}")
+        else:
+            print(f"已添加: {source}")
+
+def get_package_date_time():
+    """压缩包中所有文件使用的固定时间（SOURCE_DATE_EPOCH环境变量，默认为1980-01-01）"""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch and epoch.isdigit():
+        date_time = time.gmtime(max(int(epoch), PACKAGE_MIN_TIMESTAMP))[:6]
+        # ZIP格式只能表示偶数秒
+        return date_time[:5] + (date_time[5] // 2 * 2,)
+    return (1980, 1, 1, 0, 0, 0)
+
+def hash_package_entry(source, data):
+    """计算打包文件的sha256"""
+    if data is not None:
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(PACKAGE_COPY_BUFFER), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_package(output_file, entries, manifest):
+    """
+    把打包清单直接写入ZIP文件，不复制到临时目录
+    
+    entries为 (压缩包内路径, 源文件路径, 内容) 列表，内容不为None时直接写入该内容。
+    文件按压缩包内路径排序并使用固定的时间和权限，相同的输入总是生成相同的压缩包；
+    已压缩的文件（png、ico等）不再重复压缩。先写入临时文件，完成后替换输出文件。
+    
+    写入时计算每个文件的sha256，记录到manifest的files中（增量包的files中已有完整版本的清单），
+    changed为压缩包中包含的文件，manifest最后以 PACKAGE_MANIFEST_NAME 写入压缩包。
+    """
+    date_time = get_package_date_time()
+    files = manifest.setdefault("files", {})
+    changed = []
+    temp_file = output_file + '.tmp'
+    with zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        def make_info(arcname):
+            info = zipfile.ZipInfo(arcname, date_time=date_time)
+            info.external_attr = 0o644 << 16
+            if os.path.splitext(arcname)[1].lower() in PACKAGE_STORED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            return info
+        
+        for arcname, source, data in sorted(entries, key=lambda entry: entry[0]):
+            info = make_info(arcname)
+            changed.append(arcname)
+            if data is not None:
+                zipf.writestr(info, data)
+                files[arcname] = hashlib.sha256(data).hexdigest()
+                continue
+            digest = hashlib.sha256()
+            with open(source, 'rb') as src, zipf.open(info, 'w') as dst:
+                for chunk in iter(lambda: src.read(PACKAGE_COPY_BUFFER), b''):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            files[arcname] = digest.hexdigest()
+        
+        manifest["files"] = dict(sorted(files.items()))
+        manifest["changed"] = changed
+        zipf.writestr(make_info(PACKAGE_MANIFEST_NAME), json.dumps(manifest, ensure_ascii=False, indent=4))
+    os.replace(temp_file, output_file)
+    return manifest
+
+def load_package_manifest(filepath):
+    """
+    读取压缩包（或单独保存的清单JSON文件）中的文件清单
+    
+    没有清单的旧压缩包根据其中的文件内容计算清单。
+    """
+    if not zipfile.is_zipfile(filepath):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    with zipfile.ZipFile(filepath) as zipf:
+        names = zipf.namelist()
+        if PACKAGE_MANIFEST_NAME in names:
+            return json.loads(zipf.read(PACKAGE_MANIFEST_NAME).decode('utf-8'))
+        files = {}
+        for name in names:
+            if name.endswith('/'):
+                continue
+            digest = hashlib.sha256()
+            with zipf.open(name) as f:
+                for chunk in iter(lambda: f.read(PACKAGE_COPY_BUFFER), b''):
+                    digest.update(chunk)
+            files[name] = digest.hexdigest()
+        return {"version": PACKAGE_MANIFEST_VERSION, "type": "update", "files": files}
+
+def get_update_package_sources():
+    """更新包的内容：(压缩包内路径, 源路径) 列表"""
+    return [
+        ('assets', 'assets'),
+        # config.js在压缩包中改名为default.config.js，不覆盖用户的配置
+        ('default.config.js', 'config.js'),
+        ('main', 'main'),
+        # 根目录下的HTML文件（如重定向文件）
+        ('main.html', 'main.html'),
+        ('meta.json', 'meta.json'),
+        ('requirements.txt', 'requirements.txt'),
+        ('build.py', 'build.py'),
+    ]
+
 def create_update_package(output_file='EasyDocument-update.zip'):
     """
     创建更新包，包含指定的文件和目录，用于覆盖更新旧项目的代码
@@ -965,74 +3805,18 @@ def create_update_package(output_file='EasyDocument-update.zip'):
     - meta.json
     - requirements.txt
     - build.py
+    - package-manifest.json（所有文件的sha256清单，用于生成增量包和校验）
     """
     print(f"开始创建更新包: {output_file}")
     
-    # 创建临时目录存放待打包文件
-    with tempfile.TemporaryDirectory() as temp_dir:
-        print(f"创建临时目录: {temp_dir}")
-        
-        # 复制assets文件夹
-        assets_path = 'assets'
-        if os.path.exists(assets_path) and os.path.isdir(assets_path):
-            assets_temp_path = os.path.join(temp_dir, 'assets')
-            shutil.copytree(assets_path, assets_temp_path)
-            print(f"已复制: {assets_path}")
-        else:
-            print(f"警告: {assets_path} 目录不存在，将被跳过")
-        
-        # 复制config.js并改名为default.config.js
-        config_path = 'config.js'
-        if os.path.exists(config_path):
-            default_config_path = os.path.join(temp_dir, 'default.config.js')
-            shutil.copy2(config_path, default_config_path)
-            print(f"已复制并重命名: {config_path} -> default.config.js")
-        else:
-            print(f"警告: {config_path} 文件不存在，将被跳过")
-        
-        # 复制main目录
-        main_path = 'main'
-        if os.path.exists(main_path) and os.path.isdir(main_path):
-            main_temp_path = os.path.join(temp_dir, 'main')
-            shutil.copytree(main_path, main_temp_path)
-            print(f"已复制: {main_path}")
-        else:
-            print(f"警告: {main_path} 目录不存在，将被跳过")
-        
-        # 复制根目录下的HTML文件（如重定向文件）
-        root_html_files = ['main.html']
-        for html_file in root_html_files:
-            if os.path.exists(html_file):
-                html_temp_path = os.path.join(temp_dir, html_file)
-                shutil.copy2(html_file, html_temp_path)
-                print(f"已复制: {html_file}")
-            else:
-                print(f"警告: {html_file} 文件不存在，将被跳过")
-        
-        # 复制其他文件
-        other_files = ['meta.json', 'requirements.txt','build.py']
-        for file in other_files:
-            if os.path.exists(file):
-                file_temp_path = os.path.join(temp_dir, file)
-                shutil.copy2(file, file_temp_path)
-                print(f"已复制: {file}")
-            else:
-                print(f"警告: {file} 文件不存在，将被跳过")
-        
-        # 创建ZIP文件
-        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 遍历临时目录中的所有文件和子目录
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    # 计算相对于临时目录的路径，作为zip内的路径
-                    arc_path = os.path.relpath(file_path, temp_dir)
-                    zipf.write(file_path, arc_path)
-        
-        print(f"更新包创建完成: {output_file}")
-        # 显示ZIP文件大小
-        zip_size = os.path.getsize(output_file)
-        print(f"更新包大小: {zip_size / 1024:.2f} KB")
+    entries = []
+    add_package_sources(entries, get_update_package_sources())
+    write_package(output_file, entries, {"version": PACKAGE_MANIFEST_VERSION, "type": "update"})
+    
+    print(f"更新包创建完成: {output_file}")
+    # 显示ZIP文件大小
+    zip_size = os.path.getsize(output_file)
+    print(f"更新包大小: {zip_size / 1024:.2f} KB")
 
 def create_initial_package(output_file='EasyDocument-initial.zip'):
     """
@@ -1047,82 +3831,148 @@ def create_initial_package(output_file='EasyDocument-initial.zip'):
     - LICENSE
     - README.md
     - build.py
+    - package-manifest.json（所有文件的sha256清单）
     """
     print(f"开始创建初始包: {output_file}")
     
-    # 创建临时目录存放待打包文件
-    with tempfile.TemporaryDirectory() as temp_dir:
-        print(f"创建临时目录: {temp_dir}")
-        
-        # 复制assets文件夹
-        assets_path = 'assets'
-        if os.path.exists(assets_path) and os.path.isdir(assets_path):
-            assets_temp_path = os.path.join(temp_dir, 'assets')
-            shutil.copytree(assets_path, assets_temp_path)
-            print(f"已复制: {assets_path}")
-        else:
-            print(f"警告: {assets_path} 目录不存在，将被跳过")
-        
-        # 创建data目录和README.md空文件
-        data_dir = os.path.join(temp_dir, 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        data_readme = os.path.join(data_dir, 'README.md')
-        with open(data_readme, 'w', encoding='utf-8') as f:
-            f.write('# EasyDocument\n\n这是您的文档目录，请在此处添加Markdown或HTML文档。')
-        print(f"已创建: data/README.md")
-        
-        # 复制config.js (不改名)
-        config_path = 'config.js'
-        if os.path.exists(config_path):
-            config_temp_path = os.path.join(temp_dir, 'config.js')
-            shutil.copy2(config_path, config_temp_path)
-            print(f"已复制: {config_path}")
-        else:
-            print(f"警告: {config_path} 文件不存在，将被跳过")
-        
-        # 复制main目录
-        main_path = 'main'
-        if os.path.exists(main_path) and os.path.isdir(main_path):
-            main_temp_path = os.path.join(temp_dir, 'main')
-            shutil.copytree(main_path, main_temp_path)
-            print(f"已复制: {main_path}")
-        else:
-            print(f"警告: {main_path} 目录不存在，将被跳过")
+    entries = [('data/README.md', None, INITIAL_DATA_README.encode('utf-8'))]
+    print(f"已创建: data/README.md")
+    add_package_sources(entries, [
+        ('assets', 'assets'),
+        ('config.js', 'config.js'),
+        ('main', 'main'),
+        *((html_file, html_file) for html_file in sorted(glob.glob('*.html'))),
+        ('LICENSE', 'LICENSE'),
+        ('README.md', 'README.md'),
+        ('build.py', 'build.py'),
+    ])
+    write_package(output_file, entries, {"version": PACKAGE_MANIFEST_VERSION, "type": "initial"})
+    
+    print(f"初始包创建完成: {output_file}")
+    # 显示ZIP文件大小
+    zip_size = os.path.getsize(output_file)
+    print(f"初始包大小: {zip_size / 1024:.2f} KB")
+
+def create_delta_package(output_file, since):
+    """
+    创建增量更新包，只包含相对于旧版本新增或变化的文件
+    
+    since为旧版本的更新包（或其清单文件）。清单中的files为新版本的完整清单，
+    deleted为新版本中已删除的文件，base为这些变化文件在旧版本中的哈希（新增的文件为None），
+    应用时用于检查本地文件。
+    """
+    print(f"开始创建增量更新包: {output_file}（基于 {since}）")
+    base_manifest = load_package_manifest(since)
+    if base_manifest.get("type") not in ("update", "delta"):
+        raise ValueError(f"{since} 不是更新包，无法作为增量包的基准")
+    base_files = base_manifest["files"]
+    
+    entries = []
+    add_package_sources(entries, get_update_package_sources())
+    files = {arcname: hash_package_entry(source, data) for arcname, source, data in entries}
+    changed_entries = [entry for entry in entries if base_files.get(entry[0]) != files[entry[0]]]
+    deleted = sorted(set(base_files) - set(files))
+    base = {
+        arcname: base_files.get(arcname)
+        for arcname in sorted([entry[0] for entry in changed_entries] + deleted)
+    }
+    
+    manifest = write_package(output_file, changed_entries, {
+        "version": PACKAGE_MANIFEST_VERSION,
+        "type": "delta",
+        "files": files,
+        "deleted": deleted,
+        "base": base
+    })
+    
+    print(f"增量更新包创建完成: {output_file}")
+    print(f"变化 {len(manifest['changed'])} 个文件, 删除 {len(deleted)} 个文件, 未变化 {len(files) - len(manifest['changed'])} 个文件")
+    for arcname in manifest["changed"]:
+        print(f"  {'修改' if base.get(arcname) else '新增'}: {arcname}")
+    for arcname in deleted:
+        print(f"  删除: {arcname}")
+    zip_size = os.path.getsize(output_file)
+    print(f"增量更新包大小: {zip_size / 1024:.2f} KB")
+
+def get_file_hash(file_path):
+    """计算本地文件的sha256，文件不存在时返回None"""
+    if not os.path.isfile(file_path):
+        return None
+    return hash_package_entry(file_path, None)
+
+def apply_package(package_file, target_dir='.', verify_only=False, force=False):
+    """
+    校验并应用更新包、增量包或初始包，成功时返回True
+    
+    覆盖任何文件之前先完成全部检查：压缩包中的文件与清单一致（sha256）、路径不会写到目标目录之外，
+    以及（增量包）目标目录中将被修改或删除的文件仍是旧版本的内容（或已经是新版本），
+    新增的文件在目标目录中不存在（或已经是新版本）。force为True时跳过本地文件检查。文件先写入临时文件再替换，最后删除清单中已删除的文件。
+    """
+    print(f"校验更新包: {package_file}")
+    problems = []
+    with zipfile.ZipFile(package_file) as zipf:
+        names = [name for name in zipf.namelist() if name != PACKAGE_MANIFEST_NAME and not name.endswith('/')]
+        if PACKAGE_MANIFEST_NAME not in zipf.namelist():
+            print(f"错误: 压缩包中没有文件清单 {PACKAGE_MANIFEST_NAME}，无法校验")
+            return False
+        manifest = json.loads(zipf.read(PACKAGE_MANIFEST_NAME).decode('utf-8'))
+        files = manifest.get("files", {})
+        deleted = manifest.get("deleted", [])
         
-        # 复制根目录下的HTML文件
-        html_files = glob.glob('*.html')
-        for html_file in html_files:
-            if os.path.exists(html_file):
-                html_temp_path = os.path.join(temp_dir, html_file)
-                shutil.copy2(html_file, html_temp_path)
-                print(f"已复制: {html_file}")
-            else:
-                print(f"警告: {html_file} 文件不存在，将被跳过")
+        # 检查压缩包内容与清单一致
+        if set(names) != set(manifest.get("changed", names)):
+            problems.append("压缩包中的文件与清单中的文件列表不一致")
+        target_root = os.path.abspath(target_dir)
+        for name in names + deleted:
+            target_path = os.path.abspath(os.path.join(target_root, name))
+            if os.path.isabs(name) or os.path.commonpath([target_root, target_path]) != target_root:
+                problems.append(f"文件路径不安全: {name}")
+        for name in names:
+            digest = hashlib.sha256()
+            with zipf.open(name) as f:
+                for chunk in iter(lambda: f.read(PACKAGE_COPY_BUFFER), b''):
+                    digest.update(chunk)
+            if digest.hexdigest() != files.get(name):
+                problems.append(f"文件内容与清单不一致: {name}")
         
-        # 复制其他文件
-        other_files = ['LICENSE', 'README.md', 'build.py']
-        for file in other_files:
-            if os.path.exists(file):
-                file_temp_path = os.path.join(temp_dir, file)
-                shutil.copy2(file, file_temp_path)
-                print(f"已复制: {file}")
-            else:
-                print(f"警告: {file} 文件不存在，将被跳过")
+        # 检查将被修改或删除的本地文件仍是旧版本，新增的文件在本地不存在（或都已经是新版本）
+        if not force:
+            for name, base_hash in manifest.get("base", {}).items():
+                target_path = os.path.join(target_dir, name)
+                current = get_file_hash(target_path)
+                if base_hash is None and current is None and os.path.exists(target_path):
+                    problems.append(f"本地已存在同名目录: {name}")
+                elif current not in (base_hash, files.get(name)):
+                    if base_hash is None:
+                        state = "已存在且与新版本不同，不会覆盖"
+                    else:
+                        state = "不存在" if current is None else "已被修改或版本不匹配"
+                    problems.append(f"本地文件{state}: {name}")
         
-        # 创建ZIP文件
-        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 遍历临时目录中的所有文件和子目录
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    # 计算相对于临时目录的路径，作为zip内的路径
-                    arc_path = os.path.relpath(file_path, temp_dir)
-                    zipf.write(file_path, arc_path)
+        if problems:
+            print(f"校验失败，未修改任何文件（{len(problems)} 个问题）:")
+            for problem in problems:
+                print(f"  {problem}")
+            return False
+        print(f"校验通过: {len(names)} 个文件, {len(deleted)} 个删除项")
+        if verify_only:
+            return True
         
-        print(f"初始包创建完成: {output_file}")
-        # 显示ZIP文件大小
-        zip_size = os.path.getsize(output_file)
-        print(f"初始包大小: {zip_size / 1024:.2f} KB")
+        # 写入文件
+        for name in names:
+            target_path = os.path.join(target_dir, name)
+            os.makedirs(os.path.dirname(target_path) or '.', exist_ok=True)
+            temp_file = target_path + '.tmp'
+            with zipf.open(name) as src, open(temp_file, 'wb') as dst:
+                shutil.copyfileobj(src, dst, PACKAGE_COPY_BUFFER)
+            os.replace(temp_file, target_path)
+    
+    for name in deleted:
+        target_path = os.path.join(target_dir, name)
+        if os.path.isfile(target_path):
+            os.remove(target_path)
+    print(f"已应用更新包: 写入 {len(names)} 个文件, 删除 {len(deleted)} 个文件")
+    return True
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -143,7 +143,9 @@ const config = {
     placeholder: "搜索文档...", // 搜索框占位符文本
     search_cached: true, // 是否搜索缓存的文档内容
     search_on_type: true, // 是否在输入时自动搜索
-    match_distance: 50 // 搜索结果中多个匹配项之间的最小字符距离
+    match_distance: 50, // 搜索结果中多个匹配项之间的最小字符距离
+    tokenizer: "cjk", // 构建搜索索引时的分词方式：cjk（中文按单字和相邻两字切分）或 simple（连续文字作为一个词）
+    stopwords: [] // 额外的停用词，不作为关键词和索引词条
   },
 
   // 插件与扩展
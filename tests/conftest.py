@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""测试公共夹具：在临时目录中创建文档站点并构建"""
+import os
+import sys
+import json
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "benchmarks"))
+
+import build
+
+
+def write_documents(root, documents):
+    """在root目录下写入文档 {相对路径: 内容}"""
+    for path, content in documents.items():
+        file_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+
+def make_builder(site_dir, **options):
+    """创建使用site_dir下data目录的构建器，所有输出文件都写入site_dir（不读取Git和GitHub信息）"""
+    defaults = {
+        "root": os.path.join(site_dir, "data"),
+        "config": os.path.join(PROJECT_ROOT, "config.js"),
+        "output": os.path.join(site_dir, "path.json"),
+        "navigation": os.path.join(site_dir, "nav.json"),
+        "search_index": os.path.join(site_dir, "search.json"),
+        "search_shards": os.path.join(site_dir, "search"),
+        "inverted_index": os.path.join(site_dir, "search-index.json"),
+        "manifest": os.path.join(site_dir, ".easydoc-cache", "documents.json"),
+        "git_cache": os.path.join(site_dir, ".easydoc-cache", "git-index.json"),
+        "github_cache": os.path.join(site_dir, ".easydoc-cache", "github-users.json"),
+        "no_git": True,
+        "no_github": True,
+        "yes": True,
+    }
+    defaults.update(options)
+    return build.Builder(**defaults)
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """空的站点目录（同时作为当前目录），返回其路径"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(tmp_path / "data")
+    return str(tmp_path)
+
+
+class GitHubStub:
+    """
+    本地模拟的GitHub API（只实现 GET /users/<用户名>）
+
+    users中的用户返回200，其他用户返回404；responses可以为某个用户预先排好若干个
+    (状态码, 响应头)，依次返回后再按正常规则响应。requests记录每个请求的
+    (用户名, 客户端地址)，客户端地址相同说明复用了同一个连接。
+    """
+
+    def __init__(self):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        import threading
+
+        self.users = set()
+        self.responses = {}
+        self.requests = []
+        self.delay = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                import time
+                username = self.path.rsplit('/', 1)[-1]
+                with stub.lock:
+                    stub.requests.append((username, self.client_address))
+                    queued = stub.responses.get(username)
+                    status, headers = queued.pop(0) if queued else (None, {})
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if status is None:
+                    status = 200 if username in stub.users else 404
+                if status == 200:
+                    body = json.dumps({
+                        "login": username,
+                        "avatar_url": f"https://avatars.example.com/{username}",
+                        "html_url": f"https://github.example.com/{username}",
+                    }).encode('utf-8')
+                else:
+                    body = b'{"message": "Not Found"}' if status == 404 else b'{}'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def requested(self, username=None):
+        """返回收到的请求数（指定用户名时只统计该用户）"""
+        with self.lock:
+            return sum(1 for name, _ in self.requests if username is None or name == username)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def github_stub():
+    stub = GitHubStub()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def github_caches(github_stub):
+    """在当前线程中使用一组指向模拟GitHub API的新构建缓存"""
+    caches = build.BuildCaches()
+    caches.github_api_url = github_stub.url
+    with build.use_build_caches(caches):
+        yield caches
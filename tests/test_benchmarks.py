@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""基准测试运行器：结果格式和回归检测"""
+import copy
+
+from run_benchmarks import RESULTS_VERSION, SCENARIOS, run_benchmarks, find_regressions
+
+
+def make_results(total, phases):
+    return {
+        "version": RESULTS_VERSION,
+        "corpus": {"files": 20, "commits": 5},
+        "scenarios": {"full": {"total": total, "phases": dict(phases), "runs": [total]}}
+    }
+
+
+def test_run_benchmarks_result_shape():
+    results = run_benchmarks(files=20, commits=5, repeat=1)
+    assert results["version"] == RESULTS_VERSION
+    assert results["corpus"]["files"] == 20
+    assert results["corpus"]["commits"] == 5
+    assert list(results["scenarios"]) == list(SCENARIOS)
+    for name, summary in results["scenarios"].items():
+        assert len(summary["runs"]) == 1
+        assert summary["total"] == summary["runs"][0] > 0
+        assert summary["phases"]
+        assert all(seconds >= 0 for seconds in summary["phases"].values())
+    assert "scan" in results["scenarios"]["full"]["phases"]
+    assert "package" in results["scenarios"]["package"]["phases"]
+    # 与自身比较时没有回归
+    assert find_regressions(results, results) == []
+
+
+def test_find_regressions():
+    baseline = make_results(2.0, {"scan": 1.0, "git": 0.5, "search": 0.01})
+    results = make_results(2.1, {"scan": 1.5, "git": 0.55, "search": 0.05, "compress": 0.3})
+    # scan变慢50%；git在容差内；search虽然变慢5倍但差值小于min_delta；compress在基准中不存在
+    assert find_regressions(results, baseline) == [("full", "scan", 1.0, 1.5)]
+    assert find_regressions(results, baseline, tolerance=0.6) == []
+    assert find_regressions(results, baseline, min_delta=0.01) == [
+        ("full", "scan", 1.0, 1.5),
+        ("full", "search", 0.01, 0.05)
+    ]
+
+
+def test_find_regressions_total_and_missing_scenarios():
+    baseline = make_results(1.0, {"scan": 0.5})
+    results = copy.deepcopy(baseline)
+    results["scenarios"]["full"]["total"] = 2.0
+    results["scenarios"]["incremental"] = {"total": 9.0, "phases": {"scan": 9.0}, "runs": [9.0]}
+    # 只比较基准中存在的场景
+    assert find_regressions(results, baseline) == [("full", "total", 1.0, 2.0)]
+    assert find_regressions(results, {"scenarios": {}}) == []
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Builder：选项、重复构建和线程间的缓存隔离"""
+import os
+import json
+import threading
+
+import pytest
+
+import build
+from conftest import PROJECT_ROOT, write_documents, make_builder
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_config_option_is_build_option(site):
+    write_documents(os.path.join(site, "data"), {"README.md": "# 首页\n\n内容"})
+    builder = make_builder(site, config=os.path.join(PROJECT_ROOT, "config.js"))
+    assert builder.args.config.endswith("config.js")
+    builder.run()
+    assert read_json(os.path.join(site, "path.json"))["index"]["title"] == "首页"
+
+
+def test_config_overrides(site):
+    write_documents(os.path.join(site, "data"), {"README.md": "# 首页"})
+    config = build.load_config(os.path.join(PROJECT_ROOT, "config.js"))
+    config["search"]["tokenizer"] = "simple"
+    builder = make_builder(site, config_overrides=config)
+    assert builder.caches.search_tokenizer["name"] == "simple"
+
+
+def test_unknown_option():
+    with pytest.raises(TypeError):
+        build.Builder(not_an_option=True)
+
+
+def test_repeated_runs_pick_up_changes(site):
+    data_dir = os.path.join(site, "data")
+    write_documents(data_dir, {"README.md": "# 首页", "guide.md": "# 指南"})
+    builder = make_builder(site)
+    builder.run()
+    write_documents(data_dir, {"guide.md": "# 新指南"})
+    builder.run()
+    titles = [child["title"] for child in read_json(os.path.join(site, "path.json"))["children"]]
+    assert titles == ["新指南"]
+
+
+def test_builders_in_threads_keep_separate_caches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sites = []
+    for name, tokenizer in (("a", "cjk"), ("b", "simple")):
+        site_dir = str(tmp_path / name)
+        write_documents(os.path.join(site_dir, "data"), {
+            "README.md": f"# 站点{name}\n\n插件配置说明",
+            f"{name}.md": f"# 文档{name}\n\n{name} document content",
+        })
+        sites.append((site_dir, make_builder(site_dir, tokenizer=tokenizer)))
+
+    # 第一个构建器在自己的线程中激活后暂停，等待第二个构建器在另一个线程中完成构建
+    paused = threading.Event()
+    resume = threading.Event()
+    seen = {}
+
+    def run_first():
+        builder = sites[0][1]
+        with builder.activate():
+            seen["before"] = build.get_build_caches()
+            paused.set()
+            resume.wait(10)
+            seen["after"] = build.get_build_caches()
+            builder.run()
+
+    def run_second():
+        paused.wait(10)
+        sites[1][1].run()
+        resume.set()
+
+    threads = [threading.Thread(target=run_first), threading.Thread(target=run_second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    first, second = sites[0][1], sites[1][1]
+    assert seen["before"] is seen["after"] is first.caches
+    assert first.caches.search_tokenizer["name"] == "cjk"
+    assert second.caches.search_tokenizer["name"] == "simple"
+    assert build.get_build_caches() is build.DEFAULT_BUILD_CACHES
+    assert set(os.path.basename(key) for key in first.caches.document_records) == {"README.md", "a.md"}
+    assert set(os.path.basename(key) for key in second.caches.document_records) == {"README.md", "b.md"}
+    for site_dir, builder in sites:
+        assert read_json(os.path.join(site_dir, "search-index.json"))["tokenizer"] == builder.caches.search_tokenizer["name"]
+
+
+def test_builders_keep_separate_timings_and_rate_limits(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    builders = []
+    for name in ("a", "b"):
+        site_dir = str(tmp_path / name)
+        write_documents(os.path.join(site_dir, "data"), {"README.md": f"# 站点{name}"})
+        builders.append(make_builder(site_dir, profile=str(tmp_path / f"{name}.json") if name == "a" else None))
+    first, second = builders
+    first.run()
+    with first.activate():
+        build.update_github_rate_limit({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "9999999999"})
+        assert build.get_github_rate_limit_wait() > 0
+
+    assert first.caches.phase_timings and first.caches.profile["phases"]
+    assert second.caches.phase_timings == {} and not second.caches.profile["enabled"]
+    with second.activate():
+        assert build.get_github_rate_limit_wait() == 0
+    assert build.DEFAULT_BUILD_CACHES.phase_timings == {}
+    assert build.DEFAULT_BUILD_CACHES.github_rate_limit["remaining"] is None
+
+
+def test_directory_with_only_index_page(site, capsys):
+    write_documents(os.path.join(site, "data"), {
+        "README.md": "# 首页",
+        "反馈/README.md": "# 支持与反馈\n\n联系方式",
+    })
+    make_builder(site).run()
+    assert "失败" not in capsys.readouterr().out
+
+    directory = read_json(os.path.join(site, "path.json"))["children"][0]
+    assert directory["children"] == [] and directory["index"]["path"] == "反馈/README.md"
+    search = read_json(os.path.join(site, "search", build.SEARCH_SHARD_MANIFEST))
+    assert search["count"] == 2
+
+
+def read_outputs(site_dir):
+    """读取构建输出的所有JSON文件 {相对路径: 内容}"""
+    outputs = {}
+    for name in ("path.json", "nav.json", "search-index.json"):
+        outputs[name] = read_json(os.path.join(site_dir, name))
+    for entry in sorted(os.scandir(os.path.join(site_dir, "search")), key=lambda entry: entry.name):
+        outputs["search/" + entry.name] = read_json(entry.path)
+    return outputs
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_parallel_extraction_matches_serial(tmp_path, monkeypatch, incremental):
+    monkeypatch.chdir(tmp_path)
+    data_dir = str(tmp_path / "data")
+    documents = {"README.md": "# 首页\n\n欢迎"}
+    for i in range(12):
+        documents[f"第{i % 3}章/节{i}.md"] = f"# 第{i}节\n\n" + "插件配置说明 " * (i + 1)
+    documents["第0章/README.md"] = "# 第零章"
+    documents["页面.html"] = "<html><head><title>页面</title></head><body><h1>标题</h1><p>正文内容</p></body></html>"
+    write_documents(data_dir, documents)
+
+    outputs = []
+    for name, jobs in (("serial", 1), ("parallel", 4)):
+        site_dir = str(tmp_path / name)
+        os.makedirs(site_dir)
+        builder = make_builder(site_dir, root=data_dir, jobs=jobs, incremental=incremental)
+        builder.run()
+        assert ("prefetch" in builder.caches.phase_timings) == (jobs > 1)
+        outputs.append(read_outputs(site_dir))
+    assert outputs[0] == outputs[1]
+
+
+def collect_paths(node):
+    paths = [node["index"]["path"]] if node.get("index") else []
+    for child in node.get("children", []):
+        paths.extend(collect_paths(child) if "index" in child else [child["path"]])
+    return paths
+
+
+def test_docignore(site):
+    data_dir = os.path.join(site, "data")
+    write_documents(data_dir, {
+        build.DOC_IGNORE_FILE: "# 忽略草稿\ndrafts/\n*.draft.md\nguide/private.md\n",
+        "README.md": "# 首页",
+        "notes.draft.md": "# 草稿",
+        "drafts/a.md": "# 草稿目录中的文档",
+        "guide/README.md": "# 指南",
+        "guide/public.md": "# 公开",
+        "guide/private.md": "# 私有",
+        "guide/drafts.md": "# 与目录同名的文件",
+        "other/private.md": "# 其他目录中的同名文件",
+    })
+    builder = make_builder(site)
+    builder.run()
+
+    expected = ["README.md", "guide/README.md", "guide/drafts.md", "guide/public.md", "other/private.md"]
+    assert sorted(collect_paths(read_json(os.path.join(site, "path.json")))) == expected
+    assert sorted(item["path"] for item in builder.search_tree) == expected
+    collected = build.collect_document_files(data_dir, builder.config)
+    assert sorted(os.path.relpath(path, data_dir).replace("\\", "/") for path in collected) == expected
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""预压缩文件：.gz和.br解压后与原文件一致，内容未变时不重新生成"""
+import os
+import gzip
+
+import build
+from conftest import write_documents, make_builder
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_precompressed_files_match_originals(site):
+    write_documents(os.path.join(site, "data"), {
+        "README.md": "# 首页\n\n" + "插件配置说明 " * 50,
+        "guide/README.md": "# 指南",
+        "guide/install.md": "# 安装\n\n安装步骤",
+    })
+    builder = make_builder(site, compress=True)
+    builder.run()
+
+    artifacts = build.get_output_artifacts(builder.args)
+    assert os.path.join(site, "path.json") in artifacts and os.path.join(site, "search-index.json") in artifacts
+    for artifact in artifacts:
+        original = read_bytes(artifact)
+        assert gzip.decompress(read_bytes(artifact + ".gz")) == original
+        if build.BROTLI_AVAILABLE:
+            assert build.brotli.decompress(read_bytes(artifact + ".br")) == original
+        else:
+            assert not os.path.exists(artifact + ".br")
+
+    # 再次构建时内容未变的预压缩文件不重写；损坏的预压缩文件重新生成
+    path_gz = os.path.join(site, "path.json.gz")
+    compressed = read_bytes(path_gz)
+    os.utime(path_gz, ns=(0, 0))
+    nav_gz = os.path.join(site, "nav.json.gz")
+    with open(nav_gz, 'wb') as f:
+        f.write(b"corrupted")
+    make_builder(site, compress=True).run()
+    assert os.stat(path_gz).st_mtime_ns == 0 and read_bytes(path_gz) == compressed
+    assert gzip.decompress(read_bytes(nav_gz)) == read_bytes(os.path.join(site, "nav.json"))
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""流式文本提取：提前停止的结果与对全文一次性处理后截取的结果一致"""
+import pytest
+
+import build
+from bench_extract import write_markdown, write_html, write_small_markdown, extract_full, extract_streaming
+
+
+# 跨越空行的代码块、多行HTML标签和段落开头的空白，检查分段处理时的边界
+MARKDOWN_EDGE_CASES = """# 标题
+
+第一段有`行内代码`和[链接](https://example.com/a)。
+
+```python
+def f():
+
+    return 1
+```
+
+  段落开头的空白 <span
+class="x">跨行标签</span>
+
+![图片](a.png) ## 不是标题的井号
+
+[第二个链接](b.md)结尾
+"""
+
+
+@pytest.fixture(params=[16, 64, build.EXTRACT_CHUNK_CHARS])
+def chunk_chars(request, monkeypatch):
+    """使用不同的分段大小，使分段边界落在各种标记的中间"""
+    monkeypatch.setattr(build, "EXTRACT_CHUNK_CHARS", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("max_chars", [1, 10, 40, 1000, 100000])
+def test_markdown_prefix_matches_full(chunk_chars, max_chars):
+    text = MARKDOWN_EDGE_CASES * 3
+    assert build.strip_markdown_prefix(text, max_chars) == build.strip_markdown(text)[:max_chars]
+
+
+@pytest.mark.parametrize("writer, ext", [
+    (lambda path: write_markdown(path, 64 * 1024), ".md"),
+    (lambda path: write_html(path, 64 * 1024), ".html"),
+    (write_small_markdown, ".md"),
+])
+@pytest.mark.parametrize("max_chars", [10, 1000])
+def test_streaming_matches_full(tmp_path, chunk_chars, writer, ext, max_chars):
+    file_path = str(tmp_path / f"doc{ext}")
+    writer(file_path)
+    assert extract_streaming(file_path, max_chars) == extract_full(file_path, max_chars)
+
+
+def test_truncation(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "large.md")
+    write_markdown(file_path, 64 * 1024)
+    expected = extract_full(file_path)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    # 只读取开头的MAX_EXTRACT_BYTES字节（多读一个字节），内容哈希仍然覆盖整个文件
+    monkeypatch.setattr(build, "MAX_EXTRACT_BYTES", 4096)
+    monkeypatch.setattr(build, "DOCUMENT_HASH_CHUNK_BYTES", 1000)
+    digest = build.hashlib.sha256()
+    assert build.read_document_data(file_path, digest) == data[:4097]
+    assert digest.hexdigest() == build.hashlib.sha256(data).hexdigest()
+
+    # 在换行处截断
+    prefix = build.read_document_prefix(data)
+    assert data.startswith(prefix.encode('utf-8')) and prefix.endswith('\n')
+    assert len(prefix.encode('utf-8')) <= 4096
+    content, headings = extract_streaming(file_path)
+    assert content == expected[0]
+    assert headings == expected[1][:len(headings)] and 0 < len(headings) < len(expected[1])
+
+    # 没有换行时不在UTF-8多字节字符中间截断
+    assert build.read_document_prefix(("中" * 2000).encode('utf-8')) == "中" * (4096 // 3)
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""Git后端：GitPython和git命令行读取同一个仓库的结果完全一致"""
+import os
+import json
+import subprocess
+
+import pytest
+
+import build
+from conftest import write_documents
+
+
+def git(repo_dir, *args, author=("作者甲", "alice@example.com"), date=0, check=True):
+    """在仓库中运行git命令（作者和时间固定，结果可重复）"""
+    name, email = author
+    timestamp = f"{1700000000 + date * 3600} +0800"
+    env = dict(
+        os.environ,
+        GIT_CONFIG_NOSYSTEM="1",
+        GIT_AUTHOR_NAME=name, GIT_AUTHOR_EMAIL=email, GIT_AUTHOR_DATE=timestamp,
+        GIT_COMMITTER_NAME=name, GIT_COMMITTER_EMAIL=email, GIT_COMMITTER_DATE=timestamp,
+    )
+    subprocess.run(["git", "-c", "commit.gpgsign=false", *args], cwd=repo_dir, env=env, check=check,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def commit(repo_dir, documents, message, date, author=("作者甲", "alice@example.com")):
+    write_documents(repo_dir, documents)
+    git(repo_dir, "add", "-A", author=author, date=date)
+    git(repo_dir, "commit", "-q", "-m", message, author=author, date=date)
+
+
+@pytest.fixture
+def history_repo(tmp_path):
+    """
+    包含合并、重命名和非ASCII路径的仓库
+
+    feature分支重命名文档并修改shared.md；master同时修改shared.md，
+    合并时手动解决冲突，使合并提交本身也修改了shared.md。
+    """
+    repo_dir = str(tmp_path / "repo")
+    os.makedirs(repo_dir)
+    git(repo_dir, "init", "-q")
+    git(repo_dir, "symbolic-ref", "HEAD", "refs/heads/master")
+    bob = ("Bob", "12345+bob-gh@users.noreply.github.com")
+    bob_work = ("Bob", "bob@work.example.com")
+
+    commit(repo_dir, {
+        "data/README.md": "# 首页\n",
+        "data/文档/说明.md": "# 说明\n\n第一版\n",
+        "data/with space.md": "# 空格\n",
+        "data/shared.md": "# 共享\n\n原始内容\n",
+    }, "初始提交", date=0)
+    commit(repo_dir, {"data/文档/说明.md": "# 说明\n\n第二版\n"}, "更新说明\n\n详细描述：多行提交信息", date=1, author=bob)
+
+    git(repo_dir, "checkout", "-q", "-b", "feature")
+    git(repo_dir, "mv", "data/文档/说明.md", "data/文档/使用说明.md")
+    commit(repo_dir, {"data/😀 表情.md": "# 表情\n"}, "重命名说明", date=2, author=bob_work)
+    commit(repo_dir, {"data/shared.md": "# 共享\n\nfeature分支的内容\n"}, "feature修改共享文档", date=3, author=bob_work)
+
+    git(repo_dir, "checkout", "-q", "master")
+    commit(repo_dir, {"data/shared.md": "# 共享\n\nmaster分支的内容\n", "data/README.md": "# 首页\n\n更新\n"},
+           "master修改共享文档", date=4)
+    # 两个分支都修改了shared.md，合并会产生冲突（以非零状态退出）
+    git(repo_dir, "merge", "-q", "--no-ff", "--no-commit", "feature", date=5, check=False)
+    commit(repo_dir, {"data/shared.md": "# 共享\n\n合并后的内容\n"}, "合并feature", date=5)
+    commit(repo_dir, {"data/with space.md": "# 空格\n\n更新\n"}, "更新空格文档", date=6, author=bob)
+    return repo_dir
+
+
+def read_history(repo_dir, backend_name):
+    backend = build.open_git_backend(repo_dir, backend_name)
+    assert backend is not None and backend.name == backend_name
+    caches = build.BuildCaches()
+    with build.use_build_caches(caches):
+        return {
+            "head": backend.head(),
+            "records": list(build.iter_git_log_records(backend)),
+            "history": build.build_git_history_index(backend),
+            "identity": build.build_author_identity_index(backend),
+        }
+
+
+def test_subprocess_backend_history(history_repo):
+    result = read_history(history_repo, "subprocess")
+    history = result["history"]
+    assert len(result["records"]) == 7
+    assert result["records"][1].message.strip() == "合并feature"
+
+    # 重命名的新旧路径和非ASCII路径都原样出现（不被转义）
+    assert {"data/文档/说明.md", "data/文档/使用说明.md", "data/😀 表情.md", "data/with space.md"} <= set(history)
+    assert history["data/文档/使用说明.md"]["last_commit"]["message"] == "重命名说明"
+
+    # 解决冲突的合并提交也计入shared.md的历史
+    shared = history["data/shared.md"]
+    assert shared["last_commit"]["message"] == "合并feature"
+    assert shared["authors"]["作者甲"]["commits"] == 3
+    assert shared["authors"]["Bob"]["commits"] == 1
+
+    identity = result["identity"]
+    assert identity["name_to_username"] == {"Bob": "bob-gh"}
+    assert identity["email_to_names"]["bob@work.example.com"] == ["Bob"]
+
+
+def test_backends_return_identical_history(history_repo):
+    pytest.importorskip("git")
+    assert read_history(history_repo, "gitpython") == read_history(history_repo, "subprocess")
+
+
+def test_not_a_repository(tmp_path):
+    for backend_name in ("subprocess", "gitpython") if build.GITPYTHON_AVAILABLE else ("subprocess",):
+        assert build.open_git_backend(str(tmp_path), backend_name) is None
+
+
+@pytest.fixture
+def merge_repo(tmp_path):
+    """
+    合并丢弃了分支修改的仓库
+
+    side分支的修改被 -s ours 合并丢弃；conflict分支与master冲突，解决时保留master的内容；
+    feature分支正常合并（合并结果与feature分支相同）。
+    """
+    repo_dir = str(tmp_path / "repo")
+    os.makedirs(repo_dir)
+    git(repo_dir, "init", "-q")
+    git(repo_dir, "symbolic-ref", "HEAD", "refs/heads/master")
+    carol = ("Carol", "carol@example.com")
+    dave = ("Dave", "dave@example.com")
+
+    commit(repo_dir, {"data/a.md": "# A\n", "data/b.md": "# B\n", "data/c.md": "# C\n"}, "初始提交", date=0)
+
+    git(repo_dir, "checkout", "-q", "-b", "side")
+    commit(repo_dir, {"data/b.md": "# B\n\nside\n"}, "side修改b", date=1, author=carol)
+    git(repo_dir, "checkout", "-q", "master")
+    commit(repo_dir, {"data/a.md": "# A\n\nmaster\n"}, "master修改a", date=2)
+    git(repo_dir, "merge", "-q", "-s", "ours", "side", "-m", "丢弃side", date=3)
+
+    git(repo_dir, "checkout", "-q", "-b", "conflict")
+    commit(repo_dir, {"data/c.md": "# C\n\nconflict\n"}, "conflict修改c", date=4, author=dave)
+    git(repo_dir, "checkout", "-q", "master")
+    commit(repo_dir, {"data/c.md": "# C\n\nmaster\n"}, "master修改c", date=5)
+    git(repo_dir, "merge", "-q", "--no-ff", "--no-commit", "conflict", date=6, check=False)
+    git(repo_dir, "checkout", "--ours", "--", "data/c.md")
+    commit(repo_dir, {}, "合并conflict", date=6)
+
+    git(repo_dir, "checkout", "-q", "-b", "feature")
+    commit(repo_dir, {"data/d.md": "# D\n", "data/b.md": "# B\n\nfeature\n"}, "feature修改b", date=7, author=dave)
+    git(repo_dir, "checkout", "-q", "master")
+    commit(repo_dir, {"data/a.md": "# A\n\nmaster 2\n"}, "master再次修改a", date=8)
+    git(repo_dir, "merge", "-q", "--no-ff", "feature", "-m", "合并feature", date=9)
+    return repo_dir
+
+
+def git_log_paths(repo_dir, path):
+    completed = subprocess.run(["git", "log", "--format=%H", "--", path], cwd=repo_dir,
+                               stdout=subprocess.PIPE, check=True)
+    return completed.stdout.decode('utf-8').split()
+
+
+@pytest.mark.parametrize("backend_name", ["subprocess", "gitpython"])
+def test_history_matches_git_log_per_path(merge_repo, backend_name):
+    if backend_name == "gitpython":
+        pytest.importorskip("git")
+    result = read_history(merge_repo, backend_name)
+    for path in ("data/a.md", "data/b.md", "data/c.md", "data/d.md"):
+        expected = git_log_paths(merge_repo, path)
+        assert [record.sha for record in result["records"] if path in record.paths] == expected, path
+        entry = result["history"][path]
+        assert sum(author["commits"] for author in entry["authors"].values()) == len(expected)
+
+    history = result["history"]
+    # 被丢弃的分支提交不计入贡献者，也不会成为最后修改
+    assert set(history["data/b.md"]["authors"]) == {"作者甲", "Dave"}
+    assert history["data/b.md"]["last_commit"]["message"] == "feature修改b"
+    assert set(history["data/c.md"]["authors"]) == {"作者甲"}
+    assert history["data/c.md"]["last_commit"]["message"] == "master修改c"
+
+
+def test_incremental_history_matches_full_history(merge_repo):
+    backend = build.open_git_backend(merge_repo, "subprocess")
+    with build.use_build_caches(build.BuildCaches()):
+        full = build.build_git_history_index(backend)
+        older = build.build_git_history_index(backend, "HEAD~1")
+        newer = build.build_git_history_index(backend, "HEAD~1..HEAD")
+    assert build.merge_git_history_index(newer, older) == full
+
+
+def test_history_cache_hit_incremental_and_rewrite(merge_repo, tmp_path):
+    cache_file = str(tmp_path / "git-index.json")
+    backend = build.open_git_backend(merge_repo, "subprocess")
+    caches = build.BuildCaches()
+    caches.profile["enabled"] = True
+
+    def load():
+        with build.use_build_caches(caches):
+            index = build.load_or_build_git_history_index(backend, cache_file)
+            full = build.build_git_history_index(backend)
+        assert index == full
+        return index
+
+    load()
+    load()
+    assert caches.profile["counters"]["git_cache_misses"] == 1
+    assert caches.profile["counters"]["git_cache_hits"] == 1
+
+    # 新提交只遍历缓存的HEAD之后的部分
+    commit(merge_repo, {"data/a.md": "# A\n\nmaster 3\n"}, "master第三次修改a", date=10, author=("Erin", "erin@example.com"))
+    assert set(load()["data/a.md"]["authors"]) == {"作者甲", "Erin"}
+    assert caches.profile["counters"]["git_cache_incremental"] == 1
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        assert json.load(f)["head"] == backend.head()
+
+    # 历史被改写后缓存的HEAD不再是祖先，重新遍历全部历史
+    git(merge_repo, "reset", "-q", "--hard", "HEAD~1")
+    commit(merge_repo, {"data/b.md": "# B\n\nrewritten\n"}, "改写后的提交", date=11)
+    assert "Erin" not in load()["data/a.md"]["authors"]
+    assert caches.profile["counters"]["git_cache_misses"] == 2
+
+
+def test_history_cache_rebuilds_after_discarding_merge(tmp_path):
+    """缓存的HEAD对a.md的修改在之后的合并中被丢弃（冲突时保留另一侧），结果与完整遍历一致"""
+    repo_dir = str(tmp_path / "repo")
+    os.makedirs(repo_dir)
+    git(repo_dir, "init", "-q")
+    git(repo_dir, "symbolic-ref", "HEAD", "refs/heads/master")
+    commit(repo_dir, {"data/a.md": "# A\n", "data/b.md": "# B\n"}, "初始提交", date=0)
+    git(repo_dir, "checkout", "-q", "-b", "other")
+    commit(repo_dir, {"data/a.md": "# A\n\nother\n"}, "other修改a", date=1, author=("Frank", "frank@example.com"))
+    git(repo_dir, "checkout", "-q", "master")
+    commit(repo_dir, {"data/a.md": "# A\n\nmaster\n"}, "master修改a", date=2, author=("Dave", "dave@example.com"))
+
+    cache_file = str(tmp_path / "git-index.json")
+    backend = build.open_git_backend(repo_dir, "subprocess")
+    caches = build.BuildCaches()
+    caches.profile["enabled"] = True
+    with build.use_build_caches(caches):
+        assert "Dave" in build.load_or_build_git_history_index(backend, cache_file)["data/a.md"]["authors"]
+
+    git(repo_dir, "merge", "-q", "--no-ff", "--no-commit", "other", date=3, check=False)
+    git(repo_dir, "checkout", "--theirs", "--", "data/a.md")
+    commit(repo_dir, {"data/b.md": "# B\n\nmerged\n"}, "合并other", date=3)
+    with build.use_build_caches(caches):
+        index = build.load_or_build_git_history_index(backend, cache_file)
+        assert index == build.build_git_history_index(backend)
+    assert set(index["data/a.md"]["authors"]) == {"作者甲", "Frank"}
+    assert caches.profile["counters"]["git_cache_misses"] == 2
+    assert "git_cache_incremental" not in caches.profile["counters"]
+
+
+def test_author_identity_lookups(history_repo, tmp_path):
+    backend = build.open_git_backend(history_repo, "subprocess")
+    log_calls = []
+    log = backend.log
+    backend.log = lambda *args, **kwargs: log_calls.append(args) or log(*args, **kwargs)
+    emails = ["12345+bob-gh@users.noreply.github.com", "bob@work.example.com", "alice@example.com", "nobody@example.com"]
+
+    with build.use_build_caches(build.BuildCaches()):
+        usernames = [build.get_github_username_by_email(email, backend) for email in emails]
+        usernames += [build.get_github_username_by_email(email, backend) for email in emails]
+    # 同名作者的noreply邮箱给出工作邮箱对应的用户名，整个查询只读取一次提交日志
+    assert usernames == ["bob-gh", "bob-gh", None, None] * 2
+    assert len(log_calls) == 1
+
+    # 映射文件中的邮箱和作者名覆盖项优先于推导结果
+    map_file = str(tmp_path / "authors.map")
+    with open(map_file, 'w', encoding='utf-8') as f:
+        f.write("# 作者映射\nalice-gh <alice@example.com>\nbob-override Bob\n")
+    with build.use_build_caches(build.BuildCaches()):
+        build.build_author_identity_index(backend, map_file)
+        assert [build.get_github_username_by_email(email, backend) for email in emails] == [
+            "bob-override", "bob-override", "alice-gh", None
+        ]
+    assert len(log_calls) == 2
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""GitHub用户信息缓存：有效期、过期后重新查询和未找到用户的缓存（使用本地模拟的GitHub API）"""
+import os
+import json
+import time
+
+import build
+
+
+def write_cache(path, users):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"version": build.GITHUB_CACHE_VERSION, "users": users}, f)
+
+
+def user_entry(username, fetched_at):
+    return {
+        "avatar_url": f"https://avatars.example.com/{username}",
+        "login": username,
+        "html_url": f"https://github.example.com/{username}",
+        "fetched_at": fetched_at,
+    }
+
+
+def test_api_url_is_configurable(monkeypatch, github_stub):
+    monkeypatch.setenv("GITHUB_API_URL", "https://github.example.com/api/v3")
+    assert build.BuildCaches().github_api_url == "https://github.example.com/api/v3"
+    monkeypatch.delenv("GITHUB_API_URL")
+    assert build.BuildCaches().github_api_url == build.GITHUB_API_BASE_URL
+    assert build.Builder(github_api_url=github_stub.url).caches.github_api_url == github_stub.url
+
+
+def test_fresh_entry_is_not_requested(tmp_path, github_stub, github_caches):
+    cache_file = str(tmp_path / "github-users.json")
+    write_cache(cache_file, {"alice": user_entry("alice", int(time.time()) - 60)})
+    github_stub.users.add("alice")
+
+    build.load_github_cache(cache_file)
+    assert build.resolve_github_users({"alice"}) == 0
+    assert github_stub.requested() == 0
+    assert build.get_github_avatar_url("alice") == "https://avatars.example.com/alice"
+
+
+def test_expired_entry_is_requested_again(tmp_path, github_stub, github_caches):
+    cache_file = str(tmp_path / "github-users.json")
+    expired = int(time.time()) - build.GITHUB_CACHE_TTL - 1
+    write_cache(cache_file, {"alice": user_entry("alice", expired)})
+    github_stub.users.add("alice")
+
+    build.load_github_cache(cache_file)
+    assert build.resolve_github_users({"alice"}) == 1
+    assert github_stub.requested("alice") == 1
+
+    build.save_github_cache(cache_file)
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        saved = json.load(f)["users"]["alice"]
+    assert saved["fetched_at"] > expired
+    assert saved["avatar_url"] == "https://avatars.example.com/alice"
+
+
+def test_unknown_user_is_cached_negatively(tmp_path, github_stub):
+    cache_file = str(tmp_path / "github-users.json")
+
+    # 第一次构建：用户不存在，记录为未找到并写入缓存文件
+    caches = build.BuildCaches()
+    caches.github_api_url = github_stub.url
+    with build.use_build_caches(caches):
+        assert build.resolve_github_users({"ghost"}) == 1
+        assert caches.github_users["ghost"]["missing"] is True
+        build.save_github_cache(cache_file)
+    assert github_stub.requested("ghost") == 1
+
+    # 有效期内的下一次构建不再查询
+    caches = build.BuildCaches()
+    caches.github_api_url = github_stub.url
+    with build.use_build_caches(caches):
+        build.load_github_cache(cache_file)
+        assert build.resolve_github_users({"ghost"}) == 0
+        assert build.get_github_avatar_url("ghost") is None
+    assert github_stub.requested("ghost") == 1
+
+    # 未找到的记录有效期较短，过期后重新查询
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        cache = json.load(f)
+    cache["users"]["ghost"]["fetched_at"] = int(time.time()) - build.GITHUB_NEGATIVE_CACHE_TTL - 1
+    assert build.GITHUB_NEGATIVE_CACHE_TTL < build.GITHUB_CACHE_TTL
+    write_cache(cache_file, cache["users"])
+    caches = build.BuildCaches()
+    caches.github_api_url = github_stub.url
+    with build.use_build_caches(caches):
+        build.load_github_cache(cache_file)
+        assert build.resolve_github_users({"ghost"}) == 1
+    assert github_stub.requested("ghost") == 2
+
+
+def test_transient_errors_are_not_saved(tmp_path, monkeypatch, github_stub, github_caches):
+    monkeypatch.setattr(build, "GITHUB_API_MAX_RETRIES", 0)
+    cache_file = str(tmp_path / "github-users.json")
+    github_stub.responses["bob"] = [(500, {})]
+
+    assert build.resolve_github_users({"bob"}) == 1
+    build.save_github_cache(cache_file)
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        assert "bob" not in json.load(f)["users"]
+
+
+class LogRepo:
+    """只实现 log() 的仓库，返回固定的 作者名、邮箱 列表"""
+
+    def __init__(self, authors):
+        self.authors = authors
+        self.calls = 0
+
+    def log(self, *args):
+        self.calls += 1
+        return ["\n".join(f"{name}{build.GIT_LOG_FIELD_SEP}{email}" for name, email in self.authors)]
+
+
+def test_email_mapping_is_derived_from_identity_index(tmp_path, github_stub, github_caches):
+    cache_file = str(tmp_path / "github-users.json")
+    repo = LogRepo([
+        ("Alice", "alice@example.com"),
+        ("Alice", "12345+alice@users.noreply.github.com"),
+        ("Bob", "bob@example.com"),
+    ])
+
+    assert build.get_github_username_by_email("alice@example.com", repo) == "alice"
+    assert build.get_github_username_by_email("bob@example.com", repo) is None
+    assert build.get_github_username_by_email("bob@example.com", repo) is None
+    assert repo.calls == 1
+
+    # 缓存文件只保存用户信息，邮箱映射每次构建由作者身份索引重新推导
+    github_stub.users.add("alice")
+    build.resolve_github_users({"alice"})
+    build.save_github_cache(cache_file)
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        assert set(json.load(f)) == {"version", "users"}
+
+    caches = build.BuildCaches()
+    caches.github_api_url = github_stub.url
+    with build.use_build_caches(caches):
+        build.load_github_cache(cache_file)
+        assert build.get_github_username_by_email("alice@example.com", LogRepo([("Alice", "alice@example.com")])) is None
+        assert build.resolve_github_users({"alice"}) == 0
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""并发的GitHub用户信息查询：线程池、连接复用、限流重试和服务器不可用时的处理（使用本地模拟的GitHub API）"""
+import socket
+import time
+import http.client
+
+import build
+
+
+def test_concurrent_lookups(github_stub, github_caches):
+    usernames = {f"user{i}" for i in range(8)}
+    github_stub.users.update(usernames)
+    github_stub.delay = 0.3
+
+    started = time.perf_counter()
+    assert build.resolve_github_users(usernames, concurrency=8) == 8
+    elapsed = time.perf_counter() - started
+
+    # 8个请求并发完成，耗时远小于串行的 8 * 0.3 秒
+    assert elapsed < 8 * 0.3 / 2
+    assert github_stub.requested() == 8
+    for username in usernames:
+        assert github_caches.github_users[username]["login"] == username
+    # 工作线程打开的连接在查询结束后全部关闭
+    assert github_caches.github_open_connections == []
+
+
+def test_connection_is_reused(github_stub, github_caches):
+    usernames = {f"user{i}" for i in range(5)}
+    github_stub.users.update(usernames)
+
+    build.resolve_github_users(usernames, concurrency=1)
+    clients = {client for _, client in github_stub.requests}
+    assert len(github_stub.requests) == 5
+    assert len(clients) == 1
+
+
+def test_retry_after_429(github_stub, github_caches):
+    github_stub.users.add("carol")
+    github_stub.responses["carol"] = [(429, {"Retry-After": "1"})]
+
+    started = time.perf_counter()
+    build.resolve_github_users({"carol"})
+    elapsed = time.perf_counter() - started
+
+    assert github_stub.requested("carol") == 2
+    assert elapsed >= 1
+    assert github_caches.github_users["carol"]["avatar_url"] == "https://avatars.example.com/carol"
+
+
+def test_exhausted_rate_limit_skips_remaining_users(github_stub, github_caches):
+    github_stub.users.update({"dave", "erin"})
+    reset = str(int(time.time()) + 3600)
+    github_stub.responses["dave"] = [(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset})]
+
+    build.resolve_github_users({"dave", "erin"}, concurrency=1)
+    # 额度用完且重置时间超过最长等待时间，之后的用户不再请求，结果也不会写入缓存文件
+    assert github_stub.requested() == 1
+    assert github_caches.github_users["dave"]["login"] == "dave"
+    assert github_caches.github_users["erin"]["fetched_at"] is None
+
+
+def test_unreachable_server(monkeypatch, github_caches):
+    monkeypatch.setattr(build, "GITHUB_API_MAX_RETRIES", 1)
+    monkeypatch.setattr(build, "GITHUB_API_TIMEOUT", 1)
+    # 取得一个当前没有服务监听的端口
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    github_caches.github_api_url = f"http://127.0.0.1:{port}"
+
+    assert build.resolve_github_users({"frank", "grace"}) == 2
+    for username in ("frank", "grace"):
+        entry = github_caches.github_users[username]
+        assert entry["avatar_url"] is None
+        # 临时性错误不会被当作用户不存在
+        assert entry["fetched_at"] is None
+        assert "missing" not in entry
+    assert github_caches.github_open_connections == []
+
+
+def test_failed_connections_are_closed(monkeypatch, github_caches):
+    monkeypatch.setattr(build, "GITHUB_API_MAX_RETRIES", 2)
+    monkeypatch.setattr(build.time, "sleep", lambda seconds: None)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    github_caches.github_api_url = f"http://127.0.0.1:{port}"
+
+    closed = []
+    close = http.client.HTTPConnection.close
+    monkeypatch.setattr(http.client.HTTPConnection, "close", lambda self: closed.append(self) or close(self))
+    # 每次失败的连接都在重试前关闭，不会留到查询结束
+    assert build.request_github_user("frank") == (None, None)
+    assert len(closed) == 3
+    assert github_caches.github_open_connections == []
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""增量构建：文档清单按内容哈希判断文档是否需要重新解析，修改和删除的文档使清单条目失效"""
+import os
+import json
+
+from conftest import write_documents, make_builder
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def incremental_build(site):
+    """使用文档清单构建一次，返回 (path.json中的文档标题, 重新解析的文档数)"""
+    builder = make_builder(site, incremental=True, profile=os.path.join(site, "profile.json"))
+    builder.run()
+    structure = read_json(os.path.join(site, "path.json"))
+    titles = {child["path"]: child["title"] for child in structure["children"]}
+    return titles, builder.caches.profile["counters"].get("documents_parsed", 0)
+
+
+def manifest_files(site):
+    manifest = read_json(os.path.join(site, ".easydoc-cache", "documents.json"))
+    return sorted(os.path.basename(key) for key in manifest["files"])
+
+
+def test_manifest_invalidation_on_edit_and_delete(site):
+    data_dir = os.path.join(site, "data")
+    write_documents(data_dir, {"README.md": "# 首页", "a.md": "# 文档A\n\n内容", "b.md": "# 文档B\n\n内容"})
+
+    titles, parsed = incremental_build(site)
+    assert parsed == 3
+    assert manifest_files(site) == ["README.md", "a.md", "b.md"]
+
+    # 没有变化时全部命中
+    assert incremental_build(site) == (titles, 0)
+
+    # 只修改时间变化、内容不变时按内容哈希命中
+    stat = os.stat(os.path.join(data_dir, "b.md"))
+    os.utime(os.path.join(data_dir, "b.md"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert incremental_build(site) == (titles, 0)
+
+    # 修改的文档重新解析
+    write_documents(data_dir, {"a.md": "# 新的文档A\n\n修改后的内容"})
+    titles, parsed = incremental_build(site)
+    assert parsed == 1
+    assert titles["a.md"] == "新的文档A"
+
+    # 删除的文档从清单和输出中移除
+    os.remove(os.path.join(data_dir, "b.md"))
+    titles, parsed = incremental_build(site)
+    assert parsed == 0
+    assert "b.md" not in titles
+    assert manifest_files(site) == ["README.md", "a.md"]
+
+
+def test_manifest_invalidated_by_config_change(site):
+    write_documents(os.path.join(site, "data"), {"README.md": "# 首页", "a.md": "# 文档A"})
+    incremental_build(site)
+    builder = make_builder(site, incremental=True, tokenizer="simple", profile=os.path.join(site, "profile.json"))
+    builder.run()
+    assert builder.caches.profile["counters"]["documents_parsed"] == 2
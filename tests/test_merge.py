@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""合并模式（--merge）：删除索引页后目录结构和导航数据保持正确"""
+import os
+import json
+
+from conftest import write_documents, make_builder
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_removed_index_page_keeps_directory(site):
+    data_dir = os.path.join(site, "data")
+    write_documents(data_dir, {
+        "README.md": "# 首页",
+        "a/README.md": "# 目录A",
+        "a/x.md": "# 文档X",
+    })
+    make_builder(site).run()
+    os.remove(os.path.join(data_dir, "a", "README.md"))
+    make_builder(site, merge=True).run()
+
+    directory = read_json(os.path.join(site, "path.json"))["children"][0]
+    assert directory["path"] == "a"
+    assert "index" in directory and directory["index"] is None
+    assert [child["path"] for child in directory["children"]] == ["a/x.md"]
+
+    # nav.json中目录a没有索引页，但仍是目录，不会被当成文档
+    navigation = read_json(os.path.join(site, "nav.json"))
+    assert [document[0] for document in navigation["documents"]] == ["README.md", "a/x.md"]
+    assert ["a", "a", 0, -1] in navigation["directories"]
+    assert "a" not in navigation["paths"]
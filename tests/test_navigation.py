@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""导航数据（nav.json）：记录生成它的path.json的哈希，与前端utils.js的实现一致"""
+import os
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import build
+from conftest import PROJECT_ROOT, write_documents, make_builder
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def extract_js_function(source, name):
+    """从JS源码中取出一个顶层函数的定义（按花括号配对）"""
+    start = source.index(f"function {name}(")
+    depth = 0
+    for end in range(source.index("{", start), len(source)):
+        if source[end] == "{":
+            depth += 1
+        elif source[end] == "}":
+            depth -= 1
+            if depth == 0:
+                return source[start:end + 1]
+    raise ValueError(name)
+
+
+def run_utils(names, expression, config):
+    """在node中执行utils.js中的若干函数，返回expression的JSON结果"""
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("需要node")
+    with open(os.path.join(PROJECT_ROOT, "assets", "js", "utils.js"), 'r', encoding='utf-8') as f:
+        source = f.read()
+    script = "\n".join(
+        [f"const config = {{document: {{supported_extensions: {json.dumps(config['supported_extensions'])}}}}};"]
+        + [extract_js_function(source, name) for name in names]
+        + [f"process.stdout.write(JSON.stringify({expression}));"]
+    )
+    completed = subprocess.run([node, "-e", script], stdout=subprocess.PIPE, check=True)
+    return json.loads(completed.stdout.decode('utf-8'))
+
+
+def test_navigation_records_path_hash(site):
+    write_documents(os.path.join(site, "data"), {"README.md": "# 首页", "a.md": "# 文档A"})
+    make_builder(site).run()
+    with open(os.path.join(site, "path.json"), 'r', encoding='utf-8', newline='') as f:
+        path_text = f.read()
+    navigation = read_json(os.path.join(site, "nav.json"))
+    assert navigation["version"] == build.NAVIGATION_VERSION == 2
+    assert navigation["path_hash"] == build.hash_navigation_source(path_text)
+
+    # path.json被手动编辑后哈希不再一致
+    edited = path_text.replace("文档A", "手动修改的标题")
+    assert build.hash_navigation_source(edited) != navigation["path_hash"]
+
+
+def test_path_hash_matches_frontend(site):
+    texts = ["", "path.json", '{"title": "首页", "emoji": "😀"}\r\n']
+    expected = [build.hash_navigation_source(text) for text in texts]
+    assert run_utils(["hashPathText"], f"{json.dumps(texts)}.map(hashPathText)", build.DEFAULT_CONFIG) == expected
+
+
+def test_stale_navigation_is_ignored(site):
+    write_documents(os.path.join(site, "data"), {"README.md": "# 首页"})
+    make_builder(site).run()
+    navigation = read_json(os.path.join(site, "nav.json"))
+    with open(os.path.join(site, "path.json"), 'r', encoding='utf-8', newline='') as f:
+        path_text = f.read()
+    nav, text = json.dumps(navigation), json.dumps(path_text)
+    checks = run_utils(
+        ["hashPathText", "isNavigationDataCurrent"],
+        f"[isNavigationDataCurrent({nav}, hashPathText({text})),"
+        f" isNavigationDataCurrent({nav}, hashPathText({text} + ' ')),"
+        f" isNavigationDataCurrent(Object.assign({{}}, {nav}, {{version: 1}}), hashPathText({text})),"
+        f" isNavigationDataCurrent(null, hashPathText({text}))]",
+        build.DEFAULT_CONFIG,
+    )
+    assert checks == [True, False, False, False]
+
+
+def test_navigation_matches_frontend(site):
+    write_documents(os.path.join(site, "data"), {
+        "README.md": "# 首页",
+        "guide/README.md": "# 指南",
+        "guide/install.md": "# 安装",
+        "guide/advanced/README.md": "# 进阶",
+        "guide/advanced/plugins.HTML": "<html><head><title>插件</title></head></html>",
+        "only-index/README.md": "# 只有索引页的目录",
+        "notes.md": "# 笔记",
+    })
+    builder = make_builder(site)
+    builder.run()
+    structures = [read_json(os.path.join(site, "path.json"))]
+    # 手动编辑过的结构：重复的路径、没有路径的节点、没有索引页的目录、与目录同名的文档
+    structures.append({
+        "title": "文档", "path": "", "index": {"title": "首页", "path": "README.md"},
+        "children": [
+            {"title": "重复", "path": "README.md"},
+            {"title": "没有路径"},
+            {"title": "目录", "path": "dir", "index": None, "children": [{"title": "文档", "path": "dir/a.md"}]},
+            {"title": "同名文档", "path": "dir.md"},
+            {"title": "其他扩展名", "path": "file.txt"},
+        ],
+    })
+
+    for structure in structures:
+        expected = build.build_navigation(structure, builder.config)
+        # path_hash由build.py写入，前端只在读取时比较
+        assert expected.pop("path_hash") is None
+        actual = run_utils(["buildNavigationData"], f"buildNavigationData({json.dumps(structure)})", builder.config)
+        assert actual == expected
+    assert [document[0] for document in expected["documents"]] == ["README.md", "dir/a.md", "dir.md", "file.txt"]
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""更新包：可重复的打包结果、增量包的生成，以及应用前对本地文件和压缩包内容的校验"""
+import os
+import json
+import zipfile
+
+import pytest
+
+import build
+from conftest import write_documents
+
+
+OLD_VERSION = {
+    "assets/js/main.js": "console.log('v1');",
+    "assets/css/old.css": "body {}",
+    "config.js": "window.config = {};",
+    "build.py": "print('v1')",
+}
+
+
+def read_tree(root):
+    tree = {}
+    for directory, dirs, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            with open(path, 'r', encoding='utf-8') as f:
+                tree[os.path.relpath(path, root).replace("\\", "/")] = f.read()
+    return tree
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """旧版本的更新包和本地安装，以及修改后的新版本项目（当前目录），返回 (旧更新包, 安装目录)"""
+    source = tmp_path / "project"
+    write_documents(str(source), OLD_VERSION)
+    monkeypatch.chdir(source)
+    old_package = str(tmp_path / "v1.zip")
+    build.create_update_package(old_package)
+
+    installed = str(tmp_path / "installed")
+    assert build.apply_package(old_package, installed)
+
+    # 新版本：修改、新增和删除各一个文件
+    write_documents(str(source), {"assets/js/main.js": "console.log('v2');", "assets/js/search.js": "export {};"})
+    os.remove(source / "assets" / "css" / "old.css")
+    return old_package, installed
+
+
+def make_delta(tmp_path, old_package):
+    delta = str(tmp_path / "delta.zip")
+    build.create_delta_package(delta, old_package)
+    return delta
+
+
+def test_delta_manifest(tmp_path, project):
+    old_package, installed = project
+    delta = make_delta(tmp_path, old_package)
+    old_files = build.load_package_manifest(old_package)["files"]
+    manifest = build.load_package_manifest(delta)
+
+    assert manifest["type"] == "delta"
+    assert manifest["changed"] == ["assets/js/main.js", "assets/js/search.js"]
+    assert manifest["deleted"] == ["assets/css/old.css"]
+    assert manifest["base"] == {
+        "assets/css/old.css": old_files["assets/css/old.css"],
+        "assets/js/main.js": old_files["assets/js/main.js"],
+        "assets/js/search.js": None,
+    }
+    with zipfile.ZipFile(delta) as zipf:
+        assert sorted(zipf.namelist()) == ["assets/js/main.js", "assets/js/search.js", build.PACKAGE_MANIFEST_NAME]
+
+    assert build.apply_package(delta, installed)
+    assert read_tree(installed) == {
+        "assets/js/main.js": "console.log('v2');",
+        "assets/js/search.js": "export {};",
+        "default.config.js": "window.config = {};",
+        "build.py": "print('v1')",
+    }
+
+
+def test_verify_only_on_wrong_base(tmp_path, project):
+    old_package, installed = project
+    delta = make_delta(tmp_path, old_package)
+    write_documents(installed, {"assets/js/main.js": "console.log('local edit');"})
+    before = read_tree(installed)
+
+    assert build.apply_package(delta, installed, verify_only=True) is False
+    assert build.apply_package(delta, installed) is False
+    assert read_tree(installed) == before
+
+
+def test_added_file_is_not_overwritten(tmp_path, project):
+    old_package, installed = project
+    delta = make_delta(tmp_path, old_package)
+    write_documents(installed, {"assets/js/search.js": "// local file"})
+
+    assert build.apply_package(delta, installed) is False
+    assert read_tree(installed)["assets/js/search.js"] == "// local file"
+
+    # 本地文件已经是新版本时可以重复应用；指定force时覆盖
+    assert build.apply_package(delta, installed, force=True)
+    assert read_tree(installed)["assets/js/search.js"] == "export {};"
+    assert build.apply_package(delta, installed, verify_only=True)
+
+
+def test_tampered_archive(tmp_path, project):
+    old_package, installed = project
+    delta = make_delta(tmp_path, old_package)
+    tampered = str(tmp_path / "tampered.zip")
+    with zipfile.ZipFile(delta) as src, zipfile.ZipFile(tampered, 'w') as dst:
+        for name in src.namelist():
+            data = src.read(name)
+            if name == "assets/js/main.js":
+                data = b"console.log('evil');"
+            dst.writestr(name, data)
+    before = read_tree(installed)
+
+    assert build.apply_package(tampered, installed, verify_only=True) is False
+    assert build.apply_package(tampered, installed) is False
+    assert read_tree(installed) == before
+
+
+def test_packages_are_reproducible(tmp_path, monkeypatch):
+    source = tmp_path / "project"
+    write_documents(str(source), dict(OLD_VERSION, **{"main/index.html": "<html></html>", "LICENSE": "MIT"}))
+    with open(source / "assets" / "logo.png", 'wb') as f:
+        f.write(bytes(range(256)))
+    monkeypatch.chdir(source)
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+
+    packages = []
+    for run in range(2):
+        # 源文件的修改时间不影响打包结果
+        for directory, dirs, files in os.walk(source):
+            for name in files:
+                os.utime(os.path.join(directory, name), (1000000000 + run * 3600, 1000000000 + run * 3600))
+        update, initial = str(tmp_path / f"update{run}.zip"), str(tmp_path / f"initial{run}.zip")
+        build.create_update_package(update)
+        build.create_initial_package(initial)
+        packages.append((read_bytes(update), read_bytes(initial)))
+    assert packages[0] == packages[1]
+
+    with zipfile.ZipFile(str(tmp_path / "update0.zip")) as zipf:
+        infos = zipf.infolist()
+        names = [info.filename for info in infos]
+        assert names[:-1] == sorted(names[:-1]) and names[-1] == build.PACKAGE_MANIFEST_NAME
+        assert all(info.date_time == (1980, 1, 1, 0, 0, 0) for info in infos)
+        assert zipf.getinfo("assets/logo.png").compress_type == zipfile.ZIP_STORED
+        assert zipf.getinfo("build.py").compress_type == zipfile.ZIP_DEFLATED
+        manifest = json.loads(zipf.read(build.PACKAGE_MANIFEST_NAME))
+        assert manifest["files"] == {name: build.hash_package_entry(None, zipf.read(name)) for name in names[:-1]}
+
+    # SOURCE_DATE_EPOCH指定压缩包中的文件时间
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000001")
+    build.create_update_package(str(tmp_path / "dated.zip"))
+    with zipfile.ZipFile(str(tmp_path / "dated.zip")) as zipf:
+        assert zipf.infolist()[0].date_time == (2023, 11, 14, 22, 13, 20)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""紧凑格式的path.json：贡献者集中到authors表，还原后与完整格式一致（Python和前端utils.js）"""
+import os
+import json
+
+import build
+from conftest import write_documents, make_builder
+from test_navigation import read_json, run_utils
+
+
+def contributor(name, commits, timestamp, username=None):
+    return {
+        "name": name,
+        "email": f"{name.lower()}@example.com",
+        "commits": commits,
+        "github_username": username,
+        "github_avatar": f"https://avatars.example.com/{username}" if username else None,
+        "last_commit_timestamp": timestamp,
+    }
+
+
+def git_info(message, timestamp, *contributors):
+    last = contributors[0]
+    return {
+        "last_modified": {
+            "timestamp": timestamp,
+            "author": last["name"],
+            "email": last["email"],
+            "message": message,
+            "github_username": last["github_username"],
+            "github_avatar": last["github_avatar"],
+        },
+        "contributors": list(contributors),
+    }
+
+
+def make_structure():
+    alice = contributor("Alice", 3, 1700000300, "alice-gh")
+    bob = contributor("Bob", 1, 1700000100)
+    return {
+        "title": "文档",
+        "path": "",
+        "index": {"title": "首页", "path": "README.md", "git": git_info("更新首页", 1700000300, alice)},
+        "children": [
+            {"title": "指南", "path": "guide.md", "git": git_info("修改指南", 1700000200, bob, alice), "custom": [1, 2]},
+            {
+                "title": "插件",
+                "path": "plugins",
+                "index": {"title": "插件", "path": "plugins/README.md"},
+                "children": [
+                    {"title": "开发", "path": "plugins/dev.md", "git": git_info("添加开发文档", 1700000100, bob)},
+                    {"title": "没有Git信息", "path": "plugins/new.md"},
+                ],
+            },
+        ],
+    }
+
+
+def test_compact_round_trip():
+    structure = make_structure()
+    compacted = json.loads(json.dumps(build.compact_structure(structure)))
+
+    assert compacted["format"] == build.PATH_FORMAT_VERSION
+    assert [author["name"] for author in compacted["authors"]] == ["Alice", "Bob"]
+    assert compacted["children"][0]["git"]["contributors"] == [[1, 1, 1700000100], [0, 3, 1700000300]]
+    assert len(json.dumps(compacted)) < len(json.dumps(structure))
+
+    assert build.expand_structure(compacted) == structure
+    assert build.expand_structure(structure) is structure
+    assert run_utils(["expandPathData"], f"expandPathData({json.dumps(compacted)})", build.DEFAULT_CONFIG) == structure
+
+
+def test_compact_path_json_loads_as_full(site):
+    write_documents(os.path.join(site, "data"), {"README.md": "# 首页", "a/README.md": "# 目录A", "a/b.md": "# 文档B"})
+    make_builder(site).run()
+    full = read_json(os.path.join(site, "path.json"))
+    make_builder(site, path_format="compact").run()
+    assert read_json(os.path.join(site, "path.json"))["format"] == build.PATH_FORMAT_VERSION
+    assert build.load_existing_structure(os.path.join(site, "path.json")) == full
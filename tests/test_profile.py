@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""--profile：各阶段耗时、计数器、最慢的文档和cProfile统计"""
+import os
+import sys
+import json
+import pstats
+import subprocess
+
+from conftest import PROJECT_ROOT, write_documents
+
+
+BUILD_ARGS = ["--root", "data", "--config", os.path.join(PROJECT_ROOT, "config.js"), "--no-git", "--no-github", "--yes"]
+
+
+def run_build(site, *args):
+    command = [sys.executable, os.path.join(PROJECT_ROOT, "build.py"), *args]
+    completed = subprocess.run(command, cwd=site, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True)
+    return completed.stdout.decode('utf-8')
+
+
+def test_profile_report(site):
+    documents = {"README.md": "# 首页"}
+    documents.update({f"doc{i}.md": f"# 文档{i}\n\n" + "内容 " * (i * 100) for i in range(5)})
+    write_documents(os.path.join(site, "data"), documents)
+
+    output = run_build(site, *BUILD_ARGS, "--profile", "reports/profile.json", "--profile-top", "2", "--profile-cprofile", "scan",
+                       "--timings", "timings.json")
+    assert "性能分析报告" in output
+
+    with open(os.path.join(site, "reports", "profile.json"), 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    assert report["version"] == 1
+    assert {"scan", "search", "write"} <= set(report["phases"])
+    for phase in report["phases"].values():
+        assert phase["calls"] >= 1 and phase["wall"] >= 0 and phase["cpu"] >= 0
+    total = report["total"]["wall"]
+    assert abs(sum(phase["wall"] for phase in report["phases"].values()) + report["other"]["wall"] - total) < 1e-6
+    assert report["counters"]["documents_parsed"] == 6
+    assert report["counters"]["bytes_read"] >= sum(len(text.encode('utf-8')) for text in documents.values())
+    assert report["counters"]["bytes_written"] > 0
+    assert len(report["slowest_documents"]) == 2
+    seconds = [document["seconds"] for document in report["slowest_documents"]]
+    assert seconds == sorted(seconds, reverse=True)
+
+    # 指定阶段的cProfile统计写入与报告同名的.prof文件
+    stats = pstats.Stats(os.path.join(site, "reports", "profile.scan.prof"))
+    assert any(function[2] == "scan_directory" for function in stats.stats)
+
+    # --timings 与报告记录同样的阶段
+    with open(os.path.join(site, "timings.json"), 'r', encoding='utf-8') as f:
+        timings = json.load(f)
+    assert set(timings["phases"]) == set(report["phases"])
+    assert timings["files"] == 6
+
+
+def test_profile_package(site):
+    output = run_build(site, "--package", "--package-output", "update.zip", "--profile", "profile.json")
+    with open(os.path.join(site, "profile.json"), 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    assert list(report["phases"]) == ["package"]
+    assert "性能分析报告" in output
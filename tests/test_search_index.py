@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""倒排搜索索引：v3格式、SearchIndex.query的命中和排序"""
+import os
+import json
+
+import pytest
+
+import build
+from conftest import write_documents, make_builder
+
+
+DOCUMENTS = {
+    "README.md": "# 首页\n\n欢迎使用文档站点。",
+    "plugins.md": "# 插件列表\n\n这里列出所有可用的功能。",
+    "guide.md": "# 使用指南\n\n安装插件之后，请阅读配置说明。",
+    "faq.md": "# 常见问题\n\n配置文件写错时会显示错误说明。",
+}
+
+
+@pytest.fixture
+def index_data(site):
+    write_documents(os.path.join(site, "data"), DOCUMENTS)
+    make_builder(site).run()
+    with open(os.path.join(site, "search-index.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def paths(hits):
+    return [hit["path"] for hit in hits]
+
+
+def test_index_format(index_data):
+    assert index_data["version"] == build.SEARCH_INDEX_VERSION == 3
+    assert index_data["tokenizer"] == "cjk"
+    assert index_data["fields"] == ["title", "keywords", "content"]
+    assert set(index_data["bm25"]) == {"k1", "b", "average_lengths"}
+    assert len(index_data["bm25"]["average_lengths"]) == len(index_data["fields"])
+
+    docs = index_data["docs"]
+    assert sorted(doc["path"] for doc in docs) == sorted(DOCUMENTS)
+    assert all(len(doc["lengths"]) == len(index_data["fields"]) for doc in docs)
+
+    # 倒排记录为 [文档编号, 字段序号, BM25权重, 位置...]，位置指向该字段中的词条序号
+    title_field = index_data["fields"].index("title")
+    plugins_id = paths(docs).index("plugins.md")
+    postings = [posting for posting in index_data["postings"]["插件"] if posting[:2] == [plugins_id, title_field]]
+    assert len(postings) == 1
+    assert postings[0][2] > 0
+    assert postings[0][3:] == [build.tokenize_cjk("插件列表", set()).index("插件")]
+    for token in index_data["stopwords"]:
+        assert token not in index_data["postings"]
+
+
+def test_title_hit_ranks_above_content_hit(index_data):
+    hits = build.SearchIndex(index_data).query("插件")
+    assert paths(hits) == ["plugins.md", "guide.md"]
+    assert hits[0]["title"] == "插件列表"
+    assert hits[0]["score"] > hits[1]["score"]
+
+
+def test_phrase_requires_every_token(index_data):
+    index = build.SearchIndex(index_data)
+    # "配置说明"切分为多个词条，两个文档都包含"配置"和"说明"，但只有一个包含完整的词条组合
+    assert sorted(paths(index.query("配置"))) == ["faq.md", "guide.md"]
+    assert paths(index.query("配置说明")) == ["guide.md"]
+    assert paths(index.query("插件 配置")) == ["guide.md"]
+    assert index.query("插件 不存在的词") == []
+
+
+def test_single_character_query(index_data):
+    index = build.SearchIndex(index_data)
+    assert paths(index.query("插")) == ["plugins.md", "guide.md"]
+    assert paths(index.query("迎")) == ["README.md"]
+    # 查询中被二元词条覆盖的单字不再单独查询
+    index.query("插件")
+    assert index.postings_visited == len(index_data["postings"]["插件"])
+
+
+def test_query_limit_and_cost(index_data):
+    index = build.SearchIndex(index_data)
+    assert len(index.query("配置", limit=1)) == 1
+    assert index.postings_visited == len(index_data["postings"]["配置"])
+    assert index.query("的") == []
+    assert index.postings_visited == 0
+
+
+def test_unsupported_version(index_data):
+    with pytest.raises(ValueError):
+        build.SearchIndex(dict(index_data, version=2))
+
+
+def test_inverted_index_is_opt_in(site):
+    write_documents(os.path.join(site, "data"), DOCUMENTS)
+    builder = make_builder(site, inverted_index=None)
+    assert build.Builder().args.inverted_index is None
+    builder.run()
+    assert not os.path.exists(os.path.join(site, "search-index.json"))
+    assert os.path.exists(os.path.join(site, "search", build.SEARCH_SHARD_MANIFEST))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""语料统计：TF-IDF关键词、搜索条目中的BM25权重和按权重排序"""
+import os
+import json
+
+import build
+from conftest import write_documents, make_builder
+
+
+FILLER = "这一段说明文字用来增加文档的长度，" * 6
+DOCUMENTS = {
+    "README.md": "# 首页\n\n快速开始。快速开始。欢迎使用。",
+    "short.md": "# 简介\n\n插件很好用，安装插件。快速开始。",
+    "long.md": "# 手册\n\n" + "插件" + FILLER + "插件插件插件。快速开始。",
+    "webui.md": "# 面板\n\n快速开始。快速开始。快速开始。面板登录需要密码。",
+    "plugin.md": "# 插件\n\n快速开始。列表。",
+}
+
+
+def load_items(site):
+    shard_dir = os.path.join(site, "search")
+    with open(os.path.join(shard_dir, build.SEARCH_SHARD_MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    items = []
+    for shard in manifest["shards"]:
+        with open(os.path.join(shard_dir, shard["file"]), 'r', encoding='utf-8') as f:
+            items.extend(json.load(f))
+    return {item["path"]: item for item in items}
+
+
+def test_weights_are_in_default_output(site):
+    write_documents(os.path.join(site, "data"), DOCUMENTS)
+    make_builder(site, inverted_index=None).run()
+    for item in load_items(site).values():
+        assert len(item["norms"]) == 2 and all(norm > 0 for norm in item["norms"])
+        assert len(item["weights"]) == len(item["keywords"])
+        assert all(weight > 0 for weight in item["weights"])
+
+
+def test_tfidf_keywords_skip_common_terms(site):
+    write_documents(os.path.join(site, "data"), DOCUMENTS)
+    make_builder(site, keyword_ranking="frequency").run()
+    assert load_items(site)["webui.md"]["keywords"][0] in ("快速", "速开", "开始")
+
+    make_builder(site, keyword_ranking="tfidf").run()
+    keywords = load_items(site)["webui.md"]["keywords"]
+    assert keywords[0] not in ("快速", "速开", "开始")
+    assert "登录" in keywords[:5]
+
+
+def test_bm25_ranking_differs_from_frequency(site):
+    write_documents(os.path.join(site, "data"), DOCUMENTS)
+    make_builder(site).run()
+    items = load_items(site)
+    search_tree = [items[path] for path in ("README.md", "long.md", "short.md", "plugin.md", "webui.md")]
+    assert all(len(item["content"]) < 200 for item in search_tree)
+
+    # 按出现次数排序时长文档在前；BM25的长度归一化使出现两次的短文档排在出现四次的长文档之前，
+    # 标题命中的文档排在最前
+    by_frequency = sorted((item for item in search_tree if "插件" in item["content"]),
+                          key=lambda item: -item["content"].count("插件"))
+    assert [item["path"] for item in by_frequency] == ["long.md", "short.md", "plugin.md"]
+    ranked = build.rank_search_items(search_tree, "插件")
+    assert [item["path"] for item in ranked] == ["plugin.md", "short.md", "long.md"]
+    scores = [build.score_search_item(item, "插件") for item in ranked]
+    assert scores == sorted(scores, reverse=True) and scores[1] > scores[2] > 0
+
+    # 没有预先计算的权重时（旧的搜索数据）仍能排序
+    legacy = [{key: item[key] for key in ("title", "path", "content", "keywords")} for item in search_tree]
+    assert [item["path"] for item in build.rank_search_items(legacy, "插件")][0] == "plugin.md"
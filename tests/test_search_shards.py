@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""搜索索引分片：清单格式和按查询选择分片的过滤器"""
+import os
+import json
+
+import build
+from conftest import write_documents, make_builder
+
+
+DOCUMENTS = {
+    "README.md": "# 首页\n\n欢迎使用文档站点。",
+    "PF-webui/README.md": "# WebUI\n\n网页管理面板的安装和登录说明。",
+    "PF-webui/api.md": "# 接口\n\nHTTP API 返回 JSON 数据。",
+    "PF-gugubot/README.md": "# GUGUbot\n\n群聊机器人。",
+    "PF-gugubot/whitelist.md": "# 白名单\n\n支持绑定白名单。",
+}
+
+
+def load_shards(site):
+    shard_dir = os.path.join(site, "search")
+    with open(os.path.join(shard_dir, build.SEARCH_SHARD_MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    shards = {}
+    for shard in manifest["shards"]:
+        with open(os.path.join(shard_dir, shard["file"]), 'r', encoding='utf-8') as f:
+            shards[shard["name"]] = (shard, json.load(f))
+    return manifest, shards
+
+
+def matching_shards(shards, query):
+    return sorted(name for name, (shard, items) in shards.items() if build.search_filter_may_contain(shard["filter"], query))
+
+
+def test_manifest_format(site):
+    write_documents(os.path.join(site, "data"), DOCUMENTS)
+    make_builder(site).run()
+    manifest, shards = load_shards(site)
+    assert manifest["version"] == build.SEARCH_SHARD_VERSION == 2
+    assert manifest["count"] == sum(len(items) for shard, items in shards.values())
+    assert sorted(shards) == ["", "PF-gugubot", "PF-webui"]
+    for shard, items in shards.values():
+        assert shard["count"] == len(items)
+        assert shard["filter"]["bits"] % 64 == 0
+        assert shard["filter"]["hashes"] == build.SEARCH_FILTER_HASHES
+
+
+def test_filter_has_no_false_negatives(site):
+    write_documents(os.path.join(site, "data"), DOCUMENTS)
+    make_builder(site).run()
+    manifest, shards = load_shards(site)
+    for shard, items in shards.values():
+        for item in items:
+            for text in [item["title"], item["content"]] + item["keywords"]:
+                text = text.lower()
+                for length in (1, 2, 5):
+                    for start in range(len(text) - length + 1):
+                        assert build.search_filter_may_contain(shard["filter"], text[start:start + length])
+
+
+def test_query_selects_shards(site):
+    write_documents(os.path.join(site, "data"), DOCUMENTS)
+    make_builder(site).run()
+    manifest, shards = load_shards(site)
+    assert matching_shards(shards, "白名单") == ["PF-gugubot"]
+    assert matching_shards(shards, "面板") == ["PF-webui"]
+    # 前端先把查询转换为小写
+    assert matching_shards(shards, "webui") == ["PF-webui"]
+    assert matching_shards(shards, "不存在的查询词") == []
+    assert matching_shards(shards, "") == ["", "PF-gugubot", "PF-webui"]
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""监听模式：轮询检测文档的修改、新增和删除，只为变化的文档重新分词，语料统计在防抖后刷新"""
+import os
+import json
+import time
+import threading
+
+import pytest
+
+import build
+from conftest import write_documents, make_builder
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if condition():
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.05)
+    raise AssertionError("等待监听结果超时")
+
+
+@pytest.fixture
+def watched(site, monkeypatch):
+    """完成一次构建后在后台线程中轮询监听，返回 (构建器, 每次分词的文档路径列表)"""
+    monkeypatch.setattr(build, "WATCHDOG_AVAILABLE", False)
+    monkeypatch.setattr(build, "WATCH_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(build, "WATCH_SEARCH_REFRESH_DELAY", 0.5)
+    write_documents(os.path.join(site, "data"), {
+        "README.md": "# 首页\n\n欢迎使用文档",
+        "guide.md": "# 指南\n\n安装和配置说明",
+        "plugin.md": "# 插件\n\n插件开发说明",
+    })
+    builder = make_builder(site, single_search_file=True, inverted_index=os.path.join(site, "search-index.json"))
+    builder.run()
+
+    tokenized = []
+    tokenize = build.tokenize_search_documents
+
+    def record_tokenize(search_tree, config):
+        tokenized.append(sorted(item["path"] for item in search_tree))
+        return tokenize(search_tree, config)
+
+    # 第一次轮询快照完成后再修改文档
+    polling = threading.Event()
+    take_snapshot = build.take_document_snapshot
+
+    def record_snapshot(root_dir, config):
+        snapshot = take_snapshot(root_dir, config)
+        polling.set()
+        return snapshot
+
+    monkeypatch.setattr(build, "tokenize_search_documents", record_tokenize)
+    monkeypatch.setattr(build, "take_document_snapshot", record_snapshot)
+    stop = threading.Event()
+    thread = threading.Thread(target=builder.watch, args=(stop,))
+    thread.start()
+    polling.wait(10)
+    yield builder, tokenized
+    stop.set()
+    thread.join(10)
+
+
+def replace_document(data_dir, path, content):
+    """整体替换文档（先写临时文件），轮询时不会读到写了一半的文件"""
+    write_documents(data_dir, {path + ".tmp": content})
+    os.replace(os.path.join(data_dir, path + ".tmp"), os.path.join(data_dir, path))
+
+
+def search_items(site):
+    return {item["path"]: item for item in read_json(os.path.join(site, "search.json"))}
+
+
+def test_edit_add_delete(site, watched):
+    builder, tokenized = watched
+    data_dir = os.path.join(site, "data")
+    index_docs = lambda: [doc["path"] for doc in read_json(os.path.join(site, "search-index.json"))["docs"]]
+    assert sorted(index_docs()) == ["README.md", "guide.md", "plugin.md"]
+
+    # 修改：只重新分词被修改的文档，其他条目沿用已有的关键词和权重
+    before = search_items(site)
+    replace_document(data_dir, "guide.md", "# 新指南\n\n安装、升级和配置的详细说明")
+    wait_for(lambda: search_items(site)["guide.md"]["title"] == "新指南")
+    assert tokenized and all(paths == ["guide.md"] for paths in tokenized)
+    items = search_items(site)
+    assert "升级" in items["guide.md"]["content"]
+    assert len(items["guide.md"]["weights"]) == len(items["guide.md"]["keywords"])
+    assert items["plugin.md"] == before["plugin.md"]
+
+    # 新增：重新扫描结构，但只为新文档分词
+    seen = len(tokenized)
+    replace_document(data_dir, "theme.md", "# 主题\n\n主题样式说明")
+    wait_for(lambda: "theme.md" in search_items(site))
+    assert tokenized[seen:] and all(paths == ["theme.md"] for paths in tokenized[seen:])
+    assert search_items(site)["theme.md"]["weights"]
+    assert search_items(site)["plugin.md"] == before["plugin.md"]
+
+    # 删除
+    seen = len(tokenized)
+    os.remove(os.path.join(data_dir, "plugin.md"))
+    wait_for(lambda: "plugin.md" not in search_items(site))
+    assert "plugin.md" not in [child["path"] for child in read_json(os.path.join(site, "path.json"))["children"]]
+
+    # 一段时间内没有新的变化后使用缓存的分词结果刷新整个语料的统计和倒排索引
+    wait_for(lambda: sorted(index_docs()) == ["README.md", "guide.md", "theme.md"])
+    assert all(paths == [] for paths in tokenized[seen:])
+    expected = build.build_search_tree(build.load_existing_structure(os.path.join(site, "path.json")), builder.config)
+    with builder.activate():
+        build.prepare_search_index(expected, builder.config, builder.args)
+    assert search_items(site) == {item["path"]: item for item in expected}